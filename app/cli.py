@@ -7,12 +7,22 @@ import typer
 
 from app.core.config import load_env, settings
 from app.core.manifest import load_manifest, validate_manifest
-from app.core.policy import load_policy, resolve_period, iter_periods
+from app.core.policy import load_policy, resolve_period, resolve_window, iter_periods
 from app.core.doctor import run as doctor_run
 from app.core.project import prompt_project, write_project, project_path
 from app.core.pipeline import run as generate_run
 from app.core.ops_insurance import snapshot as snapshot_run, explain_plan, audit_export
 from app.core.gsc_check import run_gsc_check
+from app.core.batch import discover_projects, run_batch
+from app.core.backfill import prefetch_recent, run_backfill
+from app.render.bulk import find_payloads, render_all
+from app.core.duckdb_store import (
+    GRAINS,
+    analytics_kpis_by_grain,
+    analytics_kpis_for_window,
+    gsc_kpis_by_grain,
+    gsc_kpis_for_window,
+)
 
 app = typer.Typer(help="SEO report generator CLI")
 
@@ -40,6 +50,10 @@ def add_project() -> None:
     typer.secho(f"Project created: {path}", fg=typer.colors.GREEN)
 
 
+def _hours_to_s(hours: float | None) -> float | None:
+    return None if hours is None else hours * 3600
+
+
 @app.command()
 def generate(
     project: str | None = typer.Option(None, help="Project key"),
@@ -47,6 +61,19 @@ def generate(
     month: str = typer.Option(..., help="YYYY-MM or auto"),
     mock: bool = typer.Option(False, help="Use mock fixtures instead of live APIs"),
     lang: str | None = typer.Option(None, "--lang", help="Override report language (de|en)"),
+    source_workers: int = typer.Option(1, "--source-workers", help="Extract enabled sources concurrently (threads)"),
+    workers: int = typer.Option(1, "--workers", help="With --all: generate N projects in parallel (processes)"),
+    summary_out: str | None = typer.Option(None, "--summary-out", help="With --all: also write the run summary JSON here"),
+    from_stage: str | None = typer.Option(
+        None, "--from-stage", help="Re-run only this stage and its downstream stages (e.g. render, transform:gsc)"
+    ),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Recompute every stage instead of reusing cached outputs"),
+    replay: bool = typer.Option(
+        False, "--replay", "--prefer-cache", help="Serve the latest stored raw API responses; fetch only what is missing"
+    ),
+    replay_ttl: float | None = typer.Option(
+        None, "--replay-ttl", help="With --replay: refetch stored responses older than this many hours"
+    ),
 ) -> None:
     policy = load_policy()
 
@@ -54,21 +81,29 @@ def generate(
         projects_dir = settings().workspace_dir / "projects"
         if not projects_dir.exists():
             raise typer.Exit(code=1)
-        for project_dir in sorted(projects_dir.iterdir()):
-            path = project_dir / "project.json"
-            if not path.exists():
-                continue
-            project_lang = lang
-            if not project_lang:
-                try:
-                    project_lang = json.loads(path.read_text(encoding="utf-8")).get("report_language", "de")
-                except json.JSONDecodeError:
-                    project_lang = "de"
-            resolution = resolve_period(policy, month, project_lang)
-            if resolution.warning:
-                typer.secho(resolution.warning, fg=typer.colors.YELLOW)
-            output_dir = generate_run(path, resolution.period, mock=mock, lang_override=lang)
-            typer.secho(f"Report generated: {output_dir}", fg=typer.colors.GREEN)
+        outcomes, summary = run_batch(
+            discover_projects(projects_dir),
+            month,
+            mock=mock,
+            lang=lang,
+            workers=workers,
+            source_workers=source_workers,
+            use_cache=not no_cache,
+            replay=replay,
+            replay_ttl_s=_hours_to_s(replay_ttl),
+        )
+        for outcome in outcomes:
+            if outcome.warning:
+                typer.secho(f"{outcome.project_key}: {outcome.warning}", fg=typer.colors.YELLOW)
+            if outcome.status == "ok":
+                typer.secho(f"Report generated: {outcome.output_dir}", fg=typer.colors.GREEN)
+            else:
+                typer.secho(f"ERROR: {outcome.project_key}: {outcome.error}", fg=typer.colors.RED)
+        typer.echo(summary.to_json())
+        if summary_out:
+            Path(summary_out).write_text(summary.to_json(), encoding="utf-8")
+        if summary.failed:
+            raise typer.Exit(code=1)
         return
 
     if not project:
@@ -85,7 +120,17 @@ def generate(
     resolution = resolve_period(policy, month, project_lang)
     if resolution.warning:
         typer.secho(resolution.warning, fg=typer.colors.YELLOW)
-    output_dir = generate_run(path, resolution.period, mock=mock, lang_override=lang)
+    output_dir = generate_run(
+        path,
+        resolution.period,
+        mock=mock,
+        lang_override=lang,
+        source_workers=source_workers,
+        start_at=from_stage,
+        use_cache=not no_cache,
+        replay=replay,
+        replay_ttl_s=_hours_to_s(replay_ttl),
+    )
     typer.secho(f"Report generated: {output_dir}", fg=typer.colors.GREEN)
 
 
@@ -96,16 +141,109 @@ def backfill(
     to_month: str = typer.Option(..., "--to", help="YYYY-MM end"),
     mock: bool = typer.Option(False, help="Use mock fixtures instead of live APIs"),
     lang: str | None = typer.Option(None, "--lang", help="Override report language (de|en)"),
+    source_workers: int = typer.Option(1, "--source-workers", help="Extract enabled sources concurrently (threads)"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Recompute every stage instead of reusing cached outputs"),
+    replay: bool = typer.Option(
+        False, "--replay", "--prefer-cache", help="Serve the latest stored raw API responses; fetch only what is missing"
+    ),
+    replay_ttl: float | None = typer.Option(
+        None, "--replay-ttl", help="With --replay: refetch stored responses older than this many hours"
+    ),
 ) -> None:
     months = iter_periods(from_month, to_month)
     path = project_path(project)
     if not path.exists():
         raise typer.Exit(code=1)
-    for period in months:
-        output_dir = generate_run(path, period, mock=mock, lang_override=lang)
+    result = run_backfill(
+        path,
+        months,
+        mock=mock,
+        lang_override=lang,
+        source_workers=source_workers,
+        use_cache=not no_cache,
+        replay=replay,
+        replay_ttl_s=_hours_to_s(replay_ttl),
+    )
+    for warning in result.warnings:
+        typer.secho(f"WARNING: {warning}", fg=typer.colors.YELLOW)
+    for output_dir in result.output_dirs:
         typer.secho(f"Report generated: {output_dir}", fg=typer.colors.GREEN)
 
 
+@app.command()
+def render(
+    project: str | None = typer.Option(None, help="Project key"),
+    all: bool = typer.Option(False, "--all", help="Render for all projects"),
+    from_month: str = typer.Option(..., "--from", help="YYYY-MM start"),
+    to_month: str = typer.Option(..., "--to", help="YYYY-MM end"),
+    workers: int = typer.Option(1, "--workers", help="Render N payloads in parallel (processes)"),
+) -> None:
+    if all:
+        paths = discover_projects()
+    elif project and project_path(project).exists():
+        paths = [project_path(project)]
+    else:
+        raise typer.Exit(code=1)
+    payloads = find_payloads(paths, iter_periods(from_month, to_month))
+    outcomes, summary = render_all(payloads, workers=workers)
+    for outcome in outcomes:
+        if outcome.status != "ok":
+            typer.secho(f"ERROR: {outcome.payload_path}: {outcome.error}", fg=typer.colors.RED)
+    typer.echo(summary.to_json())
+    if summary.failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def prefetch(
+    project: str | None = typer.Option(None, help="Project key"),
+    all: bool = typer.Option(False, "--all", help="Prefetch for all projects"),
+) -> None:
+    if all:
+        paths = discover_projects()
+    elif project and project_path(project).exists():
+        paths = [project_path(project)]
+    else:
+        raise typer.Exit(code=1)
+    failed = False
+    for project_key, result in prefetch_recent(paths):
+        if isinstance(result, int):
+            typer.secho(f"{project_key}: gsc refreshed {result} day(s)", fg=typer.colors.GREEN)
+        else:
+            failed = True
+            typer.secho(f"ERROR: {project_key}: {result}", fg=typer.colors.RED)
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def kpis(
+    project: str = typer.Option(..., help="Project key"),
+    period: str = typer.Option("auto", "--period", help="YYYY-MM, YYYY-Www, YYYY-Qn, YYYY-MM-DD..YYYY-MM-DD, mtd or auto"),
+    grain: str | None = typer.Option(None, "--grain", help=f"Also break the window down by {'|'.join(GRAINS)}"),
+) -> None:
+    path = project_path(project)
+    if not path.exists():
+        raise typer.Exit(code=1)
+    project_data = json.loads(path.read_text(encoding="utf-8"))
+    project_key = project_data["project_key"]
+    window = resolve_window(load_policy(), period)
+    result = {
+        "project_key": project_key,
+        "window": {"kind": window.kind, "label": window.label, "start": window.start.isoformat(), "end": window.end.isoformat()},
+        "gsc": gsc_kpis_for_window(project_key, window.start, window.end),
+    }
+    # Rybbit day buckets are in the warehouse once a report has extracted them.
+    analytics = project_data.get("sources", {}).get("rybbit", {}).get("enabled", False)
+    if analytics:
+        result["analytics"] = analytics_kpis_for_window(project_key, window.start, window.end)
+    if grain:
+        result["buckets"] = gsc_kpis_by_grain(project_key, grain, window.start, window.end)
+        if analytics:
+            result["analytics_buckets"] = analytics_kpis_by_grain(project_key, grain, window.start, window.end)
+    typer.echo(json.dumps(result, indent=2))
+
+
 @app.command()
 def snapshot(
     project: str = typer.Option(..., help="Project key"),
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing.managers import BaseManager
+from pathlib import Path
+from typing import Any
+
+from app.core import scheduler
+from app.core.config import load_env, settings
+from app.core.duckdb_store import WarehouseServer, use_warehouse
+from app.core.pipeline import run as generate_run
+from app.core.policy import load_policy, resolve_period
+from app.transforms import rankings as rankings_transform
+
+
+@dataclass(frozen=True)
+class ProjectOutcome:
+    project_key: str
+    status: str
+    period: str | None = None
+    output_dir: str | None = None
+    warning: str | None = None
+    error: str | None = None
+    duration_s: float = 0.0
+
+
+@dataclass(frozen=True)
+class BatchSummary:
+    month: str
+    workers: int
+    projects_total: int
+    succeeded: int
+    failed: int
+    duration_s: float
+    projects_per_minute: float
+    failures: list[dict[str, Any]] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+
+def discover_projects(projects_dir: Path | None = None) -> list[Path]:
+    projects_dir = projects_dir or (settings().workspace_dir / "projects")
+    if not projects_dir.exists():
+        return []
+    return [
+        project_dir / "project.json"
+        for project_dir in sorted(projects_dir.iterdir())
+        if (project_dir / "project.json").exists()
+    ]
+
+
+def _project_language(path: Path, lang: str | None) -> str:
+    if lang:
+        return lang
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("report_language", "de")
+    except json.JSONDecodeError:
+        return "de"
+
+
+def generate_one(
+    path: Path,
+    month: str,
+    mock: bool = False,
+    lang: str | None = None,
+    source_workers: int = 1,
+    use_cache: bool = True,
+    replay: bool = False,
+    replay_ttl_s: float | None = None,
+) -> ProjectOutcome:
+    project_key = path.parent.name
+    started = time.monotonic()
+    period = None
+    warning = None
+    try:
+        resolution = resolve_period(load_policy(), month, _project_language(path, lang))
+        period = resolution.period
+        warning = resolution.warning
+        output_dir = generate_run(
+            path,
+            period,
+            mock=mock,
+            lang_override=lang,
+            source_workers=source_workers,
+            use_cache=use_cache,
+            replay=replay,
+            replay_ttl_s=replay_ttl_s,
+        )
+    except Exception as exc:
+        return ProjectOutcome(
+            project_key,
+            "failed",
+            period=period,
+            warning=warning,
+            error=f"{type(exc).__name__}: {exc}",
+            duration_s=round(time.monotonic() - started, 3),
+        )
+    return ProjectOutcome(
+        project_key,
+        "ok",
+        period=period,
+        output_dir=str(output_dir),
+        warning=warning,
+        duration_s=round(time.monotonic() - started, 3),
+    )
+
+
+class _BatchManager(BaseManager):
+    """Serves the objects that `generate --all` workers share: API quotas and the warehouse."""
+
+
+_BatchManager.register("QuotaServer", scheduler.QuotaServer)
+_BatchManager.register("WarehouseServer", WarehouseServer)
+
+
+def _init_worker(quota: Any, warehouse: Any) -> None:
+    load_env(settings().env_dir)
+    # Workers draw on one set of limiters, so quota an idle worker leaves unused goes to the others.
+    scheduler.configure(quota=quota)
+    use_warehouse(warehouse)
+    rankings_transform.use_parse_pool(False)
+
+
+def run_batch(
+    paths: list[Path],
+    month: str,
+    mock: bool = False,
+    lang: str | None = None,
+    workers: int = 1,
+    source_workers: int = 1,
+    use_cache: bool = True,
+    replay: bool = False,
+    replay_ttl_s: float | None = None,
+) -> tuple[list[ProjectOutcome], BatchSummary]:
+    started = time.monotonic()
+    args = (month, mock, lang, source_workers, use_cache, replay, replay_ttl_s)
+    if workers <= 1 or len(paths) <= 1:
+        outcomes = [generate_one(path, *args) for path in paths]
+    else:
+        outcomes = []
+        workers = min(workers, len(paths))
+        with _BatchManager() as manager:
+            shared = (manager.QuotaServer(), manager.WarehouseServer())
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=shared) as pool:
+                futures = [pool.submit(generate_one, path, *args) for path in paths]
+                # Collect in submission order so output is deterministic regardless of finish order.
+                for path, future in zip(paths, futures):
+                    try:
+                        outcomes.append(future.result())
+                    except Exception as exc:
+                        outcomes.append(ProjectOutcome(path.parent.name, "failed", error=f"{type(exc).__name__}: {exc}"))
+
+    duration = time.monotonic() - started
+    failed = [o for o in outcomes if o.status != "ok"]
+    summary = BatchSummary(
+        month=month,
+        workers=max(workers, 1),
+        projects_total=len(outcomes),
+        succeeded=len(outcomes) - len(failed),
+        failed=len(failed),
+        duration_s=round(duration, 3),
+        projects_per_minute=round(len(outcomes) / duration * 60, 2) if duration > 0 else 0.0,
+        failures=[{"project_key": o.project_key, "period": o.period, "error": o.error} for o in failed],
+    )
+    return outcomes, summary
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.core.lake import find_json, lake_codec, read_json, write_json
+
+
+# CrUX publishes a new collection period every REFRESH_DAYS; it becomes available PUBLISH_LAG_DAYS after it ends.
+REFRESH_DAYS = {"history": 7, "daily": 1}
+PUBLISH_LAG_DAYS = 2
+
+
+def _next_expected(entry: dict[str, Any], mode: str) -> date:
+    # Negative answers (no data for the URL) have no collection period and are retried after one refresh.
+    base = entry.get("collection_end") or entry["fetched"]
+    lag = PUBLISH_LAG_DAYS if entry.get("collection_end") else 0
+    return date.fromisoformat(base) + timedelta(days=REFRESH_DAYS[mode] + lag)
+
+
+class CruxCache:
+    """CrUX responses per (mode, url/origin, form factor), valid until the next collection period is published."""
+
+    def __init__(self, today: date, root: Path | None = None) -> None:
+        self.today = today
+        self.root = root or (settings().workspace_dir / "lake" / "cache" / "crux")
+        self.codec = lake_codec()
+
+    def _path(self, mode: str, key: str, target: str, form_factor: str | None) -> Path:
+        digest = hashlib.sha256(json.dumps([mode, key, target, form_factor]).encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / f"{digest}.json"
+
+    def get(self, mode: str, key: str, target: str, form_factor: str | None) -> dict[str, Any] | None:
+        path = find_json(self._path(mode, key, target, form_factor))
+        if path is None:
+            return None
+        try:
+            entry = read_json(path)
+        except (OSError, ValueError):
+            return None
+        if self.today >= _next_expected(entry, mode):
+            return None
+        return entry["response"]
+
+    def put(
+        self, mode: str, key: str, target: str, form_factor: str | None, response: dict[str, Any], collection_end: str | None
+    ) -> None:
+        entry = {"fetched": self.today.isoformat(), "collection_end": collection_end, "response": response}
+        write_json(self._path(mode, key, target, form_factor), entry, self.codec)
@@ -6,9 +6,9 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
-import requests
 import typer
 
+from app.core import scheduler
 from app.core.manifest import load_manifest, required_env_vars, hard_disabled_sources
 from app.core.schemas import validate_json, project_schema_path
 from app.core.project import project_path
@@ -222,7 +222,8 @@ def _check_pagespeed_connectivity(project: dict[str, Any]) -> tuple[bool, str]:
         return False, "GOOGLE_API_KEY missing"
     url = project.get("canonical_origin")
     try:
-        res = requests.get(
+        res = scheduler.request(
+            "GET",
             "https://www.googleapis.com/pagespeedonline/v5/runPagespeed",
             params={"url": url, "strategy": "mobile", "key": api_key},
             timeout=30,
@@ -239,7 +240,8 @@ def _check_crux_connectivity(project: dict[str, Any]) -> tuple[bool, str]:
         return False, "GOOGLE_API_KEY missing"
     origin = project.get("canonical_origin")
     try:
-        res = requests.post(
+        res = scheduler.request(
+            "POST",
             f"https://chromeuxreport.googleapis.com/v1/records:queryHistoryRecord?key={api_key}",
             json={"origin": origin},
             timeout=30,
@@ -257,7 +259,9 @@ def _check_dataforseo_connectivity() -> tuple[bool, str]:
         return False, "DATAFORSEO_LOGIN/PASSWORD missing"
     base = os.environ.get("DATAFORSEO_API_BASE", "https://api.dataforseo.com")
     try:
-        res = requests.get(f"{base}/v3/appendix/user_data", auth=(login, password), timeout=30)
+        res = scheduler.request(
+            "GET", f"{base}/v3/appendix/user_data", credential=login, auth=(login, password), timeout=30
+        )
         res.raise_for_status()
         return True, "user_data ok"
     except Exception as exc:
@@ -270,7 +274,8 @@ def _check_rybbit_connectivity() -> tuple[bool, str]:
     if not token or not base:
         return False, "RYBBIT_API_KEY/RYBBIT_API_BASE missing"
     try:
-        res = requests.get(
+        res = scheduler.request(
+            "GET",
             f"{base.rstrip('/')}/me",
             headers={"Authorization": f"Bearer {token}"},
             timeout=30,
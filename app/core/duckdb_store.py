@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import random
+import threading
+import time
+from datetime import date
 from pathlib import Path
 from typing import Any
 
@@ -14,40 +18,775 @@ def _db_path() -> Path:
     return path
 
 
-def store_gsc(project_key: str, period: str, mart: dict[str, Any]) -> None:
+# The warehouse is a single DuckDB file; parallel `generate --all` workers take turns on its write lock.
+LOCK_TIMEOUT_S = 120.0
+
+
+class WarehouseServer:
+    """Owns the warehouse file for `generate --all` worker processes, which reach it through a manager proxy.
+
+    One process holds the DuckDB file open and every worker gets a cursor on it, so workers no longer queue
+    on the file lock. Statements and transactions run one at a time (a single writer).
+    """
+
+    def __init__(self) -> None:
+        self._db: duckdb.DuckDBPyConnection | None = None
+        self._cursors: dict[int, duckdb.DuckDBPyConnection] = {}
+        self._in_transaction: set[int] = set()
+        self._next_id = 0
+        self._owner: int | None = None
+        self._cond = threading.Condition()
+
+    def open(self, path: str) -> int:
+        with self._cond:
+            if self._db is None:
+                self._db = duckdb.connect(path)
+            self._next_id += 1
+            self._cursors[self._next_id] = self._db.cursor()
+            return self._next_id
+
+    def _take(self, cursor_id: int) -> None:
+        with self._cond:
+            while self._owner not in (None, cursor_id):
+                self._cond.wait()
+            self._owner = cursor_id
+
+    def _give(self, cursor_id: int) -> None:
+        with self._cond:
+            if self._owner == cursor_id:
+                self._owner = None
+                self._cond.notify_all()
+
+    def execute(self, cursor_id: int, sql: str, params: Any = None, many: bool = False) -> None:
+        self._take(cursor_id)
+        statement = sql.lstrip().upper()
+        try:
+            cursor = self._cursors[cursor_id]
+            (cursor.executemany if many else cursor.execute)(sql, params)
+            if statement.startswith("BEGIN"):
+                self._in_transaction.add(cursor_id)
+            elif statement.startswith(("COMMIT", "ROLLBACK")):
+                self._in_transaction.discard(cursor_id)
+        finally:
+            # An open transaction keeps the warehouse until COMMIT, ROLLBACK or close.
+            if cursor_id not in self._in_transaction:
+                self._give(cursor_id)
+
+    def fetchone(self, cursor_id: int) -> Any:
+        return self._cursors[cursor_id].fetchone()
+
+    def fetchall(self, cursor_id: int) -> list[Any]:
+        return self._cursors[cursor_id].fetchall()
+
+    def close(self, cursor_id: int) -> None:
+        cursor = self._cursors.pop(cursor_id, None)
+        try:
+            if cursor is not None and cursor_id in self._in_transaction:
+                self._in_transaction.discard(cursor_id)
+                cursor.execute("ROLLBACK")
+        finally:
+            self._give(cursor_id)
+            if cursor is not None:
+                cursor.close()
+
+
+class _RemoteConnection:
+    """The subset of the DuckDB connection API this module uses, on a WarehouseServer cursor."""
+
+    def __init__(self, server: Any, path: Path) -> None:
+        self._server = server
+        self._id = server.open(str(path))
+
+    def execute(self, sql: str, params: Any = None) -> "_RemoteConnection":
+        self._server.execute(self._id, sql, params)
+        return self
+
+    def executemany(self, sql: str, params: Any) -> "_RemoteConnection":
+        self._server.execute(self._id, sql, params, True)
+        return self
+
+    def fetchone(self) -> Any:
+        return self._server.fetchone(self._id)
+
+    def fetchall(self) -> list[Any]:
+        return self._server.fetchall(self._id)
+
+    def close(self) -> None:
+        self._server.close(self._id)
+
+
+_warehouse: Any = None
+
+
+def use_warehouse(server: Any) -> None:
+    """Route this process's warehouse access through a WarehouseServer (proxy); None opens the file directly."""
+    global _warehouse
+    _warehouse = server
+
+
+def _connect() -> duckdb.DuckDBPyConnection:
     path = _db_path()
-    con = duckdb.connect(str(path))
+    if _warehouse is not None:
+        return _RemoteConnection(_warehouse, path)  # type: ignore[return-value]
+    deadline = time.monotonic() + LOCK_TIMEOUT_S
+    while True:
+        try:
+            return duckdb.connect(str(path))
+        except duckdb.IOException as exc:
+            if "lock" not in str(exc).lower() or time.monotonic() > deadline:
+                raise
+            time.sleep(0.05 + random.random() * 0.2)
+
+
+def store_gsc(project_key: str, period: str, mart: dict[str, Any]) -> None:
+    con = _connect()
+    try:
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS gsc_kpis (project_key TEXT, period TEXT, clicks DOUBLE, impressions DOUBLE, ctr DOUBLE, avg_position DOUBLE)"
+        )
+        con.execute(
+            "INSERT INTO gsc_kpis VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                project_key,
+                period,
+                mart.get("kpis", {}).get("clicks"),
+                mart.get("kpis", {}).get("impressions"),
+                mart.get("kpis", {}).get("ctr"),
+                mart.get("kpis", {}).get("avg_position"),
+            ],
+        )
+
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS gsc_top_pages (project_key TEXT, period TEXT, url TEXT, clicks DOUBLE, impressions DOUBLE)"
+        )
+        for row in mart.get("top_pages", []):
+            con.execute(
+                "INSERT INTO gsc_top_pages VALUES (?, ?, ?, ?, ?)",
+                [project_key, period, row.get("url"), row.get("clicks"), row.get("impressions")],
+            )
+
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS gsc_top_queries (project_key TEXT, period TEXT, query TEXT, clicks DOUBLE, impressions DOUBLE)"
+        )
+        for row in mart.get("top_queries", []):
+            con.execute(
+                "INSERT INTO gsc_top_queries VALUES (?, ?, ?, ?, ?)",
+                [project_key, period, row.get("query"), row.get("clicks"), row.get("impressions")],
+            )
+    finally:
+        con.close()
+
+
+GSC_ROW_COLUMNS = "{'key': 'VARCHAR', 'clicks': 'DOUBLE', 'impressions': 'DOUBLE', 'ctr': 'DOUBLE', 'position': 'DOUBLE'}"
+
+
+def _ensure_gsc_rows(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS gsc_rows (project_key TEXT, period TEXT, dimension TEXT, key TEXT, clicks DOUBLE, impressions DOUBLE, ctr DOUBLE, position DOUBLE)"
+    )
+
+
+def load_gsc_rows(project_key: str, period: str, dimension: str, path: Path) -> None:
+    """Replace a period's rows for one dimension with the streamed JSONL file; DuckDB reads it in chunks."""
+    con = _connect()
+    try:
+        _ensure_gsc_rows(con)
+        con.execute("BEGIN TRANSACTION")
+        con.execute(
+            "DELETE FROM gsc_rows WHERE project_key = ? AND period = ? AND dimension = ?",
+            [project_key, period, dimension],
+        )
+        if path.stat().st_size:
+            con.execute(
+                "INSERT INTO gsc_rows SELECT ?, ?, ?, key, clicks, impressions, ctr, position "
+                f"FROM read_json(?, format='newline_delimited', columns={GSC_ROW_COLUMNS})",
+                [project_key, period, dimension, str(path)],
+            )
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+GSC_RANGE_COLUMNS = (
+    "{'date': 'DATE', 'key': 'VARCHAR', 'clicks': 'DOUBLE', 'impressions': 'DOUBLE', 'ctr': 'DOUBLE', 'position': 'DOUBLE'}"
+)
+
+
+def load_gsc_range_rows(project_key: str, dimension: str, path: Path, periods: list[str]) -> None:
+    """Aggregate streamed date×dimension rows (JSONL) into monthly gsc_rows for `periods`, replacing them."""
+    con = _connect()
+    try:
+        _ensure_gsc_rows(con)
+        con.execute("BEGIN TRANSACTION")
+        con.executemany(
+            "DELETE FROM gsc_rows WHERE project_key = ? AND period = ? AND dimension = ?",
+            [[project_key, period, dimension] for period in periods],
+        )
+        if path.stat().st_size:
+            # Same weighting as a monthly API query: ctr from the sums, position impression-weighted.
+            con.execute(
+                "INSERT INTO gsc_rows SELECT ?, period, ?, key, sum(clicks), sum(impressions), "
+                "coalesce(sum(clicks) / nullif(sum(impressions), 0), 0), "
+                "sum(position * impressions) / nullif(sum(impressions), 0) "
+                f"FROM (SELECT strftime(date, '%Y-%m') AS period, * FROM read_json(?, format='newline_delimited', columns={GSC_RANGE_COLUMNS})) "
+                "WHERE list_contains(?, period) GROUP BY period, key",
+                [project_key, dimension, str(path), periods],
+            )
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+def _ensure_gsc_daily(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS gsc_daily (project_key TEXT, date DATE, clicks DOUBLE, impressions DOUBLE, ctr DOUBLE, position DOUBLE)"
+    )
+
+
+def store_gsc_daily(project_key: str, rows: list[dict[str, Any]]) -> None:
+    """Upsert daily property-level rows (GSC `date` dimension) for the days they cover."""
+    if not rows:
+        return
+    values = [
+        [project_key, row["keys"][0], row.get("clicks"), row.get("impressions"), row.get("ctr"), row.get("position")]
+        for row in rows
+    ]
+    days = [v[1] for v in values]
+    con = _connect()
+    try:
+        _ensure_gsc_daily(con)
+        con.execute("BEGIN TRANSACTION")
+        con.execute(
+            "DELETE FROM gsc_daily WHERE project_key = ? AND date BETWEEN ? AND ?",
+            [project_key, min(days), max(days)],
+        )
+        con.executemany("INSERT INTO gsc_daily VALUES (?, ?, ?, ?, ?, ?)", values)
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+# Position is impression-weighted when days are summed, like GSC's own aggregates.
+_KPI_SELECT = (
+    "sum(clicks), sum(impressions), "
+    "sum(clicks) / nullif(sum(impressions), 0), "
+    "sum(position * impressions) / nullif(sum(impressions), 0), "
+    "count(*)"
+)
+
+
+def _kpi_row(row: tuple[Any, ...]) -> dict[str, Any]:
+    clicks, impressions, ctr, position, days = row
+    return {"clicks": clicks, "impressions": impressions, "ctr": ctr, "avg_position": position, "days": days}
+
+
+def gsc_kpis_for_window(project_key: str, start: date, end: date) -> dict[str, Any]:
+    con = _connect()
+    try:
+        _ensure_gsc_daily(con)
+        row = con.execute(
+            f"SELECT {_KPI_SELECT} FROM gsc_daily WHERE project_key = ? AND date BETWEEN ? AND ?",
+            [project_key, start, end],
+        ).fetchone()
+    finally:
+        con.close()
+    return _kpi_row(row)
+
+
+GRAINS = ("day", "week", "month", "quarter")
+
+
+def gsc_kpis_by_grain(project_key: str, grain: str, start: date, end: date) -> list[dict[str, Any]]:
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of {', '.join(GRAINS)}")
+    con = _connect()
+    try:
+        _ensure_gsc_daily(con)
+        rows = con.execute(
+            f"SELECT CAST(date_trunc('{grain}', date) AS DATE) AS bucket, {_KPI_SELECT} FROM gsc_daily "
+            "WHERE project_key = ? AND date BETWEEN ? AND ? GROUP BY bucket ORDER BY bucket",
+            [project_key, start, end],
+        ).fetchall()
+    finally:
+        con.close()
+    return [{"bucket": bucket.isoformat(), **_kpi_row(rest)} for bucket, *rest in rows]
+
+
+# Fetch state per GSC partition: a day of property totals (dataset "daily", partition YYYY-MM-DD)
+# or a month of page/query rows (dataset "page"/"query", partition YYYY-MM).
+# "fresh" partitions were fetched while GSC could still revise them and are refetched next time.
+def _ensure_gsc_partitions(con: duckdb.DuckDBPyConnection) -> None:
     con.execute(
-        "CREATE TABLE IF NOT EXISTS gsc_kpis (project_key TEXT, period TEXT, clicks DOUBLE, impressions DOUBLE, ctr DOUBLE, avg_position DOUBLE)"
+        "CREATE TABLE IF NOT EXISTS gsc_partitions (project_key TEXT, dataset TEXT, partition TEXT, status TEXT, fetched_at TIMESTAMP)"
     )
+
+
+def gsc_partition_statuses(project_key: str, dataset: str, partitions: list[str]) -> dict[str, str]:
+    if not partitions:
+        return {}
+    con = _connect()
+    try:
+        _ensure_gsc_partitions(con)
+        rows = con.execute(
+            "SELECT partition, status FROM gsc_partitions WHERE project_key = ? AND dataset = ? AND partition BETWEEN ? AND ?",
+            [project_key, dataset, min(partitions), max(partitions)],
+        ).fetchall()
+    finally:
+        con.close()
+    wanted = set(partitions)
+    return {partition: status for partition, status in rows if partition in wanted}
+
+
+def mark_gsc_partitions(project_key: str, dataset: str, statuses: dict[str, str]) -> None:
+    if not statuses:
+        return
+    con = _connect()
+    try:
+        _ensure_gsc_partitions(con)
+        con.execute("BEGIN TRANSACTION")
+        con.execute(
+            "DELETE FROM gsc_partitions WHERE project_key = ? AND dataset = ? AND partition BETWEEN ? AND ?",
+            [project_key, dataset, min(statuses), max(statuses)],
+        )
+        con.executemany(
+            "INSERT INTO gsc_partitions VALUES (?, ?, ?, ?, current_timestamp)",
+            [[project_key, dataset, partition, status] for partition, status in sorted(statuses.items())],
+        )
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+def gsc_daily_rows(project_key: str, start: date, end: date) -> list[dict[str, Any]]:
+    """Stored daily rows shaped like GSC API rows with the `date` dimension."""
+    con = _connect()
+    try:
+        _ensure_gsc_daily(con)
+        rows = con.execute(
+            "SELECT date, clicks, impressions, ctr, position FROM gsc_daily "
+            "WHERE project_key = ? AND date BETWEEN ? AND ? ORDER BY date",
+            [project_key, start, end],
+        ).fetchall()
+    finally:
+        con.close()
+    return [
+        {"keys": [day.isoformat()], "clicks": clicks, "impressions": impressions, "ctr": ctr, "position": position}
+        for day, clicks, impressions, ctr, position in rows
+    ]
+
+
+def top_gsc_rows(project_key: str, period: str, dimension: str, limit: int) -> tuple[list[dict[str, Any]], int]:
+    """Top rows by clicks from gsc_rows (shaped like API rows) and the total row count."""
+    con = _connect()
+    try:
+        _ensure_gsc_rows(con)
+        params = [project_key, period, dimension]
+        where = "WHERE project_key = ? AND period = ? AND dimension = ?"
+        rows = con.execute(
+            f"SELECT key, clicks, impressions, ctr, position FROM gsc_rows {where} ORDER BY clicks DESC, key LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        count = con.execute(f"SELECT count(*) FROM gsc_rows {where}", params).fetchone()[0]
+    finally:
+        con.close()
+    items = [
+        {"keys": [key], "clicks": clicks, "impressions": impressions, "ctr": ctr, "position": position}
+        for key, clicks, impressions, ctr, position in rows
+    ]
+    return items, count
+
+
+# page×query rows reference interned URLs/queries by integer id; the dictionaries are shared across projects.
+PAGE_QUERY_COLUMNS = (
+    "{'page': 'VARCHAR', 'query': 'VARCHAR', 'clicks': 'DOUBLE', 'impressions': 'DOUBLE', 'ctr': 'DOUBLE', 'position': 'DOUBLE'}"
+)
+
+
+def _ensure_gsc_page_query(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("CREATE SEQUENCE IF NOT EXISTS gsc_url_ids START 1")
+    con.execute("CREATE SEQUENCE IF NOT EXISTS gsc_query_ids START 1")
+    con.execute("CREATE TABLE IF NOT EXISTS gsc_url_dict (id INTEGER, url TEXT)")
+    con.execute("CREATE TABLE IF NOT EXISTS gsc_query_dict (id INTEGER, query TEXT)")
     con.execute(
-        "INSERT INTO gsc_kpis VALUES (?, ?, ?, ?, ?, ?)",
-        [
-            project_key,
-            period,
-            mart.get("kpis", {}).get("clicks"),
-            mart.get("kpis", {}).get("impressions"),
-            mart.get("kpis", {}).get("ctr"),
-            mart.get("kpis", {}).get("avg_position"),
-        ],
+        "CREATE TABLE IF NOT EXISTS gsc_page_query (project_key TEXT, period TEXT, page_id INTEGER, query_id INTEGER, clicks INTEGER, impressions INTEGER, ctr FLOAT, position FLOAT)"
     )
 
+
+def load_gsc_page_query(project_key: str, period: str, path: Path) -> None:
+    """Replace a period's page×query rows with the streamed JSONL file, interning new URLs/queries in SQL."""
+    con = _connect()
+    try:
+        _ensure_gsc_page_query(con)
+        con.execute("BEGIN TRANSACTION")
+        con.execute("DELETE FROM gsc_page_query WHERE project_key = ? AND period = ?", [project_key, period])
+        if path.stat().st_size:
+            # DuckDB spills the staging table to disk when it outgrows memory.
+            con.execute(
+                "CREATE TEMP TABLE gsc_page_query_stage AS SELECT * "
+                f"FROM read_json(?, format='newline_delimited', columns={PAGE_QUERY_COLUMNS})",
+                [str(path)],
+            )
+            con.execute(
+                "INSERT INTO gsc_url_dict SELECT nextval('gsc_url_ids'), page FROM "
+                "(SELECT DISTINCT page FROM gsc_page_query_stage) s "
+                "WHERE NOT EXISTS (SELECT 1 FROM gsc_url_dict d WHERE d.url = s.page)"
+            )
+            con.execute(
+                "INSERT INTO gsc_query_dict SELECT nextval('gsc_query_ids'), query FROM "
+                "(SELECT DISTINCT query FROM gsc_page_query_stage) s "
+                "WHERE NOT EXISTS (SELECT 1 FROM gsc_query_dict d WHERE d.query = s.query)"
+            )
+            con.execute(
+                "INSERT INTO gsc_page_query SELECT ?, ?, u.id, q.id, s.clicks, s.impressions, s.ctr, s.position "
+                "FROM gsc_page_query_stage s "
+                "JOIN gsc_url_dict u ON u.url = s.page "
+                "JOIN gsc_query_dict q ON q.query = s.query",
+                [project_key, period],
+            )
+            con.execute("DROP TABLE gsc_page_query_stage")
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+def gsc_page_query_count(project_key: str, period: str) -> int:
+    con = _connect()
+    try:
+        _ensure_gsc_page_query(con)
+        return con.execute(
+            "SELECT count(*) FROM gsc_page_query WHERE project_key = ? AND period = ?", [project_key, period]
+        ).fetchone()[0]
+    finally:
+        con.close()
+
+
+def gsc_queries_for_page(project_key: str, period: str, url: str, limit: int = 20) -> list[dict[str, Any]]:
+    """Queries driving one URL, by clicks."""
+    con = _connect()
+    try:
+        _ensure_gsc_page_query(con)
+        rows = con.execute(
+            "SELECT q.query, pq.clicks, pq.impressions, pq.ctr, pq.position FROM gsc_page_query pq "
+            "JOIN gsc_url_dict u ON u.id = pq.page_id JOIN gsc_query_dict q ON q.id = pq.query_id "
+            "WHERE pq.project_key = ? AND pq.period = ? AND u.url = ? "
+            "ORDER BY pq.clicks DESC, q.query LIMIT ?",
+            [project_key, period, url, limit],
+        ).fetchall()
+    finally:
+        con.close()
+    return [
+        {"query": query, "clicks": clicks, "impressions": impressions, "ctr": ctr, "position": position}
+        for query, clicks, impressions, ctr, position in rows
+    ]
+
+
+# Keyword positions per period and location x device; only keywords the project's domain ranks for are stored.
+RANKING_COLUMNS = "{'keyword': 'VARCHAR', 'location': 'VARCHAR', 'device': 'VARCHAR', 'position': 'INTEGER'}"
+
+
+def _ensure_ranking_positions(con: duckdb.DuckDBPyConnection) -> None:
     con.execute(
-        "CREATE TABLE IF NOT EXISTS gsc_top_pages (project_key TEXT, period TEXT, url TEXT, clicks DOUBLE, impressions DOUBLE)"
+        "CREATE TABLE IF NOT EXISTS ranking_positions (project_key TEXT, period TEXT, keyword TEXT, location TEXT, device TEXT, position INTEGER)"
     )
-    for row in mart.get("top_pages", []):
+
+
+def load_ranking_positions(project_key: str, period: str, path: Path) -> None:
+    """Replace a period's keyword positions with the JSONL file; DuckDB reads it in chunks."""
+    con = _connect()
+    try:
+        _ensure_ranking_positions(con)
+        con.execute("BEGIN TRANSACTION")
+        con.execute("DELETE FROM ranking_positions WHERE project_key = ? AND period = ?", [project_key, period])
+        if path.stat().st_size:
+            con.execute(
+                "INSERT INTO ranking_positions SELECT ?, ?, keyword, location, device, position "
+                f"FROM read_json(?, format='newline_delimited', columns={RANKING_COLUMNS})",
+                [project_key, period, str(path)],
+            )
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+def ranking_positions_digest(project_key: str, period: str) -> str | None:
+    """Order-independent fingerprint of a period's stored positions (None if nothing is stored)."""
+    con = _connect()
+    try:
+        _ensure_ranking_positions(con)
+        count, digest = con.execute(
+            "SELECT count(*), CAST(sum(hash(keyword, location, device, position)) AS TEXT) FROM ranking_positions "
+            "WHERE project_key = ? AND period = ?",
+            [project_key, period],
+        ).fetchone()
+    finally:
+        con.close()
+    return f"{count}:{digest}" if count else None
+
+
+# One full outer join of two periods; delta = position - previous_position, so a positive delta is a drop.
+_RANKING_CHANGES = """
+WITH cur AS (
+    SELECT keyword, location, device, position FROM ranking_positions
+    WHERE project_key = $project_key AND period = $period
+      AND location IS NOT DISTINCT FROM $location AND device IS NOT DISTINCT FROM $device
+), prev AS (
+    SELECT keyword, location, device, position FROM ranking_positions
+    WHERE project_key = $project_key AND period = $prev_period
+      AND location IS NOT DISTINCT FROM $location AND device IS NOT DISTINCT FROM $device
+), joined AS (
+    SELECT
+        coalesce(c.keyword, p.keyword) AS keyword,
+        coalesce(c.location, p.location) AS location,
+        coalesce(c.device, p.device) AS device,
+        c.position AS position,
+        p.position AS previous_position,
+        c.position - p.position AS delta,
+        CASE WHEN p.keyword IS NULL THEN 'new' WHEN c.keyword IS NULL THEN 'lost'
+             WHEN c.position <> p.position THEN 'moved' ELSE 'unchanged' END AS kind
+    FROM cur c FULL OUTER JOIN prev p ON c.keyword = p.keyword
+), ranked AS (
+    SELECT *,
+        row_number() OVER (
+            PARTITION BY kind ORDER BY abs(delta) DESC NULLS LAST, coalesce(position, previous_position), keyword
+        ) AS rn,
+        count(*) OVER (PARTITION BY kind) AS kind_count
+    FROM joined
+)
+SELECT kind, kind_count, keyword, location, device, position, previous_position, delta
+FROM ranked WHERE rn <= $limit ORDER BY kind, rn
+"""
+
+
+def ranking_changes(
+    project_key: str,
+    period: str,
+    prev_period: str,
+    location: str | None,
+    device: str | None,
+    limit: int,
+) -> dict[str, Any]:
+    """Top movers (largest absolute change), new and lost rankings of one location x device against prev_period."""
+    con = _connect()
+    try:
+        _ensure_ranking_positions(con)
+        rows = con.execute(
+            _RANKING_CHANGES,
+            {
+                "project_key": project_key,
+                "period": period,
+                "prev_period": prev_period,
+                "location": location,
+                "device": device,
+                "limit": limit,
+            },
+        ).fetchall()
+    finally:
+        con.close()
+    changes: dict[str, Any] = {"counts": {}, "moved": [], "new": [], "lost": [], "unchanged": []}
+    for kind, kind_count, keyword, loc, dev, position, previous_position, delta in rows:
+        changes["counts"][kind] = kind_count
+        item = {"keyword": keyword, "position": position, "previous_position": previous_position, "delta": delta}
+        for key, value in (("location", loc), ("device", dev)):
+            if value:
+                item[key] = value
+        changes[kind].append(item)
+    return changes
+
+
+# CrUX p75s per collection period for origins and URLs; CrUX data is public, so rows are shared across projects.
+CRUX_COLUMNS = ("lcp_p75_ms", "inp_p75_ms", "cls_p75")
+
+
+def _ensure_crux_metrics(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS crux_metrics (key TEXT, target TEXT, form_factor TEXT, collection_end DATE, lcp_p75_ms DOUBLE, inp_p75_ms DOUBLE, cls_p75 DOUBLE)"
+    )
+
+
+def store_crux_metrics(rows: list[dict[str, Any]]) -> None:
+    """Upsert collection-period rows ({key, target, form_factor, collection_end, <CRUX_COLUMNS>})."""
+    if not rows:
+        return
+    con = _connect()
+    try:
+        _ensure_crux_metrics(con)
+        con.execute("BEGIN TRANSACTION")
+        con.executemany(
+            "DELETE FROM crux_metrics WHERE key = ? AND target = ? AND form_factor = ? AND collection_end = ?",
+            [[r["key"], r["target"], r["form_factor"], r["collection_end"]] for r in rows],
+        )
+        con.executemany(
+            "INSERT INTO crux_metrics VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [[r["key"], r["target"], r["form_factor"], r["collection_end"], *(r.get(c) for c in CRUX_COLUMNS)] for r in rows],
+        )
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+def latest_crux_metrics(target: str, key: str = "url") -> list[dict[str, Any]]:
+    """The most recent stored collection period of a URL/origin, one row per form factor."""
+    con = _connect()
+    try:
+        _ensure_crux_metrics(con)
+        rows = con.execute(
+            f"SELECT form_factor, collection_end, {', '.join(CRUX_COLUMNS)} FROM crux_metrics "
+            "WHERE key = ? AND target = ? "
+            "QUALIFY row_number() OVER (PARTITION BY form_factor ORDER BY collection_end DESC) = 1 "
+            "ORDER BY form_factor",
+            [key, target],
+        ).fetchall()
+    finally:
+        con.close()
+    return [
+        {"form_factor": form_factor, "collection_end": end.isoformat(), **dict(zip(CRUX_COLUMNS, values))}
+        for form_factor, end, *values in rows
+    ]
+
+
+# Rybbit daily site totals; `fetched_on` tells whether a day was complete (fetched after it ended) when stored.
+def _ensure_analytics_daily(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS analytics_daily (project_key TEXT, date DATE, sessions DOUBLE, conversions DOUBLE, fetched_on DATE)"
+    )
+
+
+def store_analytics_daily(project_key: str, rows: list[dict[str, Any]], fetched_on: date) -> None:
+    """Upsert daily rows ({date, sessions, conversions}) for the days they cover."""
+    if not rows:
+        return
+    values = [[project_key, row["date"], row.get("sessions"), row.get("conversions"), fetched_on] for row in rows]
+    days = [v[1] for v in values]
+    con = _connect()
+    try:
+        _ensure_analytics_daily(con)
+        con.execute("BEGIN TRANSACTION")
         con.execute(
-            "INSERT INTO gsc_top_pages VALUES (?, ?, ?, ?, ?)",
-            [project_key, period, row.get("url"), row.get("clicks"), row.get("impressions")],
+            "DELETE FROM analytics_daily WHERE project_key = ? AND date BETWEEN ? AND ?",
+            [project_key, min(days), max(days)],
         )
+        con.executemany("INSERT INTO analytics_daily VALUES (?, ?, ?, ?, ?)", values)
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+def analytics_complete_days(project_key: str, start: date, end: date) -> set[date]:
+    """Stored days that were fetched after they ended and need no refetch."""
+    con = _connect()
+    try:
+        _ensure_analytics_daily(con)
+        rows = con.execute(
+            "SELECT date FROM analytics_daily WHERE project_key = ? AND date BETWEEN ? AND ? AND fetched_on > date",
+            [project_key, start, end],
+        ).fetchall()
+    finally:
+        con.close()
+    return {day for (day,) in rows}
+
+
+_ANALYTICS_SELECT = "sum(sessions), sum(conversions), sum(conversions) / nullif(sum(sessions), 0), count(*)"
 
+
+def _analytics_row(row: tuple[Any, ...]) -> dict[str, Any]:
+    sessions, conversions, rate, days = row
+    return {"sessions": sessions, "conversions": conversions, "conversion_rate": rate, "days": days}
+
+
+def analytics_kpis_for_window(project_key: str, start: date, end: date) -> dict[str, Any]:
+    con = _connect()
+    try:
+        _ensure_analytics_daily(con)
+        row = con.execute(
+            f"SELECT {_ANALYTICS_SELECT} FROM analytics_daily WHERE project_key = ? AND date BETWEEN ? AND ?",
+            [project_key, start, end],
+        ).fetchone()
+    finally:
+        con.close()
+    return _analytics_row(row)
+
+
+def analytics_kpis_by_grain(project_key: str, grain: str, start: date, end: date) -> list[dict[str, Any]]:
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of {', '.join(GRAINS)}")
+    con = _connect()
+    try:
+        _ensure_analytics_daily(con)
+        rows = con.execute(
+            f"SELECT CAST(date_trunc('{grain}', date) AS DATE) AS bucket, {_ANALYTICS_SELECT} FROM analytics_daily "
+            "WHERE project_key = ? AND date BETWEEN ? AND ? GROUP BY bucket ORDER BY bucket",
+            [project_key, start, end],
+        ).fetchall()
+    finally:
+        con.close()
+    return [{"bucket": bucket.isoformat(), **_analytics_row(rest)} for bucket, *rest in rows]
+
+
+# Monthly Rybbit breakdowns (dimension "page" or "source"), one row per pathname/referrer.
+ANALYTICS_ROW_COLUMNS = "{'key': 'VARCHAR', 'sessions': 'DOUBLE', 'conversions': 'DOUBLE'}"
+
+
+def _ensure_analytics_rows(con: duckdb.DuckDBPyConnection) -> None:
     con.execute(
-        "CREATE TABLE IF NOT EXISTS gsc_top_queries (project_key TEXT, period TEXT, query TEXT, clicks DOUBLE, impressions DOUBLE)"
+        "CREATE TABLE IF NOT EXISTS analytics_rows (project_key TEXT, period TEXT, dimension TEXT, key TEXT, sessions DOUBLE, conversions DOUBLE, fetched_on DATE)"
     )
-    for row in mart.get("top_queries", []):
+    # One row per fetched (period, dimension), so a breakdown that came back empty is not refetched either.
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS analytics_fetches (project_key TEXT, period TEXT, dimension TEXT, fetched_on DATE)"
+    )
+
+
+def load_analytics_rows(project_key: str, period: str, dimension: str, path: Path, fetched_on: date) -> None:
+    """Replace a period's breakdown rows for one dimension with the streamed JSONL file."""
+    con = _connect()
+    try:
+        _ensure_analytics_rows(con)
+        con.execute("BEGIN TRANSACTION")
         con.execute(
-            "INSERT INTO gsc_top_queries VALUES (?, ?, ?, ?, ?)",
-            [project_key, period, row.get("query"), row.get("clicks"), row.get("impressions")],
+            "DELETE FROM analytics_rows WHERE project_key = ? AND period = ? AND dimension = ?",
+            [project_key, period, dimension],
         )
+        if path.stat().st_size:
+            con.execute(
+                "INSERT INTO analytics_rows SELECT ?, ?, ?, key, sessions, conversions, ? "
+                f"FROM read_json(?, format='newline_delimited', columns={ANALYTICS_ROW_COLUMNS})",
+                [project_key, period, dimension, fetched_on, str(path)],
+            )
+        con.execute(
+            "DELETE FROM analytics_fetches WHERE project_key = ? AND period = ? AND dimension = ?",
+            [project_key, period, dimension],
+        )
+        con.execute("INSERT INTO analytics_fetches VALUES (?, ?, ?, ?)", [project_key, period, dimension, fetched_on])
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+def analytics_rows_fetched_on(project_key: str, period: str, dimension: str) -> date | None:
+    con = _connect()
+    try:
+        _ensure_analytics_rows(con)
+        row = con.execute(
+            "SELECT max(fetched_on) FROM analytics_fetches WHERE project_key = ? AND period = ? AND dimension = ?",
+            [project_key, period, dimension],
+        ).fetchone()
+    finally:
+        con.close()
+    return row[0]
+
 
-    con.close()
+def top_analytics_rows(project_key: str, period: str, dimension: str, limit: int) -> tuple[list[dict[str, Any]], int]:
+    """Top breakdown rows by sessions and the total row count."""
+    con = _connect()
+    try:
+        _ensure_analytics_rows(con)
+        params = [project_key, period, dimension]
+        where = "WHERE project_key = ? AND period = ? AND dimension = ?"
+        rows = con.execute(
+            f"SELECT key, sessions, conversions FROM analytics_rows {where} ORDER BY sessions DESC, key LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        count = con.execute(f"SELECT count(*) FROM analytics_rows {where}", params).fetchone()[0]
+    finally:
+        con.close()
+    return [{"key": key, "sessions": sessions, "conversions": conversions} for key, sessions, conversions in rows], count
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+
+from app.core import http
+
+
+GSC_SCOPES = ["https://www.googleapis.com/auth/webmasters.readonly"]
+# Refresh this long before Google's stated expiry so in-flight requests never carry a dead token.
+EXPIRY_MARGIN = timedelta(minutes=5)
+
+_credentials: dict[tuple[str, str], service_account.Credentials] = {}
+# One refresh lock per identity: a slow token refresh for one service account never blocks the others.
+_refresh_locks: dict[tuple[str, str], threading.Lock] = {}
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _parse_info(raw: str, mtime: float | None) -> dict[str, Any]:
+    # mtime is part of the cache key so an edited key file is picked up.
+    if mtime is not None:
+        return json.loads(Path(raw).read_text(encoding="utf-8"))
+    return json.loads(raw)
+
+
+def load_credentials_info() -> dict[str, Any]:
+    mode = os.environ.get("GSC_AUTH_MODE", "service_account").strip()
+    if mode != "service_account":
+        raise RuntimeError("GSC_AUTH_MODE oauth not implemented yet")
+    raw = os.environ.get("GSC_CREDENTIALS_JSON", "").strip()
+    if not raw:
+        raise RuntimeError("GSC_CREDENTIALS_JSON missing")
+    path = Path(raw)
+    mtime = path.stat().st_mtime if path.exists() else None
+    return dict(_parse_info(raw, mtime))
+
+
+def resolve_credentials_info() -> dict[str, Any] | None:
+    try:
+        return load_credentials_info()
+    except (RuntimeError, ValueError):
+        return None
+
+
+def _identity(info: dict[str, Any]) -> tuple[str, str]:
+    return info.get("client_email", ""), info.get("private_key_id", "")
+
+
+def credentials(info: dict[str, Any]) -> service_account.Credentials:
+    key = _identity(info)
+    with _lock:
+        creds = _credentials.get(key)
+        if creds is None:
+            creds = service_account.Credentials.from_service_account_info(info, scopes=GSC_SCOPES)
+            _credentials[key] = creds
+        return creds
+
+
+def _refresh_lock(key: tuple[str, str]) -> threading.Lock:
+    with _lock:
+        return _refresh_locks.setdefault(key, threading.Lock())
+
+
+def _is_fresh(creds: service_account.Credentials) -> bool:
+    expiry = getattr(creds, "expiry", None)
+    if not creds.token or expiry is None:
+        return False
+    # google-auth keeps expiry as naive UTC.
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return expiry - EXPIRY_MARGIN > now
+
+
+def access_token(info: dict[str, Any] | None = None) -> tuple[str, str | None]:
+    """(Bearer token, service-account email); the token is refreshed only when close to expiry."""
+    info = info if info is not None else load_credentials_info()
+    creds = credentials(info)
+    if not _is_fresh(creds):
+        with _refresh_lock(_identity(info)):
+            # Another thread may have refreshed while this one waited.
+            if not _is_fresh(creds):
+                creds.refresh(Request(session=http.session()))
+    return creds.token, getattr(creds, "service_account_email", None)
+
+
+def clear_cache() -> None:
+    with _lock:
+        _credentials.clear()
+        _refresh_locks.clear()
+    _parse_info.cache_clear()
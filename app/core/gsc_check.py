@@ -1,20 +1,13 @@
 from __future__ import annotations
 
-import json
-import os
 from dataclasses import dataclass
 from datetime import date
-from pathlib import Path
 from typing import Any
 
-import requests
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
-
+from app.core import gsc_auth, scheduler
 from app.core.time_utils import parse_period
 
 
-GSC_SCOPES = ["https://www.googleapis.com/auth/webmasters.readonly"]
 GSC_SITES_ENDPOINT = "https://searchconsole.googleapis.com/webmasters/v3/sites"
 GSC_QUERY_ENDPOINT = "https://searchconsole.googleapis.com/webmasters/v3/sites/{site_url}/searchAnalytics/query"
 
@@ -35,14 +28,12 @@ def run_gsc_check(project: dict[str, Any], month: str | None) -> CheckResult:
         ])
 
     try:
-        creds = service_account.Credentials.from_service_account_info(creds_info, scopes=GSC_SCOPES)
-        creds.refresh(Request())
+        token, _ = gsc_auth.access_token(creds_info)
     except Exception:
         return CheckResult(2, [
             "ERROR: invalid GSC credentials (check GSC_CREDENTIALS_JSON path or JSON string)",
         ])
 
-    token = creds.token
     if not token:
         return CheckResult(3, ["ERROR: could not obtain access token from GSC credentials"])
 
@@ -82,27 +73,12 @@ def run_gsc_check(project: dict[str, Any], month: str | None) -> CheckResult:
 
 
 def _resolve_credentials() -> dict[str, Any] | None:
-    mode = os.environ.get("GSC_AUTH_MODE", "service_account").strip()
-    raw = os.environ.get("GSC_CREDENTIALS_JSON", "").strip()
-    if not raw or mode != "service_account":
-        return None
-
-    path = Path(raw)
-    if path.exists():
-        try:
-            return json.loads(path.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            return None
-
-    try:
-        return json.loads(raw)
-    except json.JSONDecodeError:
-        return None
+    return gsc_auth.resolve_credentials_info()
 
 
 def _sites_list(headers: dict[str, str]) -> list[dict[str, Any]] | None:
     try:
-        res = requests.get(GSC_SITES_ENDPOINT, headers=headers, timeout=30)
+        res = scheduler.request("GET", GSC_SITES_ENDPOINT, headers=headers, timeout=30)
         res.raise_for_status()
         data = res.json()
         return data.get("siteEntry", [])
@@ -112,7 +88,8 @@ def _sites_list(headers: dict[str, str]) -> list[dict[str, Any]] | None:
 
 def _search_analytics(headers: dict[str, str], site_url: str, start_date: str, end_date: str) -> bool:
     try:
-        res = requests.post(
+        res = scheduler.request(
+            "POST",
             GSC_QUERY_ENDPOINT.format(site_url=site_url),
             headers=headers,
             json={"startDate": start_date, "endDate": end_date},
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any
+
+import requests
+import yaml
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core.config import REPO_ROOT
+
+
+HTTP_POLICY_PATH = REPO_ROOT / "configs" / "system" / "http_policy_v1.yaml"
+
+SESSION_DEFAULTS = {
+    "pool_connections": 10,
+    "pool_maxsize": 10,
+    "connect_retries": 3,
+    "read_retries": 2,
+    "backoff_factor": 0.3,
+}
+
+
+def load_http_policy() -> dict[str, Any]:
+    if not HTTP_POLICY_PATH.exists():
+        return {}
+    return yaml.safe_load(HTTP_POLICY_PATH.read_text(encoding="utf-8")) or {}
+
+
+def _adapter(cfg: dict[str, Any], pool_maxsize: int) -> HTTPAdapter:
+    # Only transport errors are retried here; 429/503 pacing belongs to the scheduler.
+    retry = Retry(
+        total=None,
+        connect=cfg["connect_retries"],
+        read=cfg["read_retries"],
+        status=0,
+        other=0,
+        backoff_factor=cfg["backoff_factor"],
+        raise_on_status=False,
+    )
+    return HTTPAdapter(pool_connections=cfg["pool_connections"], pool_maxsize=pool_maxsize, max_retries=retry)
+
+
+def build_session(policy: dict[str, Any] | None = None) -> requests.Session:
+    """Keep-alive session with one connection pool per API host, sized from http_policy_v1.yaml."""
+    policy = policy if policy is not None else load_http_policy()
+    cfg = {**SESSION_DEFAULTS, **(policy.get("session") or {})}
+    defaults = policy.get("defaults") or {}
+    session = requests.Session()
+    session.mount("https://", _adapter(cfg, cfg["pool_maxsize"]))
+    session.mount("http://", _adapter(cfg, cfg["pool_maxsize"]))
+    for host, host_cfg in (policy.get("hosts") or {}).items():
+        concurrency = (host_cfg or {}).get("max_concurrency", defaults.get("max_concurrency", 0))
+        session.mount(f"https://{host}/", _adapter(cfg, max(cfg["pool_maxsize"], concurrency)))
+    return session
+
+
+_session: requests.Session | None = None
+_session_pid: int | None = None
+_session_lock = threading.Lock()
+
+
+def session() -> requests.Session:
+    """Process-wide session; rebuilt after fork so worker processes never share sockets."""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = build_session()
+            _session_pid = os.getpid()
+        return _session
+
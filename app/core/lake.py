@@ -1,25 +1,248 @@
 from __future__ import annotations
 
+import gzip
+import io
 import json
+import os
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
+
+import duckdb
 
 from app.core.config import settings, ensure_dirs
+from app.core.policy import load_policy
+
+
+# Lake codec -> file suffix appended to `.json`. Reads go by suffix, so files written under any codec
+# (including uncompressed, pretty-printed legacy files) stay readable after the codec changes.
+CODECS = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+DEFAULT_CODEC = "gzip"
+LEVELS = {"zstd": 10, "gzip": 6}
+
+
+def lake_codec(policy: dict[str, Any] | None = None) -> str:
+    """Codec for new lake files (reporting policy `lake_rules.codec`); the policy file is read once per process."""
+    if policy is None:
+        return _policy_codec()
+    codec = (policy.get("lake_rules") or {}).get("codec", DEFAULT_CODEC)
+    if codec not in CODECS:
+        raise ValueError(f"lake_rules.codec must be one of {', '.join(CODECS)}")
+    return codec
+
+
+@lru_cache(maxsize=1)
+def _policy_codec() -> str:
+    return lake_codec(load_policy())
+
+
+def _zstd() -> Any:
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise RuntimeError("lake codec zstd needs the zstandard package (pip install '.[zstd]')") from exc
+    return zstandard
+
+
+def codec_path(path: Path, codec: str) -> Path:
+    """`name.json` -> the file name it is stored under with `codec`."""
+    return path.with_name(path.name + CODECS[codec])
+
+
+def open_lake(path: Path, mode: str, codec: str | None = None) -> IO[bytes]:
+    """Binary file object for `path` in "rb"/"wb" mode; the codec defaults to the one the suffix names."""
+    if codec is None:
+        codec = next((name for name, suffix in CODECS.items() if suffix and path.name.endswith(suffix)), "none")
+    if codec == "zstd":
+        zstd = _zstd()
+        if mode == "rb":
+            return zstd.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+        return zstd.ZstdCompressor(level=LEVELS["zstd"]).stream_writer(path.open("wb"), closefd=True)
+    if codec == "gzip":
+        return gzip.open(path, mode, compresslevel=LEVELS["gzip"]) if mode == "wb" else gzip.open(path, mode)
+    return path.open(mode)
+
+
+def open_jsonl(path: Path, mode: str = "r") -> IO[str]:
+    """Text handle on a JSONL sidecar, (de)compressed per its suffix; DuckDB's read_json takes .gz/.zst as is."""
+    return io.TextIOWrapper(open_lake(path, mode + "b"), encoding="utf-8")
+
+
+def jsonl_path(path: Path) -> Path:
+    """`name.jsonl` -> the file name a new sidecar is written under with the lake codec."""
+    return codec_path(path, lake_codec())
+
+
+def write_json(path: Path, payload: Any, codec: str | None = None) -> Path:
+    """Stream `payload` as compact JSON to `path` (a `.json` name) under the lake codec; returns the file written."""
+    codec = lake_codec() if codec is None else codec
+    target = codec_path(path, codec)
+    ensure_dirs([target.parent])
+    # Readers glob for finished files, so write next to the target and rename.
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open_lake(tmp, "wb", codec) as raw, io.TextIOWrapper(raw, encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp, target)
+    return target
+
+
+def read_json(path: Path) -> Any:
+    with open_lake(path, "rb") as f:
+        return json.load(f)
+
+
+def find_json(path: Path) -> Path | None:
+    """The stored file for `name.json` under whichever codec wrote it (the newest if several exist)."""
+    found = [p for p in (codec_path(path, codec) for codec in CODECS) if p.is_file()]
+    return max(found, key=lambda p: p.stat().st_mtime) if found else None
+
+
+def _marts_root() -> Path:
+    return settings().workspace_dir / "lake" / "marts"
 
 
 def mart_dir(project_key: str, period: str) -> Path:
-    return settings().workspace_dir / "lake" / "marts" / project_key / period
+    """Hive-style partition directory of a project's period (`project_key=<key>/period=<YYYY-MM>`)."""
+    return _marts_root() / f"project_key={project_key}" / f"period={period}"
+
+
+def _legacy_mart_path(project_key: str, period: str, name: str) -> Path:
+    # Marts used to be JSON files in <project>/<period>/; they are still read until rewritten.
+    return _marts_root() / project_key / period / f"{name}.json"
+
+
+def mart_glob(name: str) -> str:
+    """Glob over every project's and period's Parquet file of mart `name`, for read_parquet."""
+    return str(_marts_root() / "project_key=*" / "period=*" / f"{name}.parquet")
+
+
+_local = threading.local()
+
+
+def _duck() -> duckdb.DuckDBPyConnection:
+    """Per-thread in-memory DuckDB for reading and writing mart files (opening one costs more than a mart read)."""
+    if not hasattr(_local, "con"):
+        _local.con = duckdb.connect()
+    return _local.con
+
+
+def _sql_str(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _sql_ident(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
 
 
 def write_mart(project_key: str, period: str, name: str, payload: dict[str, Any]) -> Path:
-    path = mart_dir(project_key, period) / f"{name}.json"
+    """One Parquet row per mart; each top-level field is a JSON column, so scans read only the fields they use."""
+    path = mart_dir(project_key, period) / f"{name}.parquet"
     ensure_dirs([path.parent])
-    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    columns = ", ".join(f"CAST(? AS JSON) AS {_sql_ident(key)}" for key in payload) or "NULL::JSON AS _empty"
+    _duck().execute(
+        f"COPY (SELECT {columns}) TO {_sql_str(str(tmp))} (FORMAT PARQUET, COMPRESSION ZSTD)",
+        [json.dumps(value) for value in payload.values()],
+    )
+    os.replace(tmp, path)
     return path
 
 
+def _mart_row(names: list[str], values: tuple[Any, ...]) -> dict[str, Any]:
+    # NULL (not JSON null) is a field that this period's mart does not have.
+    return {name: None if value is None else json.loads(value) for name, value in zip(names, values) if name != "_empty"}
+
+
 def load_mart(project_key: str, period: str, name: str) -> dict[str, Any] | None:
-    path = mart_dir(project_key, period) / f"{name}.json"
-    if not path.exists():
-        return None
-    return json.loads(path.read_text(encoding="utf-8"))
+    path = mart_dir(project_key, period) / f"{name}.parquet"
+    if not path.is_file():
+        legacy = find_json(_legacy_mart_path(project_key, period, name))
+        return None if legacy is None else read_json(legacy)
+    cursor = _duck().execute(f"SELECT * FROM read_parquet({_sql_str(str(path))}, hive_partitioning = false)")
+    return _mart_row([d[0] for d in cursor.description], cursor.fetchone())
+
+
+def _in_scope(
+    project_key: str, period: str, project_keys: list[str] | None, from_period: str | None, to_period: str | None
+) -> bool:
+    if project_keys is not None and project_key not in project_keys:
+        return False
+    return (not from_period or period >= from_period) and (not to_period or period <= to_period)
+
+
+def _legacy_marts(
+    name: str, project_keys: list[str] | None, from_period: str | None, to_period: str | None
+) -> dict[tuple[str, str], Path]:
+    """JSON marts from before the Parquet layout, by (project_key, period)."""
+    found = {}
+    for path in _marts_root().glob(f"*/*/{name}.json*"):
+        project_key, period = path.parent.parent.name, path.parent.name
+        if not path.name.endswith(".tmp") and _in_scope(project_key, period, project_keys, from_period, to_period):
+            found.setdefault((project_key, period), find_json(_legacy_mart_path(project_key, period, name)))
+    return {key: path for key, path in found.items() if path is not None}
+
+
+def scan_marts(
+    name: str,
+    fields: list[str] | None = None,
+    project_keys: list[str] | None = None,
+    from_period: str | None = None,
+    to_period: str | None = None,
+) -> list[dict[str, Any]]:
+    """Mart `name` for many projects and periods in one Parquet scan, ordered by project and period.
+
+    Each row is {project_key, period, <field>: value}; `fields` limits the columns read (default: all).
+    Periods whose mart lacks a requested field get None for it. Periods only stored as legacy JSON marts are
+    read from those files, as load_mart does.
+    """
+    source = (
+        f"read_parquet({_sql_str(mart_glob(name))}, hive_partitioning = true, union_by_name = true, "
+        "hive_types = {'project_key': VARCHAR, 'period': VARCHAR})"
+    )
+    try:
+        columns = [row[0] for row in _duck().execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+    except duckdb.IOException:
+        # No Parquet file of this mart yet.
+        columns = None
+
+    results = []
+    if columns is not None:
+        where, params = [], []
+        if project_keys is not None:
+            where.append(f"project_key IN ({', '.join('?' for _ in project_keys)})" if project_keys else "false")
+            params += project_keys
+        if from_period:
+            where.append("period >= ?")
+            params.append(from_period)
+        if to_period:
+            where.append("period <= ?")
+            params.append(to_period)
+        if fields is None:
+            select = "*"
+        else:
+            # A field that no file of the mart has yet is projected as NULL instead of failing the scan.
+            select = ", ".join(
+                ["project_key", "period"]
+                + [_sql_ident(f) if f in columns else f"NULL::JSON AS {_sql_ident(f)}" for f in fields]
+            )
+        sql = f"SELECT {select} FROM {source}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        cursor = _duck().execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        for row in cursor.fetchall():
+            values = dict(zip(names, row))
+            key, period = values.pop("project_key"), values.pop("period")
+            results.append({"project_key": key, "period": period, **_mart_row(list(values), tuple(values.values()))})
+
+    stored = {(row["project_key"], row["period"]) for row in results}
+    for (key, period), path in _legacy_marts(name, project_keys, from_period, to_period).items():
+        if (key, period) in stored:
+            continue
+        mart = read_json(path)
+        if fields is not None:
+            mart = {field: mart.get(field) for field in fields}
+        results.append({"project_key": key, "period": period, **mart})
+    results.sort(key=lambda row: (row["project_key"], row["period"]))
+    return results
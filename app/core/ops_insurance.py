@@ -10,9 +10,11 @@ from typing import Any
 
 from app.core.config import REPO_ROOT
 from app.core.manifest import load_manifest, required_env_vars, hard_disabled_sources
+from app.core.pipeline import build_graph
 from app.core.policy import load_policy, resolve_period
 from app.core.project import project_path
 from app.core.registry import load_sources_registry
+from app.extractors.base import RunContext
 
 
 @dataclass(frozen=True)
@@ -130,30 +132,17 @@ def _doctor_expectations(project: dict[str, Any], env_map: dict[str, list[str]])
 
 
 def _pipeline_steps(
-    period: str | None,
-    language: str | None,
+    project: dict[str, Any],
+    project_key: str,
+    period: str,
     mock: bool,
-    output_dir: Path | None,
+    output_dir: Path,
 ) -> list[dict[str, Any]]:
-    outputs = []
-    if output_dir and period:
-        outputs = [
-            str(output_dir / "report.md"),
-            str(output_dir / "report_payload.json"),
-            str(output_dir / "actions_debug.json"),
-            str(output_dir / "notion_fields.md"),
-            str(output_dir / "template_trace.json"),
-            str(output_dir / "run_trace.json"),
-        ]
-    return [
-        {"name": "load manifest", "inputs": ["configs/system/system_manifest_v1.yaml"], "outputs": [], "mode": "mock" if mock else "real"},
-        {"name": "load project", "inputs": ["workspace/projects/<project_key>/project.json"], "outputs": [], "mode": "mock" if mock else "real"},
-        {"name": "extract sources", "inputs": ["enabled sources"], "outputs": [], "mode": "mock" if mock else "real"},
-        {"name": "build payload", "inputs": ["raw marts"], "outputs": [], "mode": "mock" if mock else "real"},
-        {"name": "evaluate actions", "inputs": ["payload", "rules"], "outputs": [], "mode": "mock" if mock else "real"},
-        {"name": "render template", "inputs": ["template", "payload"], "outputs": [], "mode": "mock" if mock else "real"},
-        {"name": "write outputs", "inputs": [], "outputs": outputs, "mode": "mock" if mock else "real"},
-    ]
+    # Listed from the stage graph itself, so the names match the stages in run_trace.json.
+    ctx = RunContext(project_key=project_key, period=period, run_id="plan", mock=mock)
+    graph = build_graph(project, ctx, project_path(project_key).parent, output_dir)
+    mode = "mock" if mock else "real"
+    return [{**step, "mode": mode} for step in graph.plan()]
 
 
 def snapshot(
@@ -174,6 +163,9 @@ def snapshot(
     if month:
         period_resolution = _period_resolution(policy, month, language)
         output_dir = _output_dir(effective_project, period_resolution["resolved"], language)
+    # Without a month the stages are listed for the period `--month auto` would pick.
+    planned_period = period_resolution["resolved"] if period_resolution else resolve_period(policy, "auto", language).period
+    planned_dir = output_dir or _output_dir(effective_project, planned_period, language)
 
     template = _template_selection(manifest, language)
     rules_path = manifest.get("paths", {}).get("rules", {}).get("actions_v1")
@@ -194,12 +186,7 @@ def snapshot(
             "files": [rules_path],
             "thresholds": effective_project.get("thresholds", {}),
         },
-        "pipeline": _pipeline_steps(
-            period_resolution["resolved"] if period_resolution else None,
-            language,
-            mock,
-            output_dir,
-        ),
+        "pipeline": _pipeline_steps(effective_project, project_key, planned_period, mock, planned_dir),
         "output_layout": {
             "output_dir": str(output_dir) if output_dir else None,
             "lang": language,
@@ -327,7 +314,7 @@ def audit_export(
     else:
         planned = {
             "status": "planned",
-            "steps": _pipeline_steps(period_resolution["resolved"], language, mock, output_dir),
+            "steps": _pipeline_steps(effective_project, project_key, period_resolution["resolved"], mock, output_dir),
             "artifacts": [
                 str(output_dir / "report.md"),
                 str(output_dir / "report_payload.json"),
@@ -79,4 +79,6 @@ def build_payload(
     }
     if "cwv" in marts:
         payload["kpis"]["cwv"] = marts.get("cwv") or {}
+    if "psi" in marts:
+        payload["kpis"]["psi"] = marts.get("psi") or {}
     return payload
@@ -2,29 +2,35 @@ from __future__ import annotations
 
 import csv
 import json
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 import typer
 
 from app.core.config import ensure_dirs
-from app.core.lake import write_mart
-from app.core.duckdb_store import store_gsc
+from app.core.lake import load_mart, read_json, write_mart
+from app.core.duckdb_store import ranking_positions_digest, store_gsc
 from app.core.payload import build_payload
 from app.core.actions import build_actions_debug
 from app.core.manifest import load_manifest, hard_disabled_sources
+from app.core.policy import load_policy, period_is_final
 from app.core.schemas import payload_schema_path, project_schema_path, validate_json
-from app.extractors.base import RunContext
+from app.core.stage_cache import StageCache, config_digest, file_digest, render_digest
+from app.core.stages import Stage, StageGraph, StageSkipped
+from app.core.time_utils import prev_period
+from app.extractors.base import RunContext, latest_raw_path, read_latest_raw
 from app.extractors import gsc as gsc_extractor
 from app.extractors import dataforseo as dataforseo_extractor
 from app.extractors import pagespeed as pagespeed_extractor
 from app.extractors import crux as crux_extractor
 from app.extractors import rybbit as rybbit_extractor
-from app.render.report import render_report
+from app.render.report import build_template_trace, render_report
 from app.transforms import gsc as gsc_transform
 from app.transforms import rankings as rankings_transform
 from app.transforms import cwv as cwv_transform
+from app.transforms import psi as psi_transform
 from app.transforms import analytics as analytics_transform
 from app.exports.notion import export_notion_fields, sync_notion
 
@@ -49,133 +55,450 @@ def _load_keywords(project_dir: Path) -> list[str]:
     return keywords
 
 
-def run(project_path: Path, period: str, mock: bool = False, lang_override: str | None = None) -> Path:
-    project = _load_project(project_path)
-    if lang_override:
-        project["report_language"] = lang_override
-    project_key = project["project_key"]
-    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+# Source -> (payload key, mart file name) for sources that produce a mart.
+SOURCE_MARTS = {
+    "gsc": ("gsc", "gsc_monthly"),
+    "dataforseo": ("rankings", "rankings_monthly"),
+    "pagespeed": ("psi", "psi_monthly"),
+    "crux": ("cwv", "cwv_monthly"),
+    "rybbit": ("analytics", "analytics_monthly"),
+}
+
+# Source -> name reported in missing_sources when the source yields nothing.
+MISSING_KEYS = {
+    "gsc": "gsc",
+    "dataforseo": "rankings",
+    "pagespeed": "pagespeed",
+    "crux": "cwv",
+    "rybbit": "analytics",
+}
+
+
+def _extract_gsc(project: dict[str, Any], ctx: RunContext, project_dir: Path, prefetched: dict[str, Any]) -> dict[str, Any]:
+    return gsc_extractor.run(project, ctx, data=prefetched.get("gsc"))
+
+
+def _extract_dataforseo(
+    project: dict[str, Any], ctx: RunContext, project_dir: Path, prefetched: dict[str, Any]
+) -> dict[str, Any]:
+    keywords = _load_keywords(project_dir)
+    if not keywords:
+        raise StageSkipped("DataForSEO: keywords.csv missing or empty.")
+    return dataforseo_extractor.run(project, ctx, keywords)
+
+
+def _extract_pagespeed(
+    project: dict[str, Any], ctx: RunContext, project_dir: Path, prefetched: dict[str, Any]
+) -> dict[str, Any]:
+    return pagespeed_extractor.run(project, ctx)
+
+
+def _extract_crux(project: dict[str, Any], ctx: RunContext, project_dir: Path, prefetched: dict[str, Any]) -> dict[str, Any]:
+    return crux_extractor.run(project, ctx)
+
+
+def _extract_rybbit(
+    project: dict[str, Any], ctx: RunContext, project_dir: Path, prefetched: dict[str, Any]
+) -> dict[str, Any]:
+    return rybbit_extractor.run(project, ctx)
+
+
+# Declaration order is also the order source warnings appear in the payload.
+SOURCE_EXTRACTORS: dict[str, Callable[[dict[str, Any], RunContext, Path, dict[str, Any]], dict[str, Any]]] = {
+    "gsc": _extract_gsc,
+    "dataforseo": _extract_dataforseo,
+    "pagespeed": _extract_pagespeed,
+    "crux": _extract_crux,
+    "rybbit": _extract_rybbit,
+}
+
+SOURCE_TRANSFORMS: dict[str, Callable[[dict[str, Any], dict[str, Any], str], dict[str, Any]]] = {
+    "gsc": lambda raw, project, period: gsc_transform.to_mart(raw),
+    "dataforseo": lambda raw, project, period: rankings_transform.to_mart(
+        raw, project.get("domain", ""), project["project_key"], period
+    ),
+    "pagespeed": lambda raw, project, period: psi_transform.to_mart(raw),
+    "crux": lambda raw, project, period: cwv_transform.from_crux(raw),
+    "rybbit": lambda raw, project, period: analytics_transform.from_rybbit(raw),
+}
+
+
+class SourceIssues:
+    """Warnings/missing sources reported by source stages, possibly from several threads."""
 
-    ctx = RunContext(project_key=project_key, period=period, run_id=run_id, mock=mock)
-    hard_disabled = hard_disabled_sources(load_manifest())
-    marts: dict[str, Any] = {}
-    missing_sources: list[str] = []
-    warnings: list[str] = []
-
-    if project.get("sources", {}).get("gsc", {}).get("enabled") and "gsc" not in hard_disabled:
-        gsc_raw = gsc_extractor.run(project, ctx)
-        gsc_mart = gsc_transform.to_mart(gsc_raw)
-        write_mart(project_key, period, "gsc_monthly", gsc_mart)
-        store_gsc(project_key, period, gsc_mart)
-        marts["gsc"] = gsc_mart
-
-    if project.get("sources", {}).get("dataforseo", {}).get("enabled") and "dataforseo" not in hard_disabled:
-        keywords = _load_keywords(project_path.parent)
-        if keywords:
-            df_raw = dataforseo_extractor.run(project, ctx, keywords)
-            df_mart = rankings_transform.to_mart(df_raw, project.get("domain", ""))
-            write_mart(project_key, period, "rankings_monthly", df_mart)
-            marts["rankings"] = df_mart
-        else:
-            warnings.append("DataForSEO: keywords.csv missing or empty.")
-            missing_sources.append("rankings")
-
-    if project.get("sources", {}).get("pagespeed", {}).get("enabled") and "pagespeed" not in hard_disabled:
-        pagespeed_extractor.run(project, ctx)
-
-    if project.get("sources", {}).get("crux", {}).get("enabled") and "crux" not in hard_disabled:
-        crux_raw = crux_extractor.run(project, ctx)
-        cwv_mart = cwv_transform.from_crux(crux_raw)
-        write_mart(project_key, period, "cwv_monthly", cwv_mart)
-        marts["cwv"] = cwv_mart
-
-    if project.get("sources", {}).get("rybbit", {}).get("enabled") and "rybbit" not in hard_disabled:
-        rybbit_raw = rybbit_extractor.run(project, ctx)
-        analytics_mart = analytics_transform.from_rybbit(rybbit_raw)
-        write_mart(project_key, period, "analytics_monthly", analytics_mart)
-        marts["analytics"] = analytics_mart
-
-    payload = build_payload(project, period, marts, missing_sources, warnings)
-    manifest = load_manifest()
-    actions, actions_debug = build_actions_debug(payload, project, manifest)
-    payload["actions"] = actions
-    validate_json(payload, payload_schema_path(), "report_payload.json")
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_source: dict[str, str] = {}
 
+    def add(self, source: str, warning: str) -> None:
+        with self._lock:
+            self._by_source[source] = warning
+
+    def warnings(self) -> list[str]:
+        return [self._by_source[s] for s in SOURCE_EXTRACTORS if s in self._by_source]
+
+    def missing(self) -> list[str]:
+        return [MISSING_KEYS[s] for s in SOURCE_EXTRACTORS if s in self._by_source]
+
+
+def enabled_sources(project: dict[str, Any], hard_disabled: set[str]) -> list[str]:
+    return [
+        name
+        for name in SOURCE_EXTRACTORS
+        if project.get("sources", {}).get(name, {}).get("enabled") and name not in hard_disabled
+    ]
+
+
+def output_dir_for(project: dict[str, Any], period: str) -> Path:
     output_root = Path(project["output_path"]).expanduser().resolve()
     language = project.get("report_language")
-    output_dir = output_root / period / language if language else output_root / period
-    ensure_dirs([output_dir])
-
-    report_path = output_dir / "report.md"
-    if report_path.exists():
-        suffix = language if language else "default"
-        typer.secho(
-            f"WARNING: overwriting existing report for {period}/{suffix}",
-            fg=typer.colors.YELLOW,
+    return output_root / period / language if language else output_root / period
+
+
+def _read_outputs(output_dir: Path, names: dict[str, str]) -> dict[str, Any] | None:
+    loaded = {}
+    for artifact, filename in names.items():
+        path = output_dir / filename
+        if not path.exists():
+            return None
+        text = path.read_text(encoding="utf-8")
+        loaded[artifact] = json.loads(text) if filename.endswith(".json") else text
+    return loaded
+
+
+def _without_generated_at(inputs: dict[str, Any]) -> dict[str, Any]:
+    # The run timestamp changes with every payload build; it must not invalidate actions and render.
+    keyed = {}
+    for name, value in inputs.items():
+        if isinstance(value, dict) and isinstance(value.get("meta"), dict):
+            value = {**value, "meta": {k: v for k, v in value["meta"].items() if k != "generated_at"}}
+        keyed[name] = value
+    return keyed
+
+
+def _project_fingerprint(project: dict[str, Any]) -> dict[str, Any]:
+    # Where the report is written does not change what it contains.
+    return {k: v for k, v in project.items() if k != "output_path"}
+
+
+def build_graph(
+    project: dict[str, Any],
+    ctx: RunContext,
+    project_dir: Path,
+    output_dir: Path,
+    prefetched: dict[str, Any] | None = None,
+    issues: SourceIssues | None = None,
+) -> StageGraph:
+    """Declare the report pipeline as stages with named input/output artifacts."""
+    prefetched = prefetched or {}
+    issues = issues if issues is not None else SourceIssues()
+    sources = enabled_sources(project, hard_disabled_sources(load_manifest()))
+    project_key, period = ctx.project_key, ctx.period
+    fingerprint = _project_fingerprint(project)
+    configs = config_digest()
+    # Live data for an open month keeps changing, so extraction is only cached once the period is final.
+    extract_cacheable = ctx.mock or period_is_final(load_policy(), period)
+    stages: list[Stage] = []
+
+    for source in sources:
+        stages.append(
+            Stage(
+                f"extract:{source}",
+                _extract_fn(source, project, ctx, project_dir, prefetched, issues),
+                outputs=(f"raw:{source}",),
+                optional_inputs=_extract_after(source, project, sources),
+                load=_raw_loader(source, ctx),
+                cache_key=_extract_cache_key(source, fingerprint, ctx, project_dir, prefetched, extract_cacheable),
+                # The latest raw file is the one just written, or the one replayed.
+                encode=lambda outputs, source=source: {"raw_path": str(latest_raw_path(source, ctx))},
+                decode=_raw_pointer_decoder(source),
+            )
+        )
+        if source in SOURCE_TRANSFORMS:
+            key, mart_name = SOURCE_MARTS[source]
+            stages.append(
+                Stage(
+                    f"transform:{source}",
+                    _transform_fn(source, project, project_key, period),
+                    inputs=(f"raw:{source}",),
+                    outputs=(f"mart:{key}",),
+                    load=_mart_loader(key, mart_name, project_key, period),
+                    cache_key=_transform_cache_key(source, fingerprint, project_key, period),
+                    decode=_mart_restorer(mart_name, project_key, period),
+                )
+            )
+
+    if "gsc" in sources:
+        stages.append(
+            Stage(
+                "store:gsc",
+                lambda inputs: {"warehouse:gsc": store_gsc(project_key, period, inputs["mart:gsc"])},
+                inputs=("mart:gsc",),
+                outputs=("warehouse:gsc",),
+                cache_key=lambda: {"project_key": project_key, "period": period},
+            )
+        )
+
+    mart_inputs = tuple(f"mart:{SOURCE_MARTS[s][0]}" for s in sources if s in SOURCE_TRANSFORMS)
+
+    def payload_fn(inputs: dict[str, Any]) -> dict[str, Any]:
+        marts = {name.split(":", 1)[1]: mart for name, mart in inputs.items()}
+        missing = issues.missing()
+        for source in sources:
+            key = SOURCE_MARTS[source][0] if source in SOURCE_MARTS else None
+            if key and key not in marts and MISSING_KEYS[source] not in missing:
+                missing.append(MISSING_KEYS[source])
+        return {"payload": build_payload(project, period, marts, missing, issues.warnings())}
+
+    def payload_cache_key() -> dict[str, Any]:
+        # Resolved after the source stages, so issues are final; build_payload also reads last month's GSC mart.
+        return {
+            "project": fingerprint,
+            "period": period,
+            "configs": configs,
+            "issues": [issues.missing(), issues.warnings()],
+            "prev_gsc": load_mart(project_key, prev_period(period), "gsc_monthly") if "gsc" in sources else None,
+        }
+
+    stages.append(
+        Stage(
+            "payload",
+            payload_fn,
+            optional_inputs=mart_inputs,
+            outputs=("payload",),
+            load=lambda: _read_outputs(output_dir, {"payload": "report_payload.json"}),
+            cache_key=payload_cache_key,
         )
+    )
 
-    payload_path = output_dir / "report_payload.json"
-    payload_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    def actions_fn(inputs: dict[str, Any]) -> dict[str, Any]:
+        payload = dict(inputs["payload"])
+        actions, actions_debug = build_actions_debug(payload, project, load_manifest())
+        payload["actions"] = actions
+        validate_json(payload, payload_schema_path(), "report_payload.json")
+        return {"report_payload": payload, "actions_debug": actions_debug}
+
+    stages.append(
+        Stage(
+            "actions",
+            actions_fn,
+            inputs=("payload",),
+            outputs=("report_payload", "actions_debug"),
+            load=lambda: _read_outputs(
+                output_dir, {"report_payload": "report_payload.json", "actions_debug": "actions_debug.json"}
+            ),
+            cache_key=lambda: {"project": fingerprint, "configs": configs},
+            key_inputs=_without_generated_at,
+        )
+    )
 
-    report_md = render_report(payload)
-    report_path.write_text(report_md, encoding="utf-8")
+    def render_fn(inputs: dict[str, Any]) -> dict[str, Any]:
+        payload = inputs["report_payload"]
+        return {
+            "report_md": render_report(payload),
+            "notion_md": export_notion_fields(payload),
+            "template_trace": build_template_trace(payload, load_manifest()),
+        }
 
-    (output_dir / "actions_debug.json").write_text(
-        json.dumps(actions_debug, indent=2),
-        encoding="utf-8",
+    stages.append(
+        Stage(
+            "render",
+            render_fn,
+            inputs=("report_payload",),
+            outputs=("report_md", "notion_md", "template_trace"),
+            load=lambda: _read_outputs(
+                output_dir,
+                {"report_md": "report.md", "notion_md": "notion_fields.md", "template_trace": "template_trace.json"},
+            ),
+            cache_key=lambda: {"render": render_digest()},
+            key_inputs=_without_generated_at,
+        )
     )
 
-    notion_md = export_notion_fields(payload)
-    (output_dir / "notion_fields.md").write_text(notion_md, encoding="utf-8")
-    try:
-        sync_notion(payload)
-    except Exception:
-        warnings.append("Notion sync failed.")
+    def write_fn(inputs: dict[str, Any]) -> dict[str, Any]:
+        ensure_dirs([output_dir])
+        if (output_dir / "report.md").exists():
+            typer.secho(
+                f"WARNING: overwriting existing report for {period}/{project.get('report_language') or 'default'}",
+                fg=typer.colors.YELLOW,
+            )
+        files = {
+            "report_payload.json": json.dumps(inputs["report_payload"], indent=2),
+            "report.md": inputs["report_md"],
+            "actions_debug.json": json.dumps(inputs["actions_debug"], indent=2),
+            "notion_fields.md": inputs["notion_md"],
+            "template_trace.json": json.dumps(inputs["template_trace"], indent=2),
+        }
+        for name, content in files.items():
+            (output_dir / name).write_text(content, encoding="utf-8")
+        return {"output_files": [str(output_dir / name) for name in files]}
 
-    template_key = manifest.get("defaults", {}).get("template_by_language", {}).get(
-        payload.get("meta", {}).get("report_language", "de")
+    stages.append(
+        Stage(
+            "write_outputs",
+            write_fn,
+            inputs=("report_payload", "actions_debug", "report_md", "notion_md", "template_trace"),
+            outputs=("output_files",),
+        )
     )
-    template_path = manifest.get("paths", {}).get("templates", {}).get(template_key)
-    template_trace = {
-        "lang": payload.get("meta", {}).get("report_language", "de"),
-        "template_key": template_key,
-        "template_path": template_path,
-        "output_filenames": [
-            "report.md",
-            "report_payload.json",
-            "actions_debug.json",
-            "notion_fields.md",
-            "template_trace.json",
-            "run_trace.json",
-        ],
-        "variable_sections": sorted(payload.keys()),
-        "render_timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-    }
-    (output_dir / "template_trace.json").write_text(
-        json.dumps(template_trace, indent=2),
-        encoding="utf-8",
+    stages.append(
+        Stage(
+            "notion_sync",
+            lambda inputs: {"notion_page": sync_notion(inputs["report_payload"])},
+            inputs=("report_payload",),
+            outputs=("notion_page",),
+        )
     )
+    return StageGraph(stages)
+
+
+# Source -> setting that makes it audit the month's top GSC pages, which are in the warehouse once GSC has run.
+TOP_PAGE_SETTINGS = {"pagespeed": "top_pages", "crux": "top_urls"}
+
+
+def _extract_after(source: str, project: dict[str, Any], sources: list[str]) -> tuple[str, ...]:
+    setting = TOP_PAGE_SETTINGS.get(source)
+    if setting and "gsc" in sources and project["sources"][source].get(setting):
+        return ("raw:gsc",)
+    return ()
+
+
+def _extract_fn(
+    source: str,
+    project: dict[str, Any],
+    ctx: RunContext,
+    project_dir: Path,
+    prefetched: dict[str, Any],
+    issues: SourceIssues,
+) -> Callable[[dict[str, Any]], dict[str, Any]]:
+    def fn(inputs: dict[str, Any]) -> dict[str, Any]:
+        try:
+            return {f"raw:{source}": SOURCE_EXTRACTORS[source](project, ctx, project_dir, prefetched)}
+        except StageSkipped as exc:
+            issues.add(source, str(exc))
+            raise
+        except Exception as exc:
+            issues.add(source, f"{source}: extraction failed ({exc})")
+            raise
+    return fn
+
+
+def _transform_fn(
+    source: str, project: dict[str, Any], project_key: str, period: str
+) -> Callable[[dict[str, Any]], dict[str, Any]]:
+    key, mart_name = SOURCE_MARTS[source]
+
+    def fn(inputs: dict[str, Any]) -> dict[str, Any]:
+        mart = SOURCE_TRANSFORMS[source](inputs[f"raw:{source}"], project, period)
+        write_mart(project_key, period, mart_name, mart)
+        return {f"mart:{key}": mart}
+    return fn
+
+
+def _extract_cache_key(
+    source: str,
+    fingerprint: dict[str, Any],
+    ctx: RunContext,
+    project_dir: Path,
+    prefetched: dict[str, Any],
+    cacheable: bool,
+) -> Callable[[], dict[str, Any] | None]:
+    def key() -> dict[str, Any] | None:
+        if not cacheable or source in prefetched:
+            return None
+        extra = {"project": fingerprint, "period": ctx.period, "mock": ctx.mock}
+        if source == "dataforseo":
+            extra["keywords"] = file_digest(project_dir / "keywords.csv")
+        return extra
+    return key
+
+
+def _transform_cache_key(
+    source: str, fingerprint: dict[str, Any], project_key: str, period: str
+) -> Callable[[], dict[str, Any]]:
+    def key() -> dict[str, Any]:
+        extra: dict[str, Any] = {"project": fingerprint}
+        if source == "dataforseo":
+            # Deltas are computed against last month's stored positions.
+            extra["prev_positions"] = ranking_positions_digest(project_key, prev_period(period))
+        return extra
+    return key
+
+
+def _raw_pointer_decoder(source: str) -> Callable[[dict[str, Any]], dict[str, Any] | None]:
+    # Raw payloads stay in the lake; the cache only records which file a run produced.
+    def decode(cached: dict[str, Any]) -> dict[str, Any] | None:
+        path = Path(cached.get("raw_path", ""))
+        if not path.is_file():
+            return None
+        return {f"raw:{source}": read_json(path)}
+    return decode
+
+
+def _mart_restorer(mart_name: str, project_key: str, period: str) -> Callable[[dict[str, Any]], dict[str, Any]]:
+    def decode(cached: dict[str, Any]) -> dict[str, Any]:
+        if load_mart(project_key, period, mart_name) is None:
+            write_mart(project_key, period, mart_name, next(iter(cached.values())))
+        return cached
+    return decode
+
+
+def _raw_loader(source: str, ctx: RunContext) -> Callable[[], dict[str, Any] | None]:
+    def load() -> dict[str, Any] | None:
+        raw = read_latest_raw(source, ctx)
+        return None if raw is None else {f"raw:{source}": raw}
+    return load
+
+
+def _mart_loader(key: str, mart_name: str, project_key: str, period: str) -> Callable[[], dict[str, Any] | None]:
+    def load() -> dict[str, Any] | None:
+        mart = load_mart(project_key, period, mart_name)
+        return None if mart is None else {f"mart:{key}": mart}
+    return load
+
+
+def run(
+    project_path: Path,
+    period: str,
+    mock: bool = False,
+    lang_override: str | None = None,
+    source_workers: int = 1,
+    prefetched: dict[str, Any] | None = None,
+    start_at: str | None = None,
+    use_cache: bool = True,
+    replay: bool = False,
+    replay_ttl_s: float | None = None,
+) -> Path:
+    project = _load_project(project_path)
+    if lang_override:
+        project["report_language"] = lang_override
+    project_key = project["project_key"]
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    ctx = RunContext(
+        project_key=project_key,
+        period=period,
+        run_id=run_id,
+        mock=mock,
+        replay=replay,
+        replay_ttl_s=replay_ttl_s,
+    )
+    output_dir = output_dir_for(project, period)
+    graph = build_graph(project, ctx, project_path.parent, output_dir, prefetched=prefetched)
+    cache = StageCache() if use_cache else None
+    artifacts, records = graph.run(workers=source_workers, start_at=start_at, cache=cache)
+
+    # Outputs are the contract of this function: a failure there is fatal, unlike a failed source.
+    for record in records:
+        if record.name in {"actions", "render", "write_outputs"} and record.status in {"failed", "skipped", "unavailable"}:
+            raise RuntimeError(f"stage {record.name} {record.status}: {record.error}")
 
     run_trace = {
-        "steps": [
-            {"name": "load manifest", "status": "done"},
-            {"name": "load project", "status": "done"},
-            {"name": "extract sources", "status": "done"},
-            {"name": "build payload", "status": "done"},
-            {"name": "evaluate actions", "status": "done"},
-            {"name": "render template", "status": "done"},
-            {
-                "name": "write outputs",
-                "status": "done",
-                "artifacts": [
-                    str(output_dir / "report.md"),
-                    str(output_dir / "report_payload.json"),
-                    str(output_dir / "actions_debug.json"),
-                    str(output_dir / "notion_fields.md"),
-                    str(output_dir / "template_trace.json"),
-                ],
-            },
-        ]
+        "run_id": run_id,
+        "start_at": start_at,
+        "workers": source_workers,
+        "cache": use_cache,
+        "steps": [record.to_dict() for record in records],
     }
     (output_dir / "run_trace.json").write_text(json.dumps(run_trace, indent=2), encoding="utf-8")
 
@@ -1,14 +1,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date, datetime
 from typing import Any
 from zoneinfo import ZoneInfo
 
 import yaml
 
 from app.core.config import REPO_ROOT
-from app.core.time_utils import iter_months, parse_period
+from app.core.time_utils import DateWindow, iter_months, next_period, parse_period, parse_window
 
 
 POLICY_PATH = REPO_ROOT / "configs" / "system" / "reporting_policy_v1.yaml"
@@ -50,3 +50,27 @@ def resolve_period(policy: dict[str, Any], month_arg: str, language: str) -> Per
 
 def iter_periods(from_month: str, to_month: str) -> list[str]:
     return iter_months(from_month, to_month)
+
+
+def period_is_final(policy: dict[str, Any], period: str, today: date | None = None) -> bool:
+    """True once the month is over and past the safe generation day (source data no longer changes)."""
+    safe_day = policy.get("period_rules", {}).get("safe_generation_day_of_month", 5)
+    final_from = parse_period(next_period(period)).start.replace(day=safe_day)
+    if today is None:
+        today = policy_today(policy)
+    return today >= final_from
+
+
+def resolve_window(policy: dict[str, Any], spec: str) -> DateWindow:
+    """Like resolve_period, but also accepts week/quarter/range/mtd windows (mtd uses the policy timezone)."""
+    if spec == "auto":
+        return parse_window(resolve_period(policy, spec, "en").period)
+    return parse_window(spec, today=policy_today(policy))
+
+
+def policy_today(policy: dict[str, Any]) -> date:
+    return datetime.now(ZoneInfo(policy.get("timezone", "UTC"))).date()
+
+
+def gsc_final_lag_days(policy: dict[str, Any]) -> int:
+    return int(policy.get("period_rules", {}).get("gsc_final_lag_days", 3))
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+
+from app.core import http
+from app.core.http import load_http_policy
+
+
+THROTTLE_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+@dataclass(frozen=True)
+class HostLimits:
+    qps: float = 5.0
+    burst: float = 5.0
+    max_concurrency: int = 4
+    min_qps: float = 0.2
+    additive_increase: float = 0.1
+    decrease_factor: float = 0.5
+    max_retries: int = 4
+    max_backoff_s: float = 60.0
+
+
+class Limiter:
+    """Token bucket with AIMD rate control plus a concurrency cap, for one (host, credential)."""
+
+    def __init__(self, limits: HostLimits) -> None:
+        self.limits = limits
+        self.rate = limits.qps
+        self._tokens = limits.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, limits.max_concurrency))
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.limits.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.limits.qps, self.rate + self.limits.additive_increase)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.limits.min_qps, self.rate * self.limits.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)
+
+    def take_slot(self) -> None:
+        self._slots.acquire()
+
+    def release_slot(self) -> None:
+        self._slots.release()
+
+    def __enter__(self) -> "Limiter":
+        self.take_slot()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release_slot()
+
+
+class QuotaServer:
+    """Limiters for every (host, credential), shared by `generate --all` worker processes through a manager.
+
+    Workers hold proxies to one QuotaServer, so the configured qps and concurrency apply to the whole batch
+    and quota that an idle or finished worker does not use is available to the others.
+    """
+
+    def __init__(self, policy: dict[str, Any] | None = None) -> None:
+        self._scheduler = Scheduler(policy)
+
+    def _limiter(self, host: str, key: str) -> Limiter:
+        return self._scheduler.limiter_for_key(host, key)
+
+    def acquire(self, host: str, key: str) -> None:
+        self._limiter(host, key).acquire()
+
+    def take_slot(self, host: str, key: str) -> None:
+        self._limiter(host, key).take_slot()
+
+    def release_slot(self, host: str, key: str) -> None:
+        self._limiter(host, key).release_slot()
+
+    def on_success(self, host: str, key: str) -> None:
+        self._limiter(host, key).on_success()
+
+    def on_throttle(self, host: str, key: str) -> None:
+        self._limiter(host, key).on_throttle()
+
+
+class RemoteLimiter:
+    """Limiter interface backed by a (proxied) QuotaServer."""
+
+    def __init__(self, server: Any, host: str, key: str, limits: HostLimits) -> None:
+        self.limits = limits
+        self._server = server
+        self._id = (host, key)
+
+    def acquire(self) -> None:
+        self._server.acquire(*self._id)
+
+    def take_slot(self) -> None:
+        self._server.take_slot(*self._id)
+
+    def release_slot(self) -> None:
+        self._server.release_slot(*self._id)
+
+    def on_success(self) -> None:
+        self._server.on_success(*self._id)
+
+    def on_throttle(self) -> None:
+        self._server.on_throttle(*self._id)
+
+    def __enter__(self) -> "RemoteLimiter":
+        self.take_slot()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release_slot()
+
+
+class Scheduler:
+    def __init__(self, policy: dict[str, Any] | None = None, quota: Any = None) -> None:
+        policy = policy if policy is not None else load_http_policy()
+        self._defaults = _limits_from(policy.get("defaults", {}), HostLimits())
+        self._hosts = {
+            host: _limits_from(cfg or {}, self._defaults) for host, cfg in (policy.get("hosts") or {}).items()
+        }
+        # A QuotaServer proxy replaces the per-process limiters.
+        self._quota = quota
+        self._limiters: dict[tuple[str, str], Limiter | RemoteLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limits_for(self, host: str) -> HostLimits:
+        return self._hosts.get(host, self._defaults)
+
+    def limiter(self, host: str, credential: str | None = None) -> Limiter | RemoteLimiter:
+        return self.limiter_for_key(host, _credential_key(credential))
+
+    def limiter_for_key(self, host: str, key: str) -> Limiter | RemoteLimiter:
+        with self._lock:
+            limiter = self._limiters.get((host, key))
+            if limiter is None:
+                if self._quota is not None:
+                    limiter = RemoteLimiter(self._quota, host, key, self.limits_for(host))
+                else:
+                    limiter = Limiter(self.limits_for(host))
+                self._limiters[(host, key)] = limiter
+            return limiter
+
+    def request(
+        self, method: str, url: str, *, credential: str | None = None, retry_unsafe: bool = False, **kwargs: Any
+    ) -> requests.Response:
+        """Send a request within the host's limits, backing off and retrying on throttling.
+
+        429 is always retried. 503 may come after the server acted on the request, so it is retried only for
+        idempotent methods, or when `retry_unsafe` marks a POST as safe to repeat (e.g. a read-only query).
+        A `stream=True` response keeps its concurrency slot until it is closed; use it as a context manager.
+        """
+        limiter = self.limiter(urlsplit(url).hostname or "", credential)
+        retry_statuses = THROTTLE_STATUSES if retry_unsafe or method.upper() in IDEMPOTENT_METHODS else {429}
+        attempt = 0
+        while True:
+            limiter.acquire()
+            limiter.take_slot()
+            try:
+                res = http.session().request(method, url, **kwargs)
+            except BaseException:
+                limiter.release_slot()
+                raise
+            if res.status_code not in THROTTLE_STATUSES:
+                limiter.on_success()
+            else:
+                limiter.on_throttle()
+            if res.status_code not in retry_statuses or attempt >= limiter.limits.max_retries:
+                if kwargs.get("stream"):
+                    _release_on_close(res, limiter)
+                else:
+                    limiter.release_slot()
+                return res
+            res.close()
+            limiter.release_slot()
+            attempt += 1
+            time.sleep(_backoff(res, attempt, limiter.limits.max_backoff_s))
+
+
+def _release_on_close(res: requests.Response, limiter: Limiter | RemoteLimiter) -> None:
+    # The body of a streamed response is read after request() returns; it counts against the cap until closed.
+    close = res.close
+    released = threading.Event()
+
+    def close_and_release() -> None:
+        try:
+            close()
+        finally:
+            if not released.is_set():
+                released.set()
+                limiter.release_slot()
+
+    res.close = close_and_release  # type: ignore[method-assign]
+
+
+def _limits_from(cfg: dict[str, Any], base: HostLimits) -> HostLimits:
+    known = {k: cfg[k] for k in HostLimits.__dataclass_fields__ if k in cfg}
+    return replace(base, **known)
+
+
+def _credential_key(credential: str | None) -> str:
+    # Buckets are keyed by credential without keeping the secret itself around.
+    if not credential:
+        return ""
+    return hashlib.sha256(credential.encode("utf-8")).hexdigest()[:16]
+
+
+def _backoff(res: requests.Response, attempt: int, cap: float) -> float:
+    retry_after = res.headers.get("Retry-After", "")
+    if retry_after.strip().isdigit():
+        return min(cap, float(retry_after))
+    return min(cap, 0.5 * (2 ** attempt))
+
+
+_scheduler: Scheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
+
+
+def configure(policy: dict[str, Any] | None = None, quota: Any = None) -> Scheduler:
+    """Replace the process-wide scheduler, e.g. to draw on a QuotaServer shared by `--workers` processes."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = Scheduler(policy, quota=quota)
+        return _scheduler
+
+
+def request(
+    method: str, url: str, *, credential: str | None = None, retry_unsafe: bool = False, **kwargs: Any
+) -> requests.Response:
+    return get_scheduler().request(method, url, credential=credential, retry_unsafe=retry_unsafe, **kwargs)
+
+
+def concurrency_for(url: str) -> int:
+    """How many requests to `url`'s host the scheduler lets run at once; size thread pools to this."""
+    return get_scheduler().limits_for(urlsplit(url).hostname or "").max_concurrency
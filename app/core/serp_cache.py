@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.core.lake import find_json, lake_codec, read_json, write_json
+
+
+# A SERP is the same for every project that tracks the keyword, so it is shared across project packs.
+SERP_KEY_FIELDS = ("keyword", "location_name", "language_code", "device")
+
+
+def serp_key(task: dict[str, Any], day: date) -> str:
+    params = [str(task.get(field) or "").strip().lower() for field in SERP_KEY_FIELDS]
+    return hashlib.sha256(json.dumps([*params, day.isoformat()]).encode("utf-8")).hexdigest()
+
+
+class SerpCache:
+    """DataForSEO SERP tasks by (keyword, location, language, device, day); one folder per day for easy pruning."""
+
+    def __init__(self, day: date, root: Path | None = None) -> None:
+        self.day = day
+        self.root = root or (settings().workspace_dir / "lake" / "cache" / "serp")
+        self.codec = lake_codec()
+
+    def _path(self, task: dict[str, Any]) -> Path:
+        key = serp_key(task, self.day)
+        return self.root / self.day.isoformat() / key[:2] / f"{key}.json"
+
+    def get(self, task: dict[str, Any]) -> dict[str, Any] | None:
+        path = find_json(self._path(task))
+        if path is None:
+            return None
+        try:
+            return read_json(path)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, result: dict[str, Any]) -> None:
+        """Store a finished task; its echoed `data` holds the parameters it was posted with."""
+        if not result.get("result"):
+            return
+        write_json(self._path(result.get("data", {})), result, self.codec)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app.core.config import REPO_ROOT, ensure_dirs, settings
+from app.core.manifest import load_manifest
+from app.core.registry import registries_dir
+
+
+# Bump when the cache entry layout changes.
+CACHE_FORMAT = 1
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Digest of all application code; any code change invalidates every cached stage."""
+    digest = hashlib.sha256()
+    app_dir = REPO_ROOT / "app"
+    for path in sorted(app_dir.rglob("*.py")):
+        if "tests" in path.relative_to(app_dir).parts:
+            continue
+        digest.update(str(path.relative_to(app_dir)).encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def file_digest(path: Path) -> str | None:
+    if not path.exists():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _files_digest(paths: list[Path], extra: Any = None) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(p for p in paths if p.is_file()):
+        digest.update(os.path.relpath(path, REPO_ROOT).encode("utf-8"))
+        digest.update(path.read_bytes())
+    if extra is not None:
+        digest.update(_canonical(extra))
+    return digest.hexdigest()[:16]
+
+
+def config_digest() -> str:
+    """Digest of the rules, registries and system manifest that shape the payload and actions."""
+    configs = REPO_ROOT / "configs"
+    return _files_digest(
+        [
+            *(configs / "report_rules").rglob("*"),
+            *registries_dir().rglob("*"),
+            configs / "system" / "system_manifest_v1.yaml",
+        ]
+    )
+
+
+def render_digest() -> str:
+    """Digest of what rendering reads besides the payload: the templates, the manifest's template selection
+    and the Notion property registry behind notion_fields.md."""
+    manifest = load_manifest()
+    selection = [manifest.get("paths", {}).get("templates"), manifest.get("defaults", {}).get("template_by_language")]
+    files = [*(REPO_ROOT / "configs" / "report_templates").rglob("*"), registries_dir() / "notion_properties.yaml"]
+    return _files_digest(files, selection)
+
+
+def _canonical(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class StageCache:
+    def __init__(self, root: Path | None = None) -> None:
+        self.root = root or (settings().workspace_dir / "lake" / "cache" / "stages")
+
+    def key(self, stage: str, inputs: dict[str, Any], extra: Any) -> str:
+        digest = hashlib.sha256()
+        digest.update(_canonical([CACHE_FORMAT, code_version(), stage, extra]))
+        for name in sorted(inputs):
+            digest.update(name.encode("utf-8"))
+            digest.update(_canonical(inputs[name]))
+        return digest.hexdigest()
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.root / stage.replace(":", "_") / key[:2] / f"{key}.json"
+
+    def get(self, stage: str, key: str) -> dict[str, Any] | None:
+        path = self._path(stage, key)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            return None
+
+    def put(self, stage: str, key: str, outputs: dict[str, Any]) -> None:
+        path = self._path(stage, key)
+        ensure_dirs([path.parent])
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(outputs, default=str), encoding="utf-8")
+        os.replace(tmp, path)
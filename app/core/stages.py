@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from app.core.stage_cache import StageCache
+
+
+class StageSkipped(Exception):
+    """Raised by a stage that has nothing to do (e.g. missing input file); not an error."""
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: Callable[[dict[str, Any]], dict[str, Any]]
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    # Inputs the stage can run without (e.g. marts of sources that failed).
+    optional_inputs: tuple[str, ...] = ()
+    # Restores the stage's outputs from disk so downstream stages can be re-run alone.
+    load: Callable[[], dict[str, Any] | None] | None = None
+    # Extra cache-key material (config, file digests); None/returning None makes the stage uncacheable.
+    cache_key: Callable[[], Any] | None = None
+    # Reduces the inputs to what the cache key should depend on (e.g. drops run timestamps).
+    key_inputs: Callable[[dict[str, Any]], dict[str, Any]] | None = None
+    # Converts outputs to/from their cached form (e.g. a pointer to a lake file); decode returning None is a miss.
+    encode: Callable[[dict[str, Any]], dict[str, Any]] | None = None
+    decode: Callable[[dict[str, Any]], dict[str, Any] | None] | None = None
+
+
+@dataclass
+class StageRecord:
+    name: str
+    status: str = "pending"
+    duration_s: float = 0.0
+    error: str | None = None
+    inputs: list[str] = field(default_factory=list)
+    outputs: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "duration_s": self.duration_s,
+            "error": self.error,
+            "inputs": self.inputs,
+            "outputs": self.outputs,
+        }
+
+
+class StageGraph:
+    def __init__(self, stages: list[Stage]) -> None:
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("duplicate stage names")
+        self.producers: dict[str, str] = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"artifact produced twice: {output} ({self.producers[output]}, {stage.name})")
+                self.producers[output] = stage.name
+        for stage in stages:
+            for name in stage.inputs:
+                if name not in self.producers:
+                    raise ValueError(f"stage {stage.name}: no stage produces input {name}")
+        self.order = self._toposort()
+
+    def upstream(self, name: str) -> set[str]:
+        stage = self.stages[name]
+        names = stage.inputs + stage.optional_inputs
+        return {self.producers[i] for i in names if i in self.producers}
+
+    def downstream(self, name: str) -> set[str]:
+        result = {name}
+        changed = True
+        while changed:
+            changed = False
+            for stage_name in self.order:
+                if stage_name not in result and self.upstream(stage_name) & result:
+                    result.add(stage_name)
+                    changed = True
+        return result
+
+    def _toposort(self) -> list[str]:
+        order: list[str] = []
+        state: dict[str, int] = {}
+
+        def visit(name: str) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"cycle in stage graph at {name}")
+            state[name] = 1
+            for dep in sorted(self.upstream(name)):
+                visit(dep)
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def plan(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "name": name,
+                "inputs": list(self.stages[name].inputs + self.stages[name].optional_inputs),
+                "outputs": list(self.stages[name].outputs),
+            }
+            for name in self.order
+        ]
+
+    def run(
+        self,
+        workers: int = 1,
+        start_at: str | None = None,
+        artifacts: dict[str, Any] | None = None,
+        cache: StageCache | None = None,
+    ) -> tuple[dict[str, Any], list[StageRecord]]:
+        """Execute the graph; with start_at only that stage and its downstream run, the rest is loaded."""
+        if start_at and start_at not in self.stages:
+            raise ValueError(f"unknown stage: {start_at}")
+        artifacts = dict(artifacts or {})
+        records = {
+            name: StageRecord(name, inputs=list(s.inputs + s.optional_inputs), outputs=list(s.outputs))
+            for name, s in self.stages.items()
+        }
+        to_run = self.downstream(start_at) if start_at else set(self.order)
+
+        for name in self.order:
+            if name in to_run:
+                continue
+            self._load(name, artifacts, records[name], to_run)
+
+        pending = [name for name in self.order if name in to_run]
+        finished: set[str] = {name for name in self.order if name not in to_run}
+
+        def ready(name: str) -> bool:
+            return self.upstream(name) <= finished
+
+        cache_keys: dict[str, str] = {}
+
+        def launch(name: str) -> dict[str, Any] | None:
+            stage = self.stages[name]
+            missing = [i for i in stage.inputs if i not in artifacts]
+            if missing:
+                records[name].status = "skipped"
+                records[name].error = f"missing inputs: {', '.join(missing)}"
+                return None
+            inputs = {i: artifacts[i] for i in stage.inputs + stage.optional_inputs if i in artifacts}
+            extra = stage.cache_key() if cache and stage.cache_key else None
+            if extra is None:
+                return inputs
+            key = cache.key(name, stage.key_inputs(inputs) if stage.key_inputs else inputs, extra)
+            # An explicit start_at forces that stage to recompute; cached entries still serve the rest.
+            cached = cache.get(name, key) if name != start_at else None
+            if cached is not None and stage.decode:
+                cached = stage.decode(cached)
+            if cached is not None:
+                artifacts.update(cached)
+                records[name].status = "cached"
+                return None
+            cache_keys[name] = key
+            return inputs
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="stage") as pool:
+            running: dict[Future, str] = {}
+            while pending or running:
+                # Skipped and cached stages finish immediately and may unblock others, so repeat until stable.
+                launchable = [n for n in pending if ready(n)]
+                while launchable:
+                    for name in launchable:
+                        pending.remove(name)
+                        inputs = launch(name)
+                        if inputs is None:
+                            finished.add(name)
+                            continue
+                        running[pool.submit(_timed, self.stages[name].fn, inputs)] = name
+                    launchable = [n for n in pending if ready(n)]
+                if not running:
+                    if pending:
+                        raise RuntimeError(f"stage graph stalled: {pending}")
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    record = records[name]
+                    outputs, record.duration_s, exc = future.result()
+                    if isinstance(exc, StageSkipped):
+                        record.status = "skipped"
+                        record.error = str(exc) or None
+                    elif exc is not None:
+                        record.status = "failed"
+                        record.error = f"{type(exc).__name__}: {exc}"
+                    else:
+                        record.status = "done"
+                        artifacts.update(outputs or {})
+                        if name in cache_keys:
+                            stage = self.stages[name]
+                            cache.put(name, cache_keys[name], stage.encode(outputs or {}) if stage.encode else outputs or {})
+                    finished.add(name)
+
+        return artifacts, [records[name] for name in self.order]
+
+    def _load(self, name: str, artifacts: dict[str, Any], record: StageRecord, to_run: set[str]) -> None:
+        stage = self.stages[name]
+        needed = any(self.upstream(n) & {name} for n in to_run)
+        if not needed:
+            record.status = "not_run"
+            return
+        loaded = stage.load() if stage.load else None
+        if loaded is None:
+            record.status = "unavailable"
+            return
+        artifacts.update(loaded)
+        record.status = "loaded"
+
+
+def _timed(fn: Callable[[dict[str, Any]], dict[str, Any]], inputs: dict[str, Any]) -> tuple[dict[str, Any] | None, float, BaseException | None]:
+    started = time.monotonic()
+    try:
+        outputs = fn(inputs)
+        exc = None
+    except Exception as err:
+        outputs = None
+        exc = err
+    return outputs, round(time.monotonic() - started, 3), exc
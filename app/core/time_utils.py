@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, timedelta
 import calendar
 
 
@@ -54,3 +54,38 @@ def iter_months(start: str, end: str) -> list[str]:
         cursor = next_period(cursor)
         months.append(cursor)
     return months
+
+
+@dataclass(frozen=True)
+class DateWindow:
+    kind: str  # month | week | quarter | range | mtd
+    label: str
+    start: date
+    end: date
+
+
+def parse_window(spec: str, today: date | None = None) -> DateWindow:
+    """Accepts YYYY-MM, YYYY-Www (ISO week), YYYY-Qn, YYYY-MM-DD..YYYY-MM-DD and mtd."""
+    spec = spec.strip()
+    if spec == "mtd":
+        today = today or date.today()
+        return DateWindow("mtd", f"{today:%Y-%m}-mtd", today.replace(day=1), today)
+    if ".." in spec:
+        first, last = spec.split("..", 1)
+        start, end = date.fromisoformat(first), date.fromisoformat(last)
+        if end < start:
+            raise ValueError("range end is before its start")
+        return DateWindow("range", spec, start, end)
+    if "-W" in spec:
+        year, week = spec.split("-W", 1)
+        start = date.fromisocalendar(int(year), int(week), 1)
+        return DateWindow("week", spec, start, start + timedelta(days=6))
+    if "-Q" in spec:
+        year, quarter = int(spec.split("-Q", 1)[0]), int(spec.split("-Q", 1)[1])
+        if quarter < 1 or quarter > 4:
+            raise ValueError("quarter must be 1-4")
+        first = month_range(year, 3 * quarter - 2)
+        last = month_range(year, 3 * quarter)
+        return DateWindow("quarter", spec, first.start, last.end)
+    mr = parse_period(spec)
+    return DateWindow("month", spec, mr.start, mr.end)
@@ -3,8 +3,7 @@ from __future__ import annotations
 import os
 from typing import Any
 
-import requests
-
+from app.core import scheduler
 from app.core.registry import load_notion_registry
 
 
@@ -12,8 +11,8 @@ NOTION_API_BASE = "https://api.notion.com"
 NOTION_VERSION = "2022-06-28"
 
 
-def export_notion_fields(payload: dict[str, Any]) -> str:
-    registry = load_notion_registry()
+def export_notion_fields(payload: dict[str, Any], registry: dict[str, Any] | None = None) -> str:
+    registry = registry or load_notion_registry()
     mappings = registry.get("mappings", {})
 
     lines = ["# Notion Field Pack", ""]
@@ -49,8 +48,10 @@ def sync_notion(payload: dict[str, Any]) -> dict[str, Any] | None:
     existing = _find_existing_page(database_id, headers, title_prop, period_prop, payload, db_schema)
     if existing:
         page_id = existing
-        res = requests.patch(
+        res = scheduler.request(
+            "PATCH",
             f"{NOTION_API_BASE}/v1/pages/{page_id}",
+            credential=headers["Authorization"],
             headers=headers,
             json={"properties": properties},
             timeout=30,
@@ -58,8 +59,10 @@ def sync_notion(payload: dict[str, Any]) -> dict[str, Any] | None:
         res.raise_for_status()
         return res.json()
 
-    res = requests.post(
+    res = scheduler.request(
+        "POST",
         f"{NOTION_API_BASE}/v1/pages",
+        credential=headers["Authorization"],
         headers=headers,
         json={
             "parent": {"database_id": database_id},
@@ -73,8 +76,10 @@ def sync_notion(payload: dict[str, Any]) -> dict[str, Any] | None:
 
 def _get_database_schema(database_id: str, headers: dict[str, str]) -> dict[str, Any] | None:
     try:
-        res = requests.get(
+        res = scheduler.request(
+            "GET",
             f"{NOTION_API_BASE}/v1/databases/{database_id}",
+            credential=headers["Authorization"],
             headers=headers,
             timeout=30,
         )
@@ -147,8 +152,10 @@ def _find_existing_page(
         period_filter = {"property": period_prop, "rich_text": {"equals": str(period)}}
     body = {"filter": {"and": [title_filter, period_filter]}}
     try:
-        res = requests.post(
+        res = scheduler.request(
+            "POST",
             f"{NOTION_API_BASE}/v1/databases/{database_id}/query",
+            credential=headers["Authorization"],
             headers=headers,
             json=body,
             timeout=30,
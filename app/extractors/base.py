@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-import json
+import re
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
-from app.core.config import settings, ensure_dirs
+from app.core.config import settings
+from app.core.lake import read_json, write_json
 
 
 @dataclass(frozen=True)
@@ -14,14 +16,53 @@ class RunContext:
     period: str
     run_id: str
     mock: bool
+    # Serve the latest stored raw response instead of calling the API (if younger than replay_ttl_s).
+    replay: bool = False
+    replay_ttl_s: float | None = None
 
 
 def raw_dir(source: str, ctx: RunContext) -> Path:
     return settings().workspace_dir / "lake" / "raw" / source / ctx.project_key / ctx.period
 
 
+# `<run_id>.json` plus the codec suffix; sidecars (`<run_id>.<part>.jsonl`, PSI blobs) have more dots.
+_RAW_NAME = re.compile(r"^[^.]+\.json(\.gz|\.zst)?$")
+
+
 def write_raw(source: str, ctx: RunContext, payload: dict[str, Any]) -> Path:
-    path = raw_dir(source, ctx) / f"{ctx.run_id}.json"
-    ensure_dirs([path.parent])
-    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
-    return path
+    return write_json(raw_dir(source, ctx) / f"{ctx.run_id}.json", payload)
+
+
+def latest_raw_path(source: str, ctx: RunContext) -> Path | None:
+    # run_ids are UTC timestamps, so lexical order is chronological.
+    paths = sorted(
+        (p for p in raw_dir(source, ctx).glob("*.json*") if _RAW_NAME.match(p.name)), key=lambda p: p.name.split(".")[0]
+    )
+    return paths[-1] if paths else None
+
+
+def read_latest_raw(source: str, ctx: RunContext) -> dict[str, Any] | None:
+    path = latest_raw_path(source, ctx)
+    if path is None:
+        return None
+    return read_json(path)
+
+
+def raw_age_s(path: Path) -> float:
+    try:
+        written = datetime.strptime(path.name.split(".")[0], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        written = path.stat().st_mtime
+    return datetime.now(timezone.utc).timestamp() - written
+
+
+def replay_raw(source: str, ctx: RunContext) -> dict[str, Any] | None:
+    """Latest stored raw response when replaying; None means the extractor has to fetch."""
+    if not ctx.replay:
+        return None
+    path = latest_raw_path(source, ctx)
+    if path is None:
+        return None
+    if ctx.replay_ttl_s is not None and raw_age_s(path) > ctx.replay_ttl_s:
+        return None
+    return read_json(path)
@@ -1,15 +1,81 @@
 from __future__ import annotations
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from typing import Any
 
-import requests
-
-from app.extractors.base import RunContext, write_raw
+from app.core import scheduler
+from app.core.crux_cache import CruxCache
+from app.core.duckdb_store import store_crux_metrics, top_gsc_rows
+from app.core.policy import load_policy, policy_today
+from app.extractors.base import RunContext, replay_raw, write_raw
 from app.utils.fixtures import load_fixture
 
 
 CRUX_ENDPOINT = "https://chromeuxreport.googleapis.com/v1/records:queryHistoryRecord"
+CRUX_DAILY_ENDPOINT = "https://chromeuxreport.googleapis.com/v1/records:queryRecord"
+FORM_FACTORS = ("PHONE", "DESKTOP")
+# CrUX metric name -> warehouse column.
+METRICS = {
+    "largest_contentful_paint": "lcp_p75_ms",
+    "interaction_to_next_paint": "inp_p75_ms",
+    "cumulative_layout_shift": "cls_p75",
+}
+
+
+def targets(project: dict[str, Any], ctx: RunContext) -> list[tuple[str, str, str | None]]:
+    """(record key, origin/url, form factor): the origin overall and per form factor, plus top-N GSC pages."""
+    origin = project.get("canonical_origin")
+    jobs: list[tuple[str, str, str | None]] = [("origin", origin, None)]
+    jobs += [("origin", origin, form_factor) for form_factor in FORM_FACTORS]
+    top_n = project["sources"]["crux"].get("top_urls", 0)
+    if top_n:
+        rows, _ = top_gsc_rows(ctx.project_key, ctx.period, "page", top_n)
+        jobs += [("url", row["keys"][0], form_factor) for row in rows for form_factor in FORM_FACTORS]
+    return jobs
+
+
+def _date(value: dict[str, int]) -> str:
+    return date(value["year"], value["month"], value["day"]).isoformat()
+
+
+def _p75(value: Any) -> float | None:
+    # CLS percentiles come back as strings.
+    return None if value is None else float(value)
+
+
+def collection_rows(response: dict[str, Any]) -> list[dict[str, Any]]:
+    """One row of p75s per collection period, for queryRecord and queryHistoryRecord responses alike."""
+    record = response.get("record") or {}
+    metrics = record.get("metrics") or {}
+    if "collectionPeriods" in record:
+        rows = [{"collection_end": _date(p["lastDate"])} for p in record["collectionPeriods"]]
+        for metric, column in METRICS.items():
+            p75s = (metrics.get(metric) or {}).get("percentilesTimeseries", {}).get("p75s", [])
+            for row, value in zip(rows, p75s):
+                row[column] = _p75(value)
+        return rows
+    if "collectionPeriod" in record:
+        row = {"collection_end": _date(record["collectionPeriod"]["lastDate"])}
+        for metric, column in METRICS.items():
+            row[column] = _p75((metrics.get(metric) or {}).get("percentiles", {}).get("p75"))
+        return [row]
+    return []
+
+
+def _query(endpoint: str, api_key: str, key: str, target: str, form_factor: str | None) -> dict[str, Any]:
+    payload: dict[str, Any] = {key: target}
+    if form_factor:
+        payload["formFactor"] = form_factor
+    res = scheduler.request(
+        "POST", f"{endpoint}?key={api_key}", credential=api_key, json=payload, timeout=60, retry_unsafe=True
+    )
+    if res.status_code == 404:
+        # No CrUX data for this url/form factor (too little traffic).
+        return {}
+    res.raise_for_status()
+    return res.json()
 
 
 def fetch(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
@@ -20,14 +86,43 @@ def fetch(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
     if not api_key:
         raise RuntimeError("GOOGLE_API_KEY missing")
 
-    url = project.get("canonical_origin")
-    payload = {"origin": url}
-    res = requests.post(f"{CRUX_ENDPOINT}?key={api_key}", json=payload, timeout=60)
-    res.raise_for_status()
-    return res.json()
+    mode = project["sources"]["crux"].get("mode", "history")
+    endpoint = CRUX_DAILY_ENDPOINT if mode == "daily" else CRUX_ENDPOINT
+    cache = CruxCache(policy_today(load_policy()))
+    jobs = targets(project, ctx)
+
+    def query(job: tuple[str, str, str | None]) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+        cached = cache.get(mode, *job)
+        if cached is not None:
+            return cached, []
+        response = _query(endpoint, api_key, *job)
+        rows = collection_rows(response)
+        cache.put(mode, *job, response, rows[-1]["collection_end"] if rows else None)
+        return response, rows
+
+    with ThreadPoolExecutor(max_workers=max(1, min(scheduler.concurrency_for(endpoint), len(jobs))), thread_name_prefix="crux") as pool:
+        results = list(pool.map(query, jobs))
+
+    # New collection periods of every queried url/form factor go to the warehouse.
+    store_crux_metrics([
+        {"key": key, "target": target, "form_factor": form_factor or "ALL", **row}
+        for (key, target, form_factor), (_, rows) in zip(jobs, results)
+        for row in rows
+    ])
+    origin_all = results[0][0]
+    return {
+        **origin_all,
+        "records": [
+            {"key": key, "target": target, "form_factor": form_factor, "response": response}
+            for (key, target, form_factor), (response, _) in zip(jobs[1:], results[1:])
+        ],
+    }
 
 
 def run(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
+    replayed = replay_raw("crux", ctx)
+    if replayed is not None:
+        return replayed
     data = fetch(project, ctx)
     write_raw("crux", ctx, data)
     return data
@@ -1,16 +1,35 @@
 from __future__ import annotations
 
+import json
 import os
-from typing import Any
-
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Iterator
 
+from app.core import scheduler
+from app.core.config import ensure_dirs
+from app.core.lake import jsonl_path, open_jsonl
 from app.core.locations import load_locations_set
-from app.extractors.base import RunContext, write_raw
+from app.core.policy import load_policy, policy_today
+from app.core.serp_cache import SerpCache
+from app.extractors.base import RunContext, raw_dir, replay_raw, write_raw
 from app.utils.fixtures import load_fixture
 
 
 DEFAULT_BASE = "https://api.dataforseo.com"
+SERP_PATH = "/v3/serp/google/organic"
+# task_post accepts at most 100 tasks per call; tasks_ready lists at most 1000 ready tasks.
+TASK_POST_LIMIT = 100
+POLL_INTERVAL_S = 10.0
+# tasks_ready is account-wide, so other runs' tasks can crowd ours out; after this many polls, ask task_get directly.
+READY_POLLS = 3
+BATCH_TIMEOUT_S = 3600.0
+BATCH_WORKERS = 8
+TASK_OK = 20000
+TASK_CREATED = 20100
+# task_get answers these for tasks that are still queued or being processed.
+TASK_PENDING = {40601, 40602}
 
 
 def _auth() -> tuple[str, str]:
@@ -21,26 +40,42 @@ def _auth() -> tuple[str, str]:
     return login, password
 
 
-def fetch(project: dict[str, Any], ctx: RunContext, keywords: list[str]) -> dict[str, Any]:
-    if ctx.mock:
-        return load_fixture("dataforseo")
+def _base() -> str:
+    # DATAFORSEO_API_BASE also points the extractor at a local stand-in (app/tools/dataforseo_stub.py).
+    return os.environ.get("DATAFORSEO_API_BASE", DEFAULT_BASE).rstrip("/")
+
+
+def _request(method: str, path: str, auth: tuple[str, str], **kwargs: Any) -> dict[str, Any]:
+    res = scheduler.request(method, f"{_base()}{SERP_PATH}{path}", credential=auth[0], auth=auth, **kwargs)
+    res.raise_for_status()
+    return res.json()
+
+
+def devices(project: dict[str, Any]) -> list[str]:
+    # device_set is one device or a comma-separated list, e.g. "mobile,desktop".
+    device_set = project["sources"]["dataforseo"].get("device_set") or "desktop"
+    return [d.strip() for d in device_set.split(",") if d.strip()] or ["desktop"]
+
 
+def segments(project: dict[str, Any]) -> list[dict[str, Any]]:
+    """Every location x device combination of the project's locations set, in configured order."""
     locations_set = project["sources"]["dataforseo"]["locations_set"]
     locations = load_locations_set(locations_set).get("locations", [])
     if not locations:
         raise RuntimeError(f"locations_set empty: {locations_set}")
+    return [
+        {"location_name": loc.get("location_name"), "language_code": loc.get("language_code", "en"), "device": device}
+        for loc in locations
+        for device in devices(project)
+    ]
 
-    base = os.environ.get("DATAFORSEO_API_BASE", DEFAULT_BASE)
-    url = f"{base}/v3/serp/google/organic/live/advanced"
 
+def build_tasks(segment: dict[str, Any], keywords: list[str]) -> list[dict[str, Any]]:
     tasks = []
     for kw in keywords:
-        loc = locations[0]
         task = {
             "keyword": kw,
-            "location_name": loc.get("location_name"),
-            "language_code": loc.get("language_code", "en"),
-            "device": project.get("sources", {}).get("dataforseo", {}).get("device_set", "desktop"),
+            **segment,
             "depth": 100,
             "max_crawl_pages": 1,
             "search_engine": "google",
@@ -48,14 +83,169 @@ def fetch(project: dict[str, Any], ctx: RunContext, keywords: list[str]) -> dict
             "load_resources": False,
         }
         tasks.append(task)
+    return tasks
 
+
+def fetch(project: dict[str, Any], ctx: RunContext, keywords: list[str]) -> dict[str, Any]:
+    if ctx.mock:
+        return load_fixture("dataforseo")
+
+    # SERPs other projects already paid for today are reused; the transform ranks this project's domain in them.
+    cache = SerpCache(policy_today(load_policy()))
+    segs = segments(project)
+    cached, misses = [], []
+    for segment in segs:
+        for task in build_tasks(segment, keywords):
+            hit = cache.get(task)
+            if hit is None:
+                misses.append(task)
+            else:
+                cached.append(hit)
+
+    if project["sources"]["dataforseo"].get("mode") == "batch":
+        return {**fetch_batch(misses, ctx, cache, cached), "segments": segs, "serp_cache_hits": len(cached)}
+    return {"segments": segs, "serp_cache_hits": len(cached), "tasks": cached + fetch_live(misses, cache)}
+
+
+def fetch_live(tasks: list[dict[str, Any]], cache: SerpCache) -> list[dict[str, Any]]:
+    """One live call per location x device, dispatched concurrently; the scheduler keeps them within quota."""
+    groups: dict[tuple[Any, Any], list[dict[str, Any]]] = {}
+    for task in tasks:
+        groups.setdefault((task["location_name"], task["device"]), []).append(task)
+    if not groups:
+        return []
     auth = _auth()
-    res = requests.post(url, auth=auth, json=tasks, timeout=60)
-    res.raise_for_status()
-    return res.json()
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="dataforseo") as pool:
+        responses = list(
+            pool.map(lambda group: _request("POST", "/live/advanced", auth, json=group, timeout=60), groups.values())
+        )
+    results = [_checked(task) for response in responses for task in response.get("tasks", [])]
+    for result in results:
+        cache.put(result)
+    return results
+
+
+def _chunks(items: list[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def post_tasks(tasks: list[dict[str, Any]], auth: tuple[str, str]) -> list[str]:
+    """Queue tasks via task_post in chunks of TASK_POST_LIMIT; returns the task ids in task order."""
+    chunks = list(_chunks(tasks, TASK_POST_LIMIT))
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="dataforseo") as pool:
+        responses = list(pool.map(lambda chunk: _request("POST", "/task_post", auth, json=chunk, timeout=60), chunks))
+    ids = []
+    for response in responses:
+        for task in response.get("tasks", []):
+            if task.get("status_code") != TASK_CREATED:
+                raise RuntimeError(f"task_post rejected a task: {task.get('status_code')} {task.get('status_message')}")
+            ids.append(task["id"])
+    return ids
+
+
+def _checked(task: dict[str, Any]) -> dict[str, Any]:
+    if task.get("status_code") != TASK_OK:
+        keyword = (task.get("data") or {}).get("keyword")
+        raise RuntimeError(f"DataForSEO task {task.get('id')} ({keyword}) failed: {task.get('status_code')} {task.get('status_message')}")
+    return task
+
+
+def ready_ids(auth: tuple[str, str]) -> set[str]:
+    # tasks_ready lists every collectable task of the account, not only this run's.
+    data = _request("GET", "/tasks_ready", auth, timeout=30)
+    return {item["id"] for task in data.get("tasks", []) for item in (task.get("result") or [])}
+
+
+class ReadyPoller:
+    """Polls tasks_ready at most once per interval per account, for all runs of the process waiting on tasks."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._polled_at: dict[str, float] = {}
+        # The latest listing per account, minus the ids already handed out.
+        self._listing: dict[str, set[str]] = {}
+
+    def ready(self, ids: set[str], auth: tuple[str, str]) -> set[str]:
+        with self._lock:
+            now = time.monotonic()
+            last = self._polled_at.get(auth[0])
+            if last is None or now - last >= POLL_INTERVAL_S:
+                self._polled_at[auth[0]] = now
+                self._listing[auth[0]] = ready_ids(auth)
+            listing = self._listing[auth[0]]
+            found = listing & ids
+            listing -= found
+            return found
+
+
+_poller = ReadyPoller()
+
+
+def get_task(task_id: str, auth: tuple[str, str]) -> dict[str, Any] | None:
+    """The task's result, None while it is still queued; raises if the task failed."""
+    data = _request("GET", f"/task_get/advanced/{task_id}", auth, timeout=60)
+    for task in data.get("tasks", []):
+        if task.get("status_code") in TASK_PENDING:
+            return None
+        return _checked(task)
+    raise RuntimeError(f"DataForSEO task_get returned no task for {task_id}")
+
+
+def iter_results(ids: list[str], auth: tuple[str, str]) -> Iterator[dict[str, Any]]:
+    """Wait for tasks via tasks_ready and collect them with concurrent task_get calls, yielding tasks as they arrive.
+
+    If tasks are still missing after READY_POLLS listings (the listing is capped account-wide), the remaining
+    ids are asked for directly with task_get.
+    """
+    pending = set(ids)
+    deadline = time.monotonic() + BATCH_TIMEOUT_S
+    polls = 0
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="dataforseo") as pool:
+        while pending:
+            polls += 1
+            ready = _poller.ready(pending, auth) if polls <= READY_POLLS else set(pending)
+            futures = {pool.submit(get_task, task_id, auth): task_id for task_id in ready}
+            for future in as_completed(futures):
+                task = future.result()
+                if task is not None:
+                    pending.discard(futures[future])
+                    yield task
+            if not pending:
+                return
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"DataForSEO: {len(pending)} tasks not ready after {BATCH_TIMEOUT_S:.0f}s")
+            time.sleep(POLL_INTERVAL_S)
+
+
+def fetch_batch(
+    tasks: list[dict[str, Any]],
+    ctx: RunContext,
+    cache: SerpCache | None = None,
+    cached: list[dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """task_post -> tasks_ready -> task_get; results go line by line to a JSONL file next to the raw JSON."""
+    path = jsonl_path(raw_dir("dataforseo", ctx) / f"{ctx.run_id}.tasks.jsonl")
+    ensure_dirs([path.parent])
+    count = 0
+    with open_jsonl(path, "w") as f:
+        for task in cached or []:
+            f.write(json.dumps(task) + "\n")
+            count += 1
+        if tasks:
+            auth = _auth()
+            for task in iter_results(post_tasks(tasks, auth), auth):
+                f.write(json.dumps(task) + "\n")
+                if cache is not None:
+                    cache.put(task)
+                count += 1
+    return {"mode": "batch", "task_count": count, "tasks_path": str(path)}
 
 
 def run(project: dict[str, Any], ctx: RunContext, keywords: list[str]) -> dict[str, Any]:
+    replayed = replay_raw("dataforseo", ctx)
+    if replayed is not None:
+        return replayed
     data = fetch(project, ctx, keywords)
     write_raw("dataforseo", ctx, data)
     return data
@@ -1,52 +1,55 @@
 from __future__ import annotations
 
+import heapq
 import json
-import os
-from typing import Any
-
-import requests
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Iterator
 
+from app.core import gsc_auth, scheduler
+from app.core.config import ensure_dirs
+from app.core.duckdb_store import (
+    gsc_daily_rows,
+    gsc_kpis_for_window,
+    gsc_page_query_count,
+    gsc_partition_statuses,
+    load_gsc_page_query,
+    load_gsc_range_rows,
+    load_gsc_rows,
+    mark_gsc_partitions,
+    store_gsc_daily,
+    top_gsc_rows,
+)
+from app.core.lake import jsonl_path, open_jsonl
+from app.core.policy import gsc_final_lag_days, load_policy, policy_today
 from app.core.time_utils import parse_period
-from app.extractors.base import RunContext, write_raw
+from app.extractors.base import RunContext, raw_dir, replay_raw, write_raw
 from app.utils.fixtures import load_fixture
 
 
-GSC_SCOPES = ["https://www.googleapis.com/auth/webmasters.readonly"]
 GSC_ENDPOINT = "https://searchconsole.googleapis.com/webmasters/v3/sites/{site_url}/searchAnalytics/query"
 GSC_SITES_ENDPOINT = "https://searchconsole.googleapis.com/webmasters/v3/sites"
+GSC_MAX_ROW_LIMIT = 25000
+TOP_ROW_LIMIT = 250
 
 
-def _load_credentials() -> service_account.Credentials:
-    mode = os.environ.get("GSC_AUTH_MODE", "service_account").strip()
-    if mode != "service_account":
-        raise RuntimeError("GSC_AUTH_MODE oauth not implemented yet")
-    raw = os.environ.get("GSC_CREDENTIALS_JSON", "").strip()
-    if not raw:
-        raise RuntimeError("GSC_CREDENTIALS_JSON missing")
-    if os.path.exists(raw):
-        info = json.loads(open(raw, "r", encoding="utf-8").read())
-    else:
-        info = json.loads(raw)
-    return service_account.Credentials.from_service_account_info(info, scopes=GSC_SCOPES)
+def _auth() -> tuple[dict[str, str], str | None]:
+    token, email = gsc_auth.access_token()
+    return {"Authorization": f"Bearer {token}"}, email
 
 
 def _post(site_url: str, payload: dict[str, Any]) -> dict[str, Any]:
-    creds = _load_credentials()
-    creds.refresh(Request())
-    headers = {"Authorization": f"Bearer {creds.token}"}
+    headers, email = _auth()
     url = GSC_ENDPOINT.format(site_url=site_url)
-    res = requests.post(url, json=payload, headers=headers, timeout=60)
+    # searchAnalytics.query only reads, so a 503 is safe to retry.
+    res = scheduler.request("POST", url, credential=email, json=payload, headers=headers, timeout=60, retry_unsafe=True)
     res.raise_for_status()
     return res.json()
 
 
 def list_sites() -> dict[str, Any]:
-    creds = _load_credentials()
-    creds.refresh(Request())
-    headers = {"Authorization": f"Bearer {creds.token}"}
-    res = requests.get(GSC_SITES_ENDPOINT, headers=headers, timeout=30)
+    headers, email = _auth()
+    res = scheduler.request("GET", GSC_SITES_ENDPOINT, credential=email, headers=headers, timeout=30)
     res.raise_for_status()
     return res.json()
 
@@ -60,38 +63,216 @@ def fetch(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
     start_date = period.start.isoformat()
     end_date = period.end.isoformat()
 
-    kpis_payload = {
-        "startDate": start_date,
-        "endDate": end_date,
+    base = {"startDate": start_date, "endDate": end_date}
+    # Daily totals feed the warehouse and the monthly KPIs are their aggregate; only non-final days are refetched.
+    refresh_daily(project, ctx.project_key, period.start, period.end)
+    daily = gsc_daily_rows(ctx.project_key, period.start, period.end)
+    month_final = period.end <= _freshness()[1]
+    raw = {
+        "kpis": _month_kpis(ctx.project_key, period.start, period.end),
+        "daily": {"rows": daily},
+        "pages": _month_dimension(site_url, base, "page", ctx, month_final),
+        "queries": _month_dimension(site_url, base, "query", ctx, month_final),
     }
-    kpis = _post(site_url, kpis_payload)
+    if project["sources"]["gsc"].get("page_query"):
+        raw["page_query"] = _month_page_query(site_url, base, ctx, month_final)
+    return {"raw": raw}
 
-    pages_payload = {
-        "startDate": start_date,
-        "endDate": end_date,
-        "dimensions": ["page"],
-        "rowLimit": 250,
-    }
-    pages = _post(site_url, pages_payload)
 
-    queries_payload = {
-        "startDate": start_date,
-        "endDate": end_date,
-        "dimensions": ["query"],
-        "rowLimit": 250,
-    }
-    queries = _post(site_url, queries_payload)
+def _freshness() -> tuple[date, date]:
+    """(today, last final day) in the reporting timezone."""
+    policy = load_policy()
+    today = policy_today(policy)
+    return today, today - timedelta(days=gsc_final_lag_days(policy))
 
-    return {
-        "raw": {
-            "kpis": kpis,
-            "pages": pages,
-            "queries": queries,
+
+def _days(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+
+def _record_daily(project_key: str, rows: list[dict[str, Any]], days: list[date], final_until: date) -> None:
+    store_gsc_daily(project_key, rows)
+    mark_gsc_partitions(project_key, "daily", {d.isoformat(): "final" if d <= final_until else "fresh" for d in days})
+
+
+def refresh_daily(project: dict[str, Any], project_key: str, start: date, end: date) -> int:
+    """Fetch property totals for days that are missing or were still fresh; returns the number of days refetched."""
+    today, final_until = _freshness()
+    days = _days(start, min(end, today))
+    statuses = gsc_partition_statuses(project_key, "daily", [d.isoformat() for d in days])
+    stale = [d for d in days if statuses.get(d.isoformat()) != "final"]
+    if not stale:
+        return 0
+    site_url = project["sources"]["gsc"]["property"]
+    payload = {"startDate": stale[0].isoformat(), "endDate": stale[-1].isoformat(), "dimensions": ["date"]}
+    fetched = _days(stale[0], stale[-1])
+    _record_daily(project_key, _post_all(site_url, payload)["rows"], fetched, final_until)
+    return len(fetched)
+
+
+def refresh_recent(project: dict[str, Any], project_key: str) -> int:
+    """Refresh every day that can still be fresh: from the start of the month holding the last final day to today."""
+    today, final_until = _freshness()
+    return refresh_daily(project, project_key, final_until.replace(day=1), today)
+
+
+def _month_dimension(
+    site_url: str, base: dict[str, Any], dimension: str, ctx: RunContext, month_final: bool
+) -> dict[str, Any]:
+    if gsc_partition_statuses(ctx.project_key, dimension, [ctx.period]).get(ctx.period) == "final":
+        rows, count = top_gsc_rows(ctx.project_key, ctx.period, dimension, TOP_ROW_LIMIT)
+        return {"rows": rows, "row_count": count, "rows_path": None}
+    streamed = _stream_dimension(site_url, base, dimension, ctx)
+    mark_gsc_partitions(ctx.project_key, dimension, {ctx.period: "final" if month_final else "fresh"})
+    return streamed
+
+
+def iter_batches(site_url: str, payload: dict[str, Any]) -> Iterator[list[dict[str, Any]]]:
+    """Page through a query with startRow, yielding each batch as it arrives."""
+    start_row = 0
+    while True:
+        page = _post(site_url, {**payload, "rowLimit": GSC_MAX_ROW_LIMIT, "startRow": start_row})
+        batch = page.get("rows", [])
+        if batch:
+            yield batch
+        if len(batch) < GSC_MAX_ROW_LIMIT:
+            return
+        start_row += len(batch)
+
+
+class TopRows:
+    """Top-N rows by clicks out of a stream; earlier rows (API order) win ties."""
+
+    def __init__(self, n: int) -> None:
+        self.n = n
+        self._heap: list[tuple[float, int, dict[str, Any]]] = []
+        self._seen = 0
+
+    def add(self, row: dict[str, Any]) -> None:
+        item = (row.get("clicks", 0), -self._seen, row)
+        self._seen += 1
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def rows(self) -> list[dict[str, Any]]:
+        return [row for _, _, row in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+
+
+def _stream_jsonl(
+    path: Path,
+    batches: Iterator[list[dict[str, Any]]],
+    fields: list[str],
+    top: TopRows | None = None,
+) -> int:
+    ensure_dirs([path.parent])
+    count = 0
+    with open_jsonl(path, "w") as f:
+        for batch in batches:
+            for row in batch:
+                record = dict(zip(fields, row["keys"]))
+                for metric in ("clicks", "impressions", "ctr", "position"):
+                    record[metric] = row.get(metric)
+                f.write(json.dumps(record) + "\n")
+                if top is not None:
+                    top.add(row)
+            count += len(batch)
+    return count
+
+
+def _stream_dimension(site_url: str, base: dict[str, Any], dimension: str, ctx: RunContext) -> dict[str, Any]:
+    # Every row goes to a JSONL file next to the raw JSON and then into DuckDB; only the top list stays in memory.
+    path = jsonl_path(raw_dir("gsc", ctx) / f"{ctx.run_id}.{dimension}.jsonl")
+    top = TopRows(TOP_ROW_LIMIT)
+    count = _stream_jsonl(path, iter_batches(site_url, {**base, "dimensions": [dimension]}), ["key"], top)
+    load_gsc_rows(ctx.project_key, ctx.period, dimension, path)
+    return {"rows": top.rows(), "row_count": count, "rows_path": str(path)}
+
+
+def _month_page_query(site_url: str, base: dict[str, Any], ctx: RunContext, month_final: bool) -> dict[str, Any]:
+    """Combined page×query rows; they only go to the warehouse, the raw JSON keeps a pointer."""
+    if gsc_partition_statuses(ctx.project_key, "page_query", [ctx.period]).get(ctx.period) == "final":
+        return {"row_count": gsc_page_query_count(ctx.project_key, ctx.period), "rows_path": None}
+    path = jsonl_path(raw_dir("gsc", ctx) / f"{ctx.run_id}.page_query.jsonl")
+    count = _stream_jsonl(path, iter_batches(site_url, {**base, "dimensions": ["page", "query"]}), ["page", "query"])
+    load_gsc_page_query(ctx.project_key, ctx.period, path)
+    mark_gsc_partitions(ctx.project_key, "page_query", {ctx.period: "final" if month_final else "fresh"})
+    return {"row_count": count, "rows_path": str(path)}
+
+
+def _post_all(site_url: str, payload: dict[str, Any]) -> dict[str, Any]:
+    return {"rows": [row for batch in iter_batches(site_url, payload) for row in batch]}
+
+
+def fetch_range(project: dict[str, Any], project_key: str, periods: list[str], run_id: str) -> dict[str, dict[str, Any]]:
+    """Per-month raws shaped like fetch(), with one date×dimension query per dimension over the whole range.
+
+    Rows stream through a JSONL file into DuckDB, which aggregates them per month into gsc_rows; months already
+    final in the warehouse are not queried again.
+    """
+    site_url = project["sources"]["gsc"]["property"]
+    months = {period: parse_period(period) for period in periods}
+    final_until = _freshness()[1]
+    ctxs = {period: RunContext(project_key, period, run_id, False) for period in periods}
+    refresh_daily(project, project_key, months[periods[0]].start, months[periods[-1]].end)
+
+    streamed: dict[str, dict[str, str]] = {}
+    for dimension in ("page", "query"):
+        statuses = gsc_partition_statuses(project_key, dimension, periods)
+        stale = [period for period in periods if statuses.get(period) != "final"]
+        if not stale:
+            continue
+        path = jsonl_path(raw_dir("gsc", ctxs[stale[0]]) / f"{run_id}.{dimension}.range.jsonl")
+        payload = {
+            "startDate": months[stale[0]].start.isoformat(),
+            "endDate": months[stale[-1]].end.isoformat(),
+            "dimensions": ["date", dimension],
         }
+        _stream_jsonl(path, iter_batches(site_url, payload), ["date", "key"])
+        load_gsc_range_rows(project_key, dimension, path, stale)
+        mark_gsc_partitions(
+            project_key, dimension, {p: "final" if months[p].end <= final_until else "fresh" for p in stale}
+        )
+        streamed[dimension] = {period: str(path) for period in stale}
+
+    result = {}
+    for period, month in months.items():
+        daily = gsc_daily_rows(project_key, month.start, month.end)
+        raw: dict[str, Any] = {"kpis": _month_kpis(project_key, month.start, month.end), "daily": {"rows": daily}}
+        for dimension, name in (("page", "pages"), ("query", "queries")):
+            rows, count = top_gsc_rows(project_key, period, dimension, TOP_ROW_LIMIT)
+            raw[name] = {"rows": rows, "row_count": count, "rows_path": streamed.get(dimension, {}).get(period)}
+        if project["sources"]["gsc"].get("page_query"):
+            base = {"startDate": month.start.isoformat(), "endDate": month.end.isoformat()}
+            raw["page_query"] = _month_page_query(site_url, base, ctxs[period], month.end <= final_until)
+        result[period] = {"raw": raw}
+    return result
+
+
+def _month_kpis(project_key: str, start: date, end: date) -> dict[str, Any]:
+    """The month's KPI row, shaped like a GSC totals query, aggregated in the warehouse from the stored days."""
+    kpis = gsc_kpis_for_window(project_key, start, end)
+    if not kpis["days"]:
+        return {"rows": []}
+    return {
+        "rows": [
+            {
+                "clicks": kpis["clicks"],
+                "impressions": kpis["impressions"],
+                "ctr": kpis["ctr"] or 0.0,
+                "position": kpis["avg_position"],
+            }
+        ]
     }
 
 
-def run(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
-    data = fetch(project, ctx)
+def run(project: dict[str, Any], ctx: RunContext, data: dict[str, Any] | None = None) -> dict[str, Any]:
+    # Range-prefetched months (backfill) are already in the warehouse.
+    if data is None:
+        replayed = replay_raw("gsc", ctx)
+        if replayed is not None:
+            return replayed
+        data = fetch(project, ctx)
     write_raw("gsc", ctx, data)
     return data
@@ -1,15 +1,53 @@
 from __future__ import annotations
 
+import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Any
 
-import requests
-
-from app.extractors.base import RunContext, write_raw
+from app.core import scheduler
+from app.core.config import ensure_dirs
+from app.core.lake import codec_path, lake_codec, open_lake, read_json
+from app.core.duckdb_store import top_gsc_rows
+from app.extractors.base import RunContext, raw_dir, replay_raw, write_raw
 from app.utils.fixtures import load_fixture
+from app.utils.lighthouse import slim_result
 
 
 PSI_ENDPOINT = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
+STRATEGIES = ("mobile", "desktop")
+# Only the performance category is scored; the others multiply Lighthouse's work and the response size.
+PSI_CATEGORIES = ["performance"]
+
+
+def audit_urls(project: dict[str, Any], ctx: RunContext) -> list[str]:
+    """The canonical origin plus the month's top-N GSC pages by clicks (sources.pagespeed.top_pages)."""
+    urls = [project["canonical_origin"]] if project.get("canonical_origin") else []
+    top_n = project["sources"]["pagespeed"].get("top_pages", 0)
+    if top_n:
+        rows, _ = top_gsc_rows(ctx.project_key, ctx.period, "page", top_n)
+        urls += [row["keys"][0] for row in rows if row["keys"][0] not in urls]
+    return urls
+
+
+def _blob_path(ctx: RunContext, url: str, strategy: str, codec: str) -> Path:
+    slug = hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+    return codec_path(raw_dir("pagespeed", ctx) / f"{ctx.run_id}.{slug}.{strategy}.json", codec)
+
+
+def _run_pagespeed(url: str, strategy: str, api_key: str, blob: Path) -> dict[str, Any]:
+    """One PSI run: the Lighthouse JSON is streamed to `blob` (lake codec) and only the slim metrics are kept."""
+    params = {"url": url, "strategy": strategy, "key": api_key, "category": PSI_CATEGORIES}
+    # The concurrency slot is held until the body has been read and the response closed.
+    with scheduler.request("GET", PSI_ENDPOINT, credential=api_key, params=params, timeout=60, stream=True) as res:
+        res.raise_for_status()
+        ensure_dirs([blob.parent])
+        with open_lake(blob, "wb") as f:
+            for chunk in res.iter_content(chunk_size=65536):
+                f.write(chunk)
+    # Parsed back from the blob, so the response body is never held in memory next to the parsed result.
+    return {**slim_result(read_json(blob)), "url": url, "raw_path": str(blob)}
 
 
 def fetch(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
@@ -20,17 +58,37 @@ def fetch(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
     if not api_key:
         raise RuntimeError("GOOGLE_API_KEY missing")
 
-    url = project.get("canonical_origin")
+    origin = project.get("canonical_origin")
+    codec = lake_codec()
+    jobs = [(url, strategy) for url in audit_urls(project, ctx) for strategy in STRATEGIES]
+
+    def audit(job: tuple[str, str]) -> dict[str, Any]:
+        try:
+            return _run_pagespeed(*job, api_key, _blob_path(ctx, *job, codec))
+        except Exception as exc:
+            # A failing page is reported in the raw; only the origin is required.
+            if job[0] == origin:
+                raise
+            return {"error": str(exc)}
+
+    # Each call takes 10-30 s, so run as many as the scheduler lets through to the PSI host at once.
+    workers = scheduler.concurrency_for(PSI_ENDPOINT)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs) or 1)), thread_name_prefix="pagespeed") as pool:
+        responses = list(pool.map(audit, jobs))
+
     results: dict[str, Any] = {}
-    for strategy in ("mobile", "desktop"):
-        params = {"url": url, "strategy": strategy, "key": api_key}
-        res = requests.get(PSI_ENDPOINT, params=params, timeout=60)
-        res.raise_for_status()
-        results[strategy] = res.json()
+    for (url, strategy), response in zip(jobs, responses):
+        if url == origin:
+            results[strategy] = response
+        else:
+            results.setdefault("pages", {}).setdefault(url, {})[strategy] = response
     return results
 
 
 def run(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
+    replayed = replay_raw("pagespeed", ctx)
+    if replayed is not None:
+        return replayed
     data = fetch(project, ctx)
     write_raw("pagespeed", ctx, data)
     return data
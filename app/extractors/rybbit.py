@@ -1,42 +1,127 @@
 from __future__ import annotations
 
+import json
 import os
-from typing import Any
-
-import requests
+from datetime import date, timedelta
+from typing import Any, Iterator
 
+from app.core import scheduler
+from app.core.config import ensure_dirs
+from app.core.duckdb_store import (
+    analytics_complete_days,
+    analytics_kpis_by_grain,
+    analytics_kpis_for_window,
+    analytics_rows_fetched_on,
+    load_analytics_rows,
+    store_analytics_daily,
+    top_analytics_rows,
+)
+from app.core.lake import jsonl_path, open_jsonl
+from app.core.policy import load_policy, policy_today
 from app.core.time_utils import parse_period
-from app.extractors.base import RunContext, write_raw
+from app.extractors.base import RunContext, raw_dir, replay_raw, write_raw
 from app.utils.fixtures import load_fixture
 
 
 DEFAULT_BASE = ""
+PAGE_LIMIT = 1000
+TOP_ROW_LIMIT = 50
+# Warehouse dimension -> Rybbit breakdown endpoint under /sites/{id}/stats/.
+BREAKDOWNS = {"page": "pages", "source": "referrers"}
 
 
-def fetch(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
-    if ctx.mock:
-        return load_fixture("rybbit")
-
+def _auth(project: dict[str, Any]) -> tuple[str, str]:
+    """(API token, stats URL of the configured site)."""
     token = os.environ.get("RYBBIT_API_KEY", "").strip()
     if not token:
         raise RuntimeError("RYBBIT_API_KEY missing")
     base = os.environ.get("RYBBIT_API_BASE", DEFAULT_BASE).strip()
     if not base:
         raise RuntimeError("RYBBIT_API_BASE missing")
-
     site_id = project.get("sources", {}).get("rybbit", {}).get("site_id")
     if not site_id:
         raise RuntimeError("sources.rybbit.site_id missing")
+    return token, f"{base.rstrip('/')}/sites/{site_id}/stats"
 
-    period = parse_period(ctx.period)
-    params = {"from": period.start.isoformat(), "to": period.end.isoformat()}
-    url = f"{base.rstrip('/')}/sites/{site_id}/stats"
-    res = requests.get(url, params=params, headers={"Authorization": f"Bearer {token}"}, timeout=60)
+
+def _get(url: str, token: str, params: dict[str, Any]) -> dict[str, Any]:
+    res = scheduler.request(
+        "GET", url, credential=token, params=params, headers={"Authorization": f"Bearer {token}"}, timeout=60
+    )
     res.raise_for_status()
     return res.json()
 
 
+def iter_pages(url: str, token: str, params: dict[str, Any]) -> Iterator[list[dict[str, Any]]]:
+    """Page through a breakdown, yielding each page of rows as it arrives."""
+    page = 1
+    while True:
+        batch = _get(url, token, {**params, "page": page, "limit": PAGE_LIMIT}).get("rows", [])
+        if batch:
+            yield batch
+        if len(batch) < PAGE_LIMIT:
+            return
+        page += 1
+
+
+def _range(start: date, end: date) -> dict[str, str]:
+    return {"from": start.isoformat(), "to": end.isoformat()}
+
+
+def refresh_daily(auth: tuple[str, str], project_key: str, start: date, end: date, today: date) -> int:
+    """Fetch day buckets that are missing or were stored before the day ended; returns the number of days refetched."""
+    days = [start + timedelta(days=n) for n in range((min(end, today) - start).days + 1)]
+    complete = analytics_complete_days(project_key, start, end)
+    stale = [d for d in days if d not in complete]
+    if not stale:
+        return 0
+    token, url = auth
+    buckets = _get(url, token, {**_range(stale[0], stale[-1]), "bucket": "day"}).get("buckets", [])
+    store_analytics_daily(project_key, buckets, today)
+    return len(buckets)
+
+
+def _breakdown(auth: tuple[str, str], dimension: str, ctx: RunContext, start: date, end: date, today: date) -> dict[str, Any]:
+    # A month fetched after it ended is final and is read back from the warehouse.
+    fetched_on = analytics_rows_fetched_on(ctx.project_key, ctx.period, dimension)
+    path = None
+    if fetched_on is None or fetched_on <= end:
+        path = jsonl_path(raw_dir("rybbit", ctx) / f"{ctx.run_id}.{dimension}.jsonl")
+        ensure_dirs([path.parent])
+        with open_jsonl(path, "w") as f:
+            for batch in iter_pages(f"{auth[1]}/{BREAKDOWNS[dimension]}", auth[0], _range(start, end)):
+                for row in batch:
+                    record = {"key": row.get("value"), "sessions": row.get("sessions"), "conversions": row.get("conversions")}
+                    f.write(json.dumps(record) + "\n")
+        load_analytics_rows(ctx.project_key, ctx.period, dimension, path, today)
+    rows, count = top_analytics_rows(ctx.project_key, ctx.period, dimension, TOP_ROW_LIMIT)
+    return {"rows": rows, "row_count": count, "rows_path": str(path) if path else None}
+
+
+def fetch(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
+    if ctx.mock:
+        return load_fixture("rybbit")
+
+    auth = _auth(project)
+    period = parse_period(ctx.period)
+    today = policy_today(load_policy())
+    # Month totals are the warehouse aggregate of day buckets; only incomplete days hit the API.
+    refresh_daily(auth, ctx.project_key, period.start, period.end, today)
+    totals = analytics_kpis_for_window(ctx.project_key, period.start, period.end)
+    return {
+        "sessions": totals["sessions"],
+        "conversions": totals["conversions"],
+        "conversion_rate": totals["conversion_rate"],
+        "daily": {"rows": analytics_kpis_by_grain(ctx.project_key, "day", period.start, period.end)},
+        "pages": _breakdown(auth, "page", ctx, period.start, period.end, today),
+        "sources": _breakdown(auth, "source", ctx, period.start, period.end, today),
+    }
+
+
 def run(project: dict[str, Any], ctx: RunContext) -> dict[str, Any]:
+    replayed = replay_raw("rybbit", ctx)
+    if replayed is not None:
+        return replayed
     data = fetch(project, ctx)
     write_raw("rybbit", ctx, data)
     return data
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.core.manifest import load_manifest
+from app.core.registry import load_notion_registry
+from app.exports.notion import export_notion_fields
+from app.render.report import build_template_trace, render_report, template_environment
+
+
+@dataclass(frozen=True)
+class RenderOutcome:
+    payload_path: str
+    status: str
+    error: str | None = None
+
+
+@dataclass(frozen=True)
+class RenderSummary:
+    workers: int
+    payloads_total: int
+    rendered: int
+    failed: int
+    duration_s: float
+    failures: list[dict[str, Any]] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+
+# Manifest, template environment and Notion registry, loaded once per process.
+_RENDERER: dict[str, Any] = {}
+
+
+def _init_renderer() -> None:
+    _RENDERER.update(manifest=load_manifest(), env=template_environment(), registry=load_notion_registry())
+
+
+def find_payloads(project_paths: list[Path], periods: list[str]) -> list[Path]:
+    """Stored report_payload.json files for the given projects/periods, with or without a language folder."""
+    found: list[Path] = []
+    for path in project_paths:
+        project = json.loads(path.read_text(encoding="utf-8"))
+        output_root = Path(project["output_path"]).expanduser().resolve()
+        for period in periods:
+            period_dir = output_root / period
+            found.extend(sorted(period_dir.glob("report_payload.json")))
+            found.extend(sorted(period_dir.glob("*/report_payload.json")))
+    return found
+
+
+def render_payload_file(path: Path) -> RenderOutcome:
+    if not _RENDERER:
+        _init_renderer()
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        files = {
+            "report.md": render_report(payload, _RENDERER["manifest"], _RENDERER["env"]),
+            "notion_fields.md": export_notion_fields(payload, _RENDERER["registry"]),
+            "template_trace.json": json.dumps(build_template_trace(payload, _RENDERER["manifest"]), indent=2),
+        }
+        for name, content in files.items():
+            (path.parent / name).write_text(content, encoding="utf-8")
+    except Exception as exc:
+        return RenderOutcome(str(path), "failed", error=f"{type(exc).__name__}: {exc}")
+    return RenderOutcome(str(path), "ok")
+
+
+def render_all(paths: list[Path], workers: int = 1) -> tuple[list[RenderOutcome], RenderSummary]:
+    started = time.monotonic()
+    if workers <= 1 or len(paths) <= 1:
+        _init_renderer()
+        outcomes = [render_payload_file(path) for path in paths]
+    else:
+        workers = min(workers, len(paths))
+        # Rendering one payload takes milliseconds; chunking keeps IPC overhead from dominating.
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_renderer) as pool:
+            outcomes = list(pool.map(render_payload_file, paths, chunksize=chunksize))
+    duration = round(time.monotonic() - started, 3)
+    failures = [{"payload_path": o.payload_path, "error": o.error} for o in outcomes if o.status != "ok"]
+    summary = RenderSummary(
+        workers=max(1, workers),
+        payloads_total=len(outcomes),
+        rendered=len(outcomes) - len(failures),
+        failed=len(failures),
+        duration_s=duration,
+        failures=failures,
+    )
+    return outcomes, summary
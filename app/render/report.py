@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from datetime import datetime, timezone
 from typing import Any
 
 from jinja2 import Environment, FileSystemLoader
@@ -8,15 +9,47 @@ from app.core.config import REPO_ROOT
 from app.core.manifest import load_manifest, template_for_language
 
 
-def render_report(payload: dict[str, Any]) -> str:
-    manifest = load_manifest()
-    language = payload.get("meta", {}).get("report_language", "de")
-    template_path = template_for_language(manifest, language)
-
-    env = Environment(
+def template_environment() -> Environment:
+    return Environment(
         loader=FileSystemLoader(str(REPO_ROOT)),
         autoescape=False,
     )
 
+
+def render_report(
+    payload: dict[str, Any],
+    manifest: dict[str, Any] | None = None,
+    env: Environment | None = None,
+) -> str:
+    # Bulk rendering passes a preloaded manifest/environment so templates compile once per process.
+    manifest = manifest or load_manifest()
+    language = payload.get("meta", {}).get("report_language", "de")
+    template_path = template_for_language(manifest, language)
+
+    env = env or template_environment()
     template = env.get_template(str(template_path.relative_to(REPO_ROOT)))
     return template.render(**payload)
+
+
+OUTPUT_FILENAMES = [
+    "report.md",
+    "report_payload.json",
+    "actions_debug.json",
+    "notion_fields.md",
+    "template_trace.json",
+    "run_trace.json",
+]
+
+
+def build_template_trace(payload: dict[str, Any], manifest: dict[str, Any]) -> dict[str, Any]:
+    language = payload.get("meta", {}).get("report_language", "de")
+    template_key = manifest.get("defaults", {}).get("template_by_language", {}).get(language)
+    template_path = manifest.get("paths", {}).get("templates", {}).get(template_key)
+    return {
+        "lang": language,
+        "template_key": template_key,
+        "template_path": template_path,
+        "output_filenames": list(OUTPUT_FILENAMES),
+        "variable_sections": sorted(payload.keys()),
+        "render_timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+    }
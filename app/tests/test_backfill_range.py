@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core.backfill import run_backfill
+from app.core.duckdb_store import gsc_partition_statuses
+from app.core.lake import load_mart
+from app.extractors import gsc as gsc_extractor
+
+
+def _fake_post(site_url, payload):
+    dims = payload.get("dimensions", [])
+    rows = []
+    for day in ("2025-11-03", "2025-11-20", "2025-12-05", "2026-01-10"):
+        if dims == ["date"]:
+            rows.append({"keys": [day], "clicks": 10, "impressions": 100, "ctr": 0.1, "position": 4.0})
+        else:
+            rows.append({"keys": [day, "a"], "clicks": 6, "impressions": 50, "ctr": 0.12, "position": 2.0})
+            rows.append({"keys": [day, "b"], "clicks": 4, "impressions": 50, "ctr": 0.08, "position": 6.0})
+    return {"rows": rows}
+
+
+class BackfillRangeTests(unittest.TestCase):
+    def test_fetch_range_aggregates_per_month_in_the_warehouse(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            project = {"sources": {"gsc": {"property": "sc-domain:example.com"}}}
+            periods = ["2025-11", "2025-12"]
+            with patch("app.extractors.gsc._post", side_effect=_fake_post) as post:
+                by_month = gsc_extractor.fetch_range(project, "client_abc", periods, "20260205T070000Z")
+                self.assertEqual(post.call_count, 3)
+                # Past months are final, so a regular run serves them from gsc_rows without querying.
+                self.assertEqual(gsc_partition_statuses("client_abc", "page", periods), {p: "final" for p in periods})
+                again = gsc_extractor.fetch_range(project, "client_abc", periods, "20260206T070000Z")
+                self.assertEqual(post.call_count, 3)
+
+        raw = by_month["2025-11"]["raw"]
+        kpis = raw["kpis"]["rows"][0]
+        self.assertEqual((kpis["clicks"], kpis["impressions"]), (20, 200))
+        self.assertAlmostEqual(kpis["position"], 4.0)
+        pages = raw["pages"]
+        self.assertEqual([p["keys"][0] for p in pages["rows"]], ["a", "b"])
+        self.assertEqual((pages["rows"][0]["clicks"], pages["rows"][0]["impressions"]), (12, 100))
+        self.assertAlmostEqual(pages["rows"][0]["ctr"], 0.12)
+        self.assertEqual(pages["row_count"], 2)
+        self.assertTrue(pages["rows_path"].endswith("20260205T070000Z.page.range.jsonl.gz"))
+        self.assertEqual(by_month["2025-12"]["raw"]["queries"]["rows"][0]["clicks"], 6)
+        self.assertIsNone(again["2025-11"]["raw"]["pages"]["rows_path"])
+        self.assertEqual(again["2025-11"]["raw"]["pages"]["rows"], pages["rows"])
+
+    def test_backfill_issues_one_query_per_dimension(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            project_dir = workspace / "projects" / "client_abc"
+            project_dir.mkdir(parents=True, exist_ok=True)
+            project = json.loads(Path("examples/project_pack/sample_project.json").read_text(encoding="utf-8"))
+            project["output_path"] = str(workspace / "reports" / "client_abc")
+            for name in ("pagespeed", "crux"):
+                project["sources"][name]["enabled"] = False
+            project_path = project_dir / "project.json"
+            project_path.write_text(json.dumps(project, indent=2), encoding="utf-8")
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+
+            with patch("app.extractors.gsc._post", side_effect=_fake_post) as post:
+                result = run_backfill(project_path, ["2025-11", "2025-12", "2026-01"])
+
+            self.assertEqual(post.call_count, 3)
+            self.assertEqual(result.range_fetched, ["gsc"])
+            self.assertEqual(len(result.output_dirs), 3)
+            self.assertEqual(load_mart("client_abc", "2025-12", "gsc_monthly")["kpis"]["clicks"], 10)
+            payload = json.loads((result.output_dirs[1] / "report_payload.json").read_text(encoding="utf-8"))
+            self.assertEqual(payload["kpis"]["gsc"]["clicks_mom_pct"], -0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.core.batch import discover_projects, run_batch
+
+
+class BatchGenerateTests(unittest.TestCase):
+    def _write_project(self, workspace: Path, key: str, valid: bool = True) -> None:
+        project_dir = workspace / "projects" / key
+        project_dir.mkdir(parents=True, exist_ok=True)
+        project = json.loads(Path("examples/project_pack/sample_project.json").read_text(encoding="utf-8"))
+        project["project_key"] = key
+        project["output_path"] = str(workspace / "reports" / key)
+        if not valid:
+            del project["thresholds"]
+        (project_dir / "project.json").write_text(json.dumps(project, indent=2), encoding="utf-8")
+
+    def test_failures_isolated_and_order_deterministic(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            for key in ("client_c", "client_a", "client_b"):
+                self._write_project(workspace, key, valid=(key != "client_b"))
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+
+            paths = discover_projects(workspace / "projects")
+            outcomes, summary = run_batch(paths, "2026-01", mock=True, workers=2)
+
+            self.assertEqual([o.project_key for o in outcomes], ["client_a", "client_b", "client_c"])
+            self.assertEqual([o.status for o in outcomes], ["ok", "failed", "ok"])
+            self.assertEqual(summary.projects_total, 3)
+            self.assertEqual(summary.succeeded, 2)
+            self.assertEqual(summary.failures[0]["project_key"], "client_b")
+            self.assertTrue((workspace / "reports" / "client_c" / "2026-01" / "de" / "report.md").exists())
+            self.assertIn("projects_per_minute", json.loads(summary.to_json()))
+
+
+if __name__ == "__main__":
+    unittest.main()
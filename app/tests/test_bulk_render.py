@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.core.batch import discover_projects
+from app.core.pipeline import run as generate_run
+from app.render.bulk import find_payloads, render_all
+
+
+class BulkRenderTests(unittest.TestCase):
+    def test_rerenders_stored_payloads(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            project_dir = workspace / "projects" / "client_abc"
+            project_dir.mkdir(parents=True, exist_ok=True)
+            project = json.loads(Path("examples/project_pack/sample_project.json").read_text(encoding="utf-8"))
+            project["output_path"] = str(workspace / "reports" / "client_abc")
+            project_path = project_dir / "project.json"
+            project_path.write_text(json.dumps(project, indent=2), encoding="utf-8")
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+
+            dirs = [generate_run(project_path, period, mock=True) for period in ("2026-01", "2026-02")]
+            expected = (dirs[0] / "report.md").read_text(encoding="utf-8")
+            for output_dir in dirs:
+                (output_dir / "report.md").write_text("stale", encoding="utf-8")
+            broken = workspace / "reports" / "client_abc" / "2026-03" / "en"
+            broken.mkdir(parents=True)
+            (broken / "report_payload.json").write_text("{", encoding="utf-8")
+
+            payloads = find_payloads(discover_projects(workspace / "projects"), ["2026-01", "2026-02", "2026-03"])
+            self.assertEqual(len(payloads), 3)
+            outcomes, summary = render_all(payloads, workers=2)
+
+            self.assertEqual([o.status for o in outcomes], ["ok", "ok", "failed"])
+            self.assertEqual(summary.rendered, 2)
+            self.assertEqual(summary.failures[0]["payload_path"], str(broken / "report_payload.json"))
+            self.assertEqual((dirs[0] / "report.md").read_text(encoding="utf-8"), expected)
+            self.assertNotEqual((dirs[1] / "report.md").read_text(encoding="utf-8"), "stale")
+
+
+if __name__ == "__main__":
+    unittest.main()
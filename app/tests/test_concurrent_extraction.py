@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core import pipeline
+from app.utils.fixtures import load_fixture
+
+
+def _slow(fixture: str):
+    def fn(project, ctx, project_dir, prefetched):
+        time.sleep(0.3)
+        return load_fixture(fixture)
+    return fn
+
+
+def _failing(project, ctx, project_dir, prefetched):
+    raise RuntimeError("boom")
+
+
+class ConcurrentExtractionTests(unittest.TestCase):
+    def _write_project(self, workspace: Path) -> Path:
+        project_dir = workspace / "projects" / "client_abc"
+        project_dir.mkdir(parents=True, exist_ok=True)
+        project = json.loads(Path("examples/project_pack/sample_project.json").read_text(encoding="utf-8"))
+        project["output_path"] = str(workspace / "reports" / "client_abc")
+        project["sources"]["dataforseo"]["enabled"] = True
+        project["sources"]["rybbit"] = {"enabled": True, "site_id": "1"}
+        path = project_dir / "project.json"
+        path.write_text(json.dumps(project, indent=2), encoding="utf-8")
+        return path
+
+    def test_parallel_wall_time(self):
+        extractors = {
+            "gsc": _slow("gsc"),
+            "dataforseo": _slow("dataforseo"),
+            "pagespeed": _slow("pagespeed"),
+            "rybbit": _slow("rybbit"),
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            project_path = self._write_project(workspace)
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+
+            with patch.dict(pipeline.SOURCE_EXTRACTORS, extractors):
+                started = time.monotonic()
+                output_dir = pipeline.run(project_path, "2026-01", mock=True, source_workers=4)
+                elapsed = time.monotonic() - started
+
+            self.assertLess(elapsed, 0.9)
+            trace = json.loads((output_dir / "run_trace.json").read_text(encoding="utf-8"))
+            statuses = {step["name"]: step["status"] for step in trace["steps"]}
+            for source in extractors:
+                self.assertEqual(statuses[f"extract:{source}"], "done")
+            payload = json.loads((output_dir / "report_payload.json").read_text(encoding="utf-8"))
+            self.assertEqual(payload["kpis"]["analytics"]["sessions"], 1200)
+
+    def test_failure_is_collected(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            project_path = self._write_project(workspace)
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+
+            with patch.dict(pipeline.SOURCE_EXTRACTORS, {"gsc": _failing}):
+                output_dir = pipeline.run(project_path, "2026-01", mock=True, source_workers=4)
+
+            payload = json.loads((output_dir / "report_payload.json").read_text(encoding="utf-8"))
+            self.assertEqual(payload["missing_sources"], ["gsc", "rankings"])
+            self.assertIn("gsc: extraction failed (boom)", payload["warnings"])
+            self.assertIn("DataForSEO: keywords.csv missing or empty.", payload["warnings"])
+            self.assertEqual(payload["kpis"]["analytics"]["sessions"], 1200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core.duckdb_store import latest_crux_metrics, load_gsc_rows
+from app.core.policy import load_policy, policy_today
+from app.extractors import crux as crux_extractor
+from app.extractors.base import RunContext
+from app.transforms import cwv as cwv_transform
+
+
+def _ymd(day):
+    return {"year": day.year, "month": day.month, "day": day.day}
+
+
+class _Resp:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def json(self):
+        return self.body
+
+
+class CruxBatchTests(unittest.TestCase):
+    def test_origin_and_top_urls_per_form_factor_cached_and_stored(self):
+        last = policy_today(load_policy()) - timedelta(days=3)
+        periods = [{"firstDate": _ymd(end - timedelta(days=27)), "lastDate": _ymd(end)} for end in (last - timedelta(days=7), last)]
+        calls = []
+
+        def fake_request(method, url, **kwargs):
+            body = kwargs["json"]
+            calls.append(body)
+            target = body.get("origin") or body["url"]
+            if target.endswith("/quiet"):
+                return _Resp(404)
+            lcp = 1000 + len(target) + (100 if body.get("formFactor") == "PHONE" else 0)
+            metrics = {
+                "largest_contentful_paint": {"percentilesTimeseries": {"p75s": [lcp + 50, lcp]}},
+                "cumulative_layout_shift": {"percentilesTimeseries": {"p75s": ["0.12", "0.05"]}},
+            }
+            return _Resp(200, {"record": {"key": body, "metrics": metrics, "collectionPeriods": periods}})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            rows = Path(tmp) / "pages.jsonl"
+            pages = ["https://example.com/a", "https://example.com/quiet"]
+            rows.write_text("".join(json.dumps({"key": url, "clicks": 5}) + "\n" for url in pages), encoding="utf-8")
+            load_gsc_rows("client_abc", "2026-01", "page", rows)
+
+            project = {"canonical_origin": "https://example.com", "sources": {"crux": {"enabled": True, "top_urls": 2}}}
+            ctx = RunContext("client_abc", "2026-01", "20260205T070000Z", False)
+            with patch.dict(os.environ, {"GOOGLE_API_KEY": "key"}), patch(
+                "app.extractors.crux.scheduler.request", side_effect=fake_request
+            ):
+                raw = crux_extractor.fetch(project, ctx)
+                # origin (all, phone, desktop) + 2 urls x 2 form factors
+                self.assertEqual(len(calls), 7)
+                again = crux_extractor.fetch(project, ctx)
+                self.assertEqual(len(calls), 7)
+
+            stored = latest_crux_metrics("https://example.com/a")
+
+        self.assertEqual(raw, again)
+        self.assertEqual(cwv_transform.from_crux(raw)["lcp_p75_ms"], 1019)
+        self.assertEqual(cwv_transform.from_crux(raw)["cls_p75"], 0.05)
+        self.assertEqual([r["form_factor"] for r in raw["records"]], ["PHONE", "DESKTOP"] * 3)
+        self.assertEqual(raw["records"][-1]["response"], {})
+        self.assertEqual(
+            [(r["form_factor"], r["collection_end"], r["lcp_p75_ms"]) for r in stored],
+            [("DESKTOP", last.isoformat(), 1021.0), ("PHONE", last.isoformat(), 1121.0)],
+        )
+
+    def test_history_p75s_come_from_one_collection_period(self):
+        # The latest period has no INP yet; all three metrics are read from the one before.
+        metrics = {
+            "largest_contentful_paint": {"percentilesTimeseries": {"p75s": [1200, 1100, 1000]}},
+            "interaction_to_next_paint": {"percentilesTimeseries": {"p75s": [210, 190, None]}},
+            "cumulative_layout_shift": {"percentilesTimeseries": {"p75s": ["0.10", "0.08", "0.06"]}},
+        }
+        cwv = cwv_transform.from_crux({"record": {"metrics": metrics}})
+        self.assertEqual((cwv["lcp_p75_ms"], cwv["inp_p75_ms"], cwv["cls_p75"]), (1100.0, 190.0, 0.08))
+
+
+if __name__ == "__main__":
+    unittest.main()
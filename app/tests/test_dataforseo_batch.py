@@ -0,0 +1,129 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core.lake import open_jsonl
+from app.extractors import dataforseo as dataforseo_extractor
+from app.extractors.base import RunContext
+from app.tools.dataforseo_stub import serve
+from app.transforms import rankings as rankings_transform
+
+
+class DataForSeoBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.server, self.state = serve(domain="example.com", ready_after_s=0.05)
+        self.addCleanup(self.server.shutdown)
+        env = {
+            "DATAFORSEO_API_BASE": f"http://127.0.0.1:{self.server.server_address[1]}",
+            "DATAFORSEO_LOGIN": "login",
+            "DATAFORSEO_PASSWORD": "secret",
+        }
+        patcher = patch.dict(os.environ, env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batch_mode_chunks_polls_and_streams(self):
+        keywords = [f"keyword {i}" for i in range(7)]
+        project = {"domain": "example.com", "sources": {"dataforseo": {"locations_set": "de_core", "mode": "batch"}}}
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            ctx = RunContext("client_abc", "2026-01", "20260205T070000Z", False)
+            with patch.object(dataforseo_extractor, "TASK_POST_LIMIT", 3), patch.object(
+                dataforseo_extractor, "POLL_INTERVAL_S", 0.02
+            ):
+                raw = dataforseo_extractor.run(project, ctx, keywords)
+
+            self.assertEqual(self.state.calls["task_post"], 3)
+            self.assertEqual(self.state.calls["task_get"], 7)
+            self.assertEqual(raw["task_count"], 7)
+            self.assertTrue(raw["tasks_path"].endswith(".tasks.jsonl.gz"))
+            with open_jsonl(Path(raw["tasks_path"])) as f:
+                self.assertEqual(len(f.readlines()), 7)
+            self.assertNotIn("tasks", raw)
+
+            mart = rankings_transform.to_mart(raw, "example.com")
+            self.assertEqual(sorted(m["keyword"] for m in mart["movers"]), keywords)
+            self.assertIsNotNone(mart["kw_top20"])
+
+    def test_fans_out_locations_and_devices(self):
+        keywords = ["seo agentur", "seo beratung"]
+        dataforseo = {"locations_set": "dach", "device_set": "mobile,desktop"}
+        ctx = RunContext("client_abc", "2026-01", "20260205T070000Z", False)
+        for mode in ("live", "batch"):
+            with tempfile.TemporaryDirectory() as tmp:
+                os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+                project = {"sources": {"dataforseo": {**dataforseo, "mode": mode}}}
+                with patch.object(dataforseo_extractor, "POLL_INTERVAL_S", 0.02):
+                    raw = dataforseo_extractor.fetch(project, ctx, keywords)
+                mart = rankings_transform.to_mart(raw, "example.com")
+                self.assertEqual(
+                    [(s["location"], s["device"]) for s in mart["segments"]],
+                    [(loc, dev) for loc in ("Germany", "Austria", "Switzerland") for dev in ("mobile", "desktop")],
+                )
+                self.assertEqual({(m["location"], m["device"]) for m in mart["movers"]}, {("Germany", "mobile")})
+        self.assertEqual(self.state.calls["live"], 6)
+        self.assertEqual(self.state.calls["task_get"], 12)
+
+    def test_serp_cache_shared_across_projects(self):
+        keywords = ["steuerberater berlin", "steuerberater hamburg"]
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            marts = {}
+            for key, domain, mode in (("client_a", "example.com", "live"), ("client_b", "rank3.example", "batch")):
+                project = {"sources": {"dataforseo": {"locations_set": "de_core", "mode": mode}}}
+                raw = dataforseo_extractor.run(project, RunContext(key, "2026-01", "20260205T070000Z", False), keywords)
+                marts[key] = rankings_transform.to_mart(raw, domain)
+
+        # The second project is served entirely from the first one's SERPs.
+        self.assertEqual(self.state.calls, {"live": 1})
+        self.assertEqual(raw["serp_cache_hits"], 2)
+        self.assertEqual([m["position"] for m in marts["client_b"]["movers"]], [3, 3])
+        self.assertNotEqual(marts["client_a"]["movers"], marts["client_b"]["movers"])
+
+    def test_batch_mode_times_out(self):
+        with patch.object(dataforseo_extractor, "BATCH_TIMEOUT_S", 0), patch.object(
+            dataforseo_extractor, "POLL_INTERVAL_S", 0
+        ):
+            auth = dataforseo_extractor._auth()
+            ids = dataforseo_extractor.post_tasks([{"keyword": "slow"}], auth)
+            self.state.tasks[ids[0]] = (float("inf"), {"keyword": "slow"})
+            with self.assertRaises(RuntimeError):
+                list(dataforseo_extractor.iter_results(ids, auth))
+
+    def test_one_ready_listing_serves_every_waiter(self):
+        auth = dataforseo_extractor._auth()
+        first, second = dataforseo_extractor.post_tasks([{"keyword": "a"}, {"keyword": "b"}], auth)
+        time.sleep(0.1)
+        poller = dataforseo_extractor.ReadyPoller()
+        with patch.object(dataforseo_extractor, "POLL_INTERVAL_S", 60):
+            self.assertEqual(poller.ready({first}, auth), {first})
+            self.assertEqual(poller.ready({first, second}, auth), {second})
+            self.assertEqual(poller.ready({first, second}, auth), set())
+        self.assertEqual(self.state.calls["tasks_ready"], 1)
+
+    def test_tasks_missing_from_ready_listing_are_fetched_directly(self):
+        # Other runs' tasks fill the account-wide listing, so ours never show up in it.
+        self.state.ready_limit = 0
+        with patch.object(dataforseo_extractor, "POLL_INTERVAL_S", 0.02):
+            auth = dataforseo_extractor._auth()
+            ids = dataforseo_extractor.post_tasks([{"keyword": f"kw {i}"} for i in range(3)], auth)
+            tasks = list(dataforseo_extractor.iter_results(ids, auth))
+        self.assertEqual(sorted(t["id"] for t in tasks), sorted(ids))
+        self.assertEqual(self.state.calls["tasks_ready"], dataforseo_extractor.READY_POLLS)
+
+    def test_failed_task_raises(self):
+        failed = {"status_code": 40501, "status_message": "Invalid Field: 'location_name'.", "data": {"keyword": "x"}}
+        with patch.object(dataforseo_extractor, "POLL_INTERVAL_S", 0.02), patch.object(
+            self.state, "get", side_effect=lambda task_id: {"id": task_id, **failed}
+        ):
+            auth = dataforseo_extractor._auth()
+            ids = dataforseo_extractor.post_tasks([{"keyword": "x"}], auth)
+            with self.assertRaisesRegex(RuntimeError, "40501"):
+                list(dataforseo_extractor.iter_results(ids, auth))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -30,7 +30,7 @@ class DoctorConnectivityTests(unittest.TestCase):
 
     def test_pagespeed_ok(self):
         with patch.dict(os.environ, {"GOOGLE_API_KEY": "x"}, clear=True):
-            with patch("requests.get") as req:
+            with patch("app.core.doctor.scheduler.request") as req:
                 req.return_value = _Resp(True)
                 ok, msg = doctor._check_pagespeed_connectivity({"canonical_origin": "https://example.com"})
                 self.assertTrue(ok)
@@ -38,7 +38,7 @@ class DoctorConnectivityTests(unittest.TestCase):
 
     def test_crux_ok(self):
         with patch.dict(os.environ, {"GOOGLE_API_KEY": "x"}, clear=True):
-            with patch("requests.post") as req:
+            with patch("app.core.doctor.scheduler.request") as req:
                 req.return_value = _Resp(True)
                 ok, msg = doctor._check_crux_connectivity({"canonical_origin": "https://example.com"})
                 self.assertTrue(ok)
@@ -52,7 +52,7 @@ class DoctorConnectivityTests(unittest.TestCase):
 
     def test_dataforseo_ok(self):
         with patch.dict(os.environ, {"DATAFORSEO_LOGIN": "u", "DATAFORSEO_PASSWORD": "p"}, clear=True):
-            with patch("requests.get") as req:
+            with patch("app.core.doctor.scheduler.request") as req:
                 req.return_value = _Resp(True)
                 ok, msg = doctor._check_dataforseo_connectivity()
                 self.assertTrue(ok)
@@ -66,7 +66,7 @@ class DoctorConnectivityTests(unittest.TestCase):
 
     def test_rybbit_ok(self):
         with patch.dict(os.environ, {"RYBBIT_API_KEY": "k", "RYBBIT_API_BASE": "https://rybbit.test"}, clear=True):
-            with patch("requests.get") as req:
+            with patch("app.core.doctor.scheduler.request") as req:
                 req.return_value = _Resp(True)
                 ok, msg = doctor._check_rybbit_connectivity()
                 self.assertTrue(ok)
@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from app.core import gsc_auth
+
+
+class _FakeCreds:
+    service_account_email = "reporter@example.iam.gserviceaccount.com"
+
+    def __init__(self, lifetime):
+        self.token = None
+        self.expiry = None
+        self.lifetime = lifetime
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + self.lifetime
+
+
+class GscAuthTests(unittest.TestCase):
+    def setUp(self):
+        os.environ["GSC_AUTH_MODE"] = "service_account"
+        os.environ["GSC_CREDENTIALS_JSON"] = json.dumps({"type": "service_account", "client_email": "a@example.com"})
+        gsc_auth.clear_cache()
+
+    def test_token_reused_until_close_to_expiry(self):
+        creds = _FakeCreds(timedelta(hours=1))
+        with patch("app.core.gsc_auth.service_account.Credentials.from_service_account_info", return_value=creds) as fn:
+            for _ in range(3):
+                token, email = gsc_auth.access_token()
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(creds.refreshes, 1)
+        self.assertEqual(token, "token-1")
+        self.assertEqual(email, creds.service_account_email)
+
+    def test_token_refreshed_inside_expiry_margin(self):
+        creds = _FakeCreds(timedelta(minutes=2))
+        with patch("app.core.gsc_auth.service_account.Credentials.from_service_account_info", return_value=creds):
+            gsc_auth.access_token()
+            token, _ = gsc_auth.access_token()
+        self.assertEqual(token, "token-2")
+
+    def test_slow_refresh_does_not_block_other_identities(self):
+        release = threading.Event()
+
+        class _SlowCreds(_FakeCreds):
+            def refresh(self, request):
+                release.wait(5)
+                super().refresh(request)
+
+        slow, fast = _SlowCreds(timedelta(hours=1)), _FakeCreds(timedelta(hours=1))
+        by_email = {"slow@example.com": slow, "fast@example.com": fast}
+        with patch(
+            "app.core.gsc_auth.service_account.Credentials.from_service_account_info",
+            side_effect=lambda info, scopes: by_email[info["client_email"]],
+        ):
+            waiter = threading.Thread(target=gsc_auth.access_token, args=({"client_email": "slow@example.com"},))
+            waiter.start()
+            token, _ = gsc_auth.access_token({"client_email": "fast@example.com"})
+            self.assertEqual(token, "token-1")
+            self.assertIsNone(slow.token)
+            release.set()
+            waiter.join(5)
+        self.assertEqual(slow.refreshes, 1)
+
+    def test_invalid_credentials_resolve_to_none(self):
+        os.environ["GSC_CREDENTIALS_JSON"] = "{not json"
+        self.assertIsNone(gsc_auth.resolve_credentials_info())
+        os.environ["GSC_AUTH_MODE"] = "oauth"
+        with self.assertRaises(RuntimeError):
+            gsc_auth.load_credentials_info()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import os
 import unittest
 from unittest.mock import patch
 
+from app.core import gsc_auth
 from app.core.gsc_check import run_gsc_check
 
 
@@ -16,10 +17,11 @@ class GscCheckExitCodesTests(unittest.TestCase):
     def setUp(self):
         os.environ["GSC_AUTH_MODE"] = "service_account"
         os.environ["GSC_CREDENTIALS_JSON"] = json.dumps({"type": "service_account"})
+        gsc_auth.clear_cache()
 
     def test_ok_exit_code(self):
         project = {"sources": {"gsc": {"property": "sc-domain:example.com"}}}
-        with patch("app.core.gsc_check.service_account.Credentials.from_service_account_info") as fn:
+        with patch("app.core.gsc_auth.service_account.Credentials.from_service_account_info") as fn:
             fn.return_value = _FakeCreds()
             with patch("app.core.gsc_check._sites_list") as sites:
                 sites.return_value = [{"siteUrl": "sc-domain:example.com"}]
@@ -31,7 +33,7 @@ class GscCheckExitCodesTests(unittest.TestCase):
 
     def test_property_mismatch_exit_code(self):
         project = {"sources": {"gsc": {"property": "sc-domain:example.com"}}}
-        with patch("app.core.gsc_check.service_account.Credentials.from_service_account_info") as fn:
+        with patch("app.core.gsc_auth.service_account.Credentials.from_service_account_info") as fn:
             fn.return_value = _FakeCreds()
             with patch("app.core.gsc_check._sites_list") as sites:
                 sites.return_value = [{"siteUrl": "https://example.com/"}]
@@ -0,0 +1,134 @@
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import duckdb
+
+from app.core.duckdb_store import gsc_queries_for_page
+from app.core.lake import open_jsonl
+from app.extractors import gsc as gsc_extractor
+from app.extractors.base import RunContext
+
+
+def _fake_post(site_url, payload):
+    dims = payload.get("dimensions")
+    if dims == ["date"]:
+        return {"rows": [
+            {"keys": ["2026-01-01"], "clicks": 40, "impressions": 400, "ctr": 0.1, "position": 4.0},
+            {"keys": ["2026-01-02"], "clicks": 60, "impressions": 600, "ctr": 0.1, "position": 6.0},
+        ]}
+    # 7 rows in total, served in pages of rowLimit.
+    rows = [
+        {"keys": [f"{dims[0]}-{i}"], "clicks": 10 - i, "impressions": 100, "ctr": 0.1, "position": 3.0}
+        for i in range(7)
+    ]
+    start = payload["startRow"]
+    return {"rows": rows[start:start + payload["rowLimit"]]}
+
+
+class GscStreamingTests(unittest.TestCase):
+    def test_pages_through_and_streams_to_storage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+            project = {"sources": {"gsc": {"property": "sc-domain:example.com"}}}
+            ctx = RunContext("client_abc", "2026-01", "20260205T070000Z", False)
+
+            with patch.object(gsc_extractor, "GSC_MAX_ROW_LIMIT", 3), patch.object(gsc_extractor, "TOP_ROW_LIMIT", 2):
+                with patch("app.extractors.gsc._post", side_effect=_fake_post) as post:
+                    data = gsc_extractor.fetch(project, ctx)
+
+            # daily totals + 3 pages (3, 3, 1 rows) per dimension
+            self.assertEqual(post.call_count, 7)
+            self.assertEqual(data["raw"]["kpis"]["rows"][0]["clicks"], 100)
+            self.assertAlmostEqual(data["raw"]["kpis"]["rows"][0]["position"], 5.2)
+            pages = data["raw"]["pages"]
+            self.assertEqual(pages["row_count"], 7)
+            self.assertEqual([r["keys"][0] for r in pages["rows"]], ["page-0", "page-1"])
+            with open_jsonl(Path(pages["rows_path"])) as f:
+                self.assertEqual(len(f.readlines()), 7)
+
+            con = duckdb.connect(str(workspace / "lake" / "warehouse.duckdb"))
+            counts = dict(con.execute("SELECT dimension, count(*) FROM gsc_rows GROUP BY dimension").fetchall())
+            con.close()
+            self.assertEqual(counts, {"page": 7, "query": 7})
+
+    def test_rerun_refetches_only_fresh_partitions(self):
+        calls = []
+
+        def fake_post(site_url, payload):
+            calls.append(payload)
+            if payload["dimensions"] == ["date"]:
+                start, end = date.fromisoformat(payload["startDate"]), date.fromisoformat(payload["endDate"])
+                days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+                return {"rows": [{"keys": [d.isoformat()], "clicks": 1, "impressions": 10, "ctr": 0.1, "position": 3.0} for d in days]}
+            return {"rows": [{"keys": ["x"], "clicks": 5, "impressions": 50, "ctr": 0.1, "position": 2.0}]}
+
+        def run_at(today):
+            calls.clear()
+            with patch("app.extractors.gsc._freshness", return_value=(today, today - timedelta(days=3))):
+                with patch("app.extractors.gsc._post", side_effect=fake_post):
+                    return gsc_extractor.fetch(project, ctx)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            project = {"sources": {"gsc": {"property": "sc-domain:example.com"}}}
+            ctx = RunContext("client_abc", "2026-01", "20260120T070000Z", False)
+
+            data = run_at(date(2026, 1, 20))
+            self.assertEqual(data["raw"]["kpis"]["rows"][0]["clicks"], 20)
+            self.assertEqual(len(calls), 3)
+
+            run_at(date(2026, 1, 20))
+            self.assertEqual((calls[0]["startDate"], calls[0]["endDate"]), ("2026-01-18", "2026-01-20"))
+            self.assertEqual(len(calls), 3)
+
+            data = run_at(date(2026, 2, 5))
+            self.assertEqual((calls[0]["startDate"], calls[0]["endDate"]), ("2026-01-18", "2026-01-31"))
+            self.assertEqual(data["raw"]["kpis"]["rows"][0]["clicks"], 31)
+
+            data = run_at(date(2026, 2, 6))
+            self.assertEqual(calls, [])
+            self.assertEqual(data["raw"]["kpis"]["rows"][0]["clicks"], 31)
+            self.assertEqual(data["raw"]["pages"]["rows"][0]["keys"], ["x"])
+
+    def test_page_query_rows_interned_in_warehouse(self):
+        def fake_post(site_url, payload):
+            if payload["dimensions"] == ["page", "query"]:
+                rows = [
+                    {"keys": ["https://example.com/a", "shoes"], "clicks": 9, "impressions": 90, "ctr": 0.1, "position": 1.5},
+                    {"keys": ["https://example.com/a", "boots"], "clicks": 4, "impressions": 40, "ctr": 0.1, "position": 3.0},
+                    {"keys": ["https://example.com/b", "shoes"], "clicks": 2, "impressions": 20, "ctr": 0.1, "position": 7.0},
+                ]
+                return {"rows": rows[payload["startRow"]:payload["startRow"] + payload["rowLimit"]]}
+            return _fake_post(site_url, payload)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+            project = {"sources": {"gsc": {"property": "sc-domain:example.com", "page_query": True}}}
+            with patch.object(gsc_extractor, "GSC_MAX_ROW_LIMIT", 3), patch("app.extractors.gsc._post", side_effect=fake_post):
+                for key in ("client_a", "client_b"):
+                    data = gsc_extractor.fetch(project, RunContext(key, "2026-01", "20260205T070000Z", False))
+            self.assertEqual(data["raw"]["page_query"]["row_count"], 3)
+
+            queries = gsc_queries_for_page("client_a", "2026-01", "https://example.com/a")
+            self.assertEqual([(q["query"], q["clicks"]) for q in queries], [("shoes", 9), ("boots", 4)])
+            con = duckdb.connect(str(workspace / "lake" / "warehouse.duckdb"))
+            urls = con.execute("SELECT count(*) FROM gsc_url_dict").fetchone()[0]
+            rows = con.execute("SELECT count(*) FROM gsc_page_query").fetchone()[0]
+            con.close()
+            self.assertEqual((urls, rows), (2, 6))
+
+    def test_top_rows_keeps_api_order_on_ties(self):
+        top = gsc_extractor.TopRows(2)
+        for i, clicks in enumerate([5, 7, 7, 1, 7]):
+            top.add({"keys": [str(i)], "clicks": clicks})
+        self.assertEqual([r["keys"][0] for r in top.rows()], ["1", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.core.duckdb_store import WarehouseServer, gsc_kpis_by_grain, gsc_kpis_for_window, store_gsc_daily, use_warehouse
+from app.core.time_utils import parse_window
+
+
+class PeriodWindowTests(unittest.TestCase):
+    def test_window_kinds(self):
+        self.assertEqual(parse_window("2026-02").end, date(2026, 2, 28))
+        week = parse_window("2026-W01")
+        self.assertEqual((week.kind, week.start, week.end), ("week", date(2025, 12, 29), date(2026, 1, 4)))
+        quarter = parse_window("2026-Q2")
+        self.assertEqual((quarter.start, quarter.end), (date(2026, 4, 1), date(2026, 6, 30)))
+        mtd = parse_window("mtd", today=date(2026, 3, 9))
+        self.assertEqual((mtd.start, mtd.end), (date(2026, 3, 1), date(2026, 3, 9)))
+        self.assertEqual(parse_window("2026-01-10..2026-02-05").kind, "range")
+        with self.assertRaises(ValueError):
+            parse_window("2026-Q5")
+
+
+class GscWarehouseTests(unittest.TestCase):
+    def test_aggregates_daily_rows_for_any_window(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            start = date(2026, 1, 1)
+            rows = [
+                {"keys": [(start + timedelta(days=i)).isoformat()], "clicks": 10, "impressions": 100, "ctr": 0.1, "position": 2.0 if i % 2 else 4.0}
+                for i in range(59)
+            ]
+            store_gsc_daily("client_abc", rows)
+            # Re-storing a day replaces it instead of double counting.
+            store_gsc_daily("client_abc", rows[:1])
+
+            january = gsc_kpis_for_window("client_abc", date(2026, 1, 1), date(2026, 1, 31))
+            self.assertEqual((january["clicks"], january["days"]), (310, 31))
+            self.assertAlmostEqual(january["avg_position"], (16 * 4.0 + 15 * 2.0) / 31)
+
+            week = parse_window("2026-W02")
+            self.assertEqual(gsc_kpis_for_window("client_abc", week.start, week.end)["clicks"], 70)
+
+            months = gsc_kpis_by_grain("client_abc", "month", date(2026, 1, 1), date(2026, 3, 31))
+            self.assertEqual([(m["bucket"], m["clicks"]) for m in months], [("2026-01-01", 310), ("2026-02-01", 280)])
+
+    def test_warehouse_server_serializes_writers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            use_warehouse(WarehouseServer())
+            try:
+                def write(project_key):
+                    for i in range(10):
+                        day = (date(2026, 1, 1) + timedelta(days=i)).isoformat()
+                        store_gsc_daily(project_key, [{"keys": [day], "clicks": 1, "impressions": 10, "ctr": 0.1, "position": 3.0}])
+
+                threads = [threading.Thread(target=write, args=(f"client_{n}",)) for n in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                kpis = [gsc_kpis_for_window(f"client_{n}", date(2026, 1, 1), date(2026, 1, 31)) for n in range(4)]
+            finally:
+                use_warehouse(None)
+            self.assertEqual([k["clicks"] for k in kpis], [10] * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core.duckdb_store import load_gsc_rows, top_gsc_rows
+from app.core.lake import jsonl_path, lake_codec, open_jsonl, read_json, write_json
+from app.extractors.base import RunContext, latest_raw_path, raw_dir, read_latest_raw, write_raw
+
+
+def _serp(n):
+    items = [
+        {"type": "organic", "rank_absolute": i, "domain": f"site{i % 40}.example", "url": f"https://site{i % 40}.example/page/{i}", "title": f"Result {i}"}
+        for i in range(n)
+    ]
+    return {"tasks": [{"result": [{"keyword": "shoes", "items": items}]}]}
+
+
+class LakeCodecTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        os.environ["SEO_REPORT_WORKSPACE"] = str(Path(self._tmp.name) / "workspace")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_codecs_round_trip_and_shrink_pretty_json(self):
+        payload = _serp(2000)
+        legacy = Path(self._tmp.name) / "legacy.json"
+        legacy.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        self.assertEqual(read_json(legacy), payload)
+        for codec, suffix in (("zstd", ".json.zst"), ("gzip", ".json.gz"), ("none", ".json")):
+            path = write_json(Path(self._tmp.name) / codec / "raw.json", payload, codec)
+            self.assertTrue(path.name.endswith(suffix), path)
+            self.assertEqual(read_json(path), payload)
+            if codec != "none":
+                self.assertLess(path.stat().st_size * 10, legacy.stat().st_size, codec)
+
+    def test_raws_read_across_codecs(self):
+        ctx = RunContext("client_abc", "2026-01", "20260201T070000Z", False)
+        legacy = raw_dir("gsc", ctx) / "20260101T070000Z.json"
+        legacy.parent.mkdir(parents=True)
+        legacy.write_text(json.dumps({"legacy": True}, indent=2), encoding="utf-8")
+        self.assertEqual(read_latest_raw("gsc", ctx), {"legacy": True})
+
+        with patch("app.core.lake.lake_codec", return_value="zstd"):
+            path = write_raw("gsc", ctx, {"latest": True})
+        # Sidecars next to the raw are not raws.
+        (raw_dir("gsc", ctx) / "20260301T070000Z.page.jsonl").write_text("", encoding="utf-8")
+        self.assertEqual(latest_raw_path("gsc", ctx), path)
+        self.assertEqual(read_latest_raw("gsc", ctx), {"latest": True})
+
+    def test_jsonl_sidecars_compressed_and_loaded_as_is(self):
+        for codec, suffix in (("zstd", ".jsonl.zst"), ("gzip", ".jsonl.gz")):
+            with patch("app.core.lake.lake_codec", return_value=codec):
+                path = jsonl_path(Path(self._tmp.name) / f"{codec}.page.jsonl")
+            self.assertTrue(path.name.endswith(suffix), path)
+            with open_jsonl(path, "w") as f:
+                for i in range(3):
+                    f.write(json.dumps({"key": f"/p{i}", "clicks": i, "impressions": 10, "ctr": 0.1, "position": 1.0}) + "\n")
+            load_gsc_rows("client_abc", "2026-01", "page", path)
+            rows, count = top_gsc_rows("client_abc", "2026-01", "page", 1)
+            self.assertEqual((rows[0]["keys"], count), (["/p2"], 3))
+
+    def test_codec_resolved_once_per_process(self):
+        lake_codec()
+        with patch("app.core.lake.load_policy") as load_policy:
+            lake_codec()
+            lake_codec()
+        load_policy.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
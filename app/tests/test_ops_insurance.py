@@ -39,6 +39,10 @@ class OpsInsuranceTests(unittest.TestCase):
                 "output_layout",
             ]:
                 self.assertIn(key, data)
+            steps = [step["name"] for step in data["pipeline"]]
+            self.assertIn("extract:gsc", steps)
+            self.assertLess(steps.index("payload"), steps.index("render"))
+            self.assertIn("write_outputs", steps)
 
     def test_explain_deterministic_output(self):
         with tempfile.TemporaryDirectory() as tmp:
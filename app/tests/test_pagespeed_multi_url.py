@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core.duckdb_store import load_gsc_rows
+from app.core.pipeline import _extract_after
+from app.extractors import pagespeed as pagespeed_extractor
+from app.extractors.base import RunContext
+
+
+class PagespeedMultiUrlTests(unittest.TestCase):
+    def test_audits_top_pages_concurrently(self):
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def fake_run(url, strategy, api_key, blob):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.1)
+            with lock:
+                active[0] -= 1
+            if url.endswith("/broken"):
+                raise RuntimeError("500 Server Error")
+            return {"id": url, "strategy": strategy}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            rows = Path(tmp) / "pages.jsonl"
+            pages = ["https://example.com/", "https://example.com/a", "https://example.com/broken", "https://example.com/b"]
+            rows.write_text(
+                "".join(json.dumps({"key": url, "clicks": 10 - i}) + "\n" for i, url in enumerate(pages)), encoding="utf-8"
+            )
+            load_gsc_rows("client_abc", "2026-01", "page", rows)
+
+            project = {"canonical_origin": "https://example.com/", "sources": {"pagespeed": {"enabled": True, "top_pages": 3}}}
+            ctx = RunContext("client_abc", "2026-01", "20260205T070000Z", False)
+            with patch.dict(os.environ, {"GOOGLE_API_KEY": "key"}), patch.object(
+                pagespeed_extractor, "_run_pagespeed", side_effect=fake_run
+            ):
+                data = pagespeed_extractor.fetch(project, ctx)
+
+        self.assertEqual(data["mobile"], {"id": "https://example.com/", "strategy": "mobile"})
+        self.assertEqual(list(data["pages"]), ["https://example.com/a", "https://example.com/broken"])
+        self.assertEqual(data["pages"]["https://example.com/a"]["desktop"]["strategy"], "desktop")
+        self.assertIn("error", data["pages"]["https://example.com/broken"]["mobile"])
+        self.assertGreater(peak[0], 1)
+
+    def test_waits_for_gsc_only_when_auditing_top_pages(self):
+        project = {"sources": {"pagespeed": {"enabled": True, "top_pages": 5}}}
+        self.assertEqual(_extract_after("pagespeed", project, ["gsc", "pagespeed"]), ("raw:gsc",))
+        self.assertEqual(_extract_after("pagespeed", project, ["pagespeed"]), ())
+        self.assertEqual(_extract_after("pagespeed", {"sources": {"pagespeed": {}}}, ["gsc", "pagespeed"]), ())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.core.lake import load_mart, mart_dir, scan_marts, write_json, write_mart
+
+
+class ParquetMartTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.workspace = Path(self._tmp.name) / "workspace"
+        os.environ["SEO_REPORT_WORKSPACE"] = str(self.workspace)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_round_trip_and_legacy_json(self):
+        mart = {"kpis": {"clicks": 10, "ctr": 0.1, "avg_position": None}, "top_pages": [{"url": "/a", "clicks": 3}], "note": "ü'\""}
+        path = write_mart("client_abc", "2026-01", "gsc_monthly", mart)
+        self.assertEqual(path, mart_dir("client_abc", "2026-01") / "gsc_monthly.parquet")
+        self.assertEqual(path.parent, self.workspace / "lake" / "marts" / "project_key=client_abc" / "period=2026-01")
+        self.assertEqual(load_mart("client_abc", "2026-01", "gsc_monthly"), mart)
+        self.assertEqual(write_mart("client_abc", "2026-01", "empty", {}), mart_dir("client_abc", "2026-01") / "empty.parquet")
+        self.assertEqual(load_mart("client_abc", "2026-01", "empty"), {})
+        self.assertIsNone(load_mart("client_abc", "2026-02", "gsc_monthly"))
+
+        # JSON marts written before the Parquet layout are still served until the period is rewritten.
+        write_json(self.workspace / "lake" / "marts" / "client_abc" / "2025-12" / "gsc_monthly.json", {"legacy": True}, "gzip")
+        self.assertEqual(load_mart("client_abc", "2025-12", "gsc_monthly"), {"legacy": True})
+        write_mart("client_abc", "2025-12", "gsc_monthly", {"legacy": False})
+        self.assertEqual(load_mart("client_abc", "2025-12", "gsc_monthly"), {"legacy": False})
+
+    def test_scan_across_projects_and_periods(self):
+        self.assertEqual(scan_marts("gsc_monthly"), [])
+        for project_key in ("client_b", "client_a"):
+            for month in range(1, 4):
+                write_mart(project_key, f"2026-{month:02d}", "gsc_monthly", {"kpis": {"clicks": month}, "top_pages": []})
+        # Fields added in later months read as None for earlier ones.
+        write_mart("client_a", "2026-04", "gsc_monthly", {"kpis": {"clicks": 4}, "segments": [1]})
+        write_mart("client_a", "2026-01", "analytics_monthly", {"sessions": 5})
+
+        rows = scan_marts("gsc_monthly", ["kpis", "segments"], project_keys=["client_a"], from_period="2026-02")
+        self.assertEqual(
+            rows,
+            [
+                {"project_key": "client_a", "period": "2026-02", "kpis": {"clicks": 2}, "segments": None},
+                {"project_key": "client_a", "period": "2026-03", "kpis": {"clicks": 3}, "segments": None},
+                {"project_key": "client_a", "period": "2026-04", "kpis": {"clicks": 4}, "segments": [1]},
+            ],
+        )
+        everything = scan_marts("gsc_monthly", to_period="2026-03")
+        self.assertEqual([(r["project_key"], r["period"]) for r in everything][:2], [("client_a", "2026-01"), ("client_a", "2026-02")])
+        self.assertEqual(len(everything), 6)
+        self.assertEqual(everything[0]["top_pages"], [])
+        self.assertEqual(scan_marts("gsc_monthly", project_keys=[]), [])
+
+    def test_scan_fills_fields_no_file_has(self):
+        write_mart("client_a", "2026-01", "gsc_monthly", {"kpis": {"clicks": 1}})
+        self.assertEqual(
+            scan_marts("gsc_monthly", ["kpis", "nope"]),
+            [{"project_key": "client_a", "period": "2026-01", "kpis": {"clicks": 1}, "nope": None}],
+        )
+
+    def test_scan_includes_legacy_json_marts(self):
+        legacy_root = self.workspace / "lake" / "marts" / "client_a"
+        for month in (11, 12):
+            write_json(legacy_root / f"2025-{month}" / "gsc_monthly.json", {"kpis": {"clicks": month}}, "gzip")
+        write_mart("client_a", "2026-01", "gsc_monthly", {"kpis": {"clicks": 1}, "segments": []})
+        # A period rewritten as Parquet is read from Parquet only.
+        write_json(legacy_root / "2026-01" / "gsc_monthly.json", {"kpis": {"clicks": -1}}, "none")
+
+        rows = scan_marts("gsc_monthly", ["kpis", "segments"], from_period="2025-12")
+        self.assertEqual(
+            rows,
+            [
+                {"project_key": "client_a", "period": "2025-12", "kpis": {"clicks": 12}, "segments": None},
+                {"project_key": "client_a", "period": "2026-01", "kpis": {"clicks": 1}, "segments": []},
+            ],
+        )
+        self.assertEqual([r["period"] for r in scan_marts("gsc_monthly")], ["2025-11", "2025-12", "2026-01"])
+        self.assertEqual(scan_marts("gsc_monthly", project_keys=["client_b"]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
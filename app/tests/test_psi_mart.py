@@ -0,0 +1,84 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.extractors import pagespeed as pagespeed_extractor
+from app.extractors.base import RunContext, read_latest_raw
+from app.transforms import psi as psi_transform
+
+
+def _psi_response(lcp):
+    audits = {
+        "largest-contentful-paint": {"numericValue": lcp},
+        "cumulative-layout-shift": {"numericValue": 0.05},
+        "total-blocking-time": {"numericValue": 120.0},
+        "render-blocking-resources": {"details": {"type": "opportunity", "overallSavingsMs": 300}},
+        "unused-javascript": {"details": {"type": "opportunity", "overallSavingsMs": 900}},
+        "final-screenshot": {"details": {"type": "screenshot", "data": "x" * 50000}},
+    }
+    return {
+        "lighthouseResult": {"categories": {"performance": {"score": 0.87}}, "audits": audits},
+        "loadingExperience": {"metrics": {"INTERACTION_TO_NEXT_PAINT": {"percentile": 180}}},
+    }
+
+
+class _StreamedResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+class PsiMartTests(unittest.TestCase):
+    def test_streams_compressed_blob_and_builds_mart(self):
+        calls = []
+
+        def fake_request(method, url, **kwargs):
+            calls.append(kwargs["params"])
+            lcp = 2100.0 if kwargs["params"]["strategy"] == "mobile" else 1200.0
+            return _StreamedResponse(json.dumps(_psi_response(lcp)).encode("utf-8"))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            project = {"canonical_origin": "https://example.com/", "sources": {"pagespeed": {"enabled": True}}}
+            ctx = RunContext("client_abc", "2026-01", "20260205T070000Z", False)
+            with patch.dict(os.environ, {"GOOGLE_API_KEY": "key"}), patch(
+                "app.extractors.pagespeed.scheduler.request", side_effect=fake_request
+            ):
+                raw = pagespeed_extractor.run(project, ctx)
+
+            self.assertEqual({tuple(c["category"]) for c in calls}, {("performance",)})
+            blob = Path(raw["mobile"]["raw_path"])
+            self.assertTrue(blob.name.endswith(".mobile.json.gz"))
+            with gzip.open(blob, "rt", encoding="utf-8") as f:
+                self.assertEqual(json.load(f), _psi_response(2100.0))
+            stored = json.dumps(read_latest_raw("pagespeed", ctx))
+            self.assertNotIn("lighthouseResult", stored)
+
+        mart = psi_transform.to_mart(raw)
+        self.assertEqual(mart["psi_mobile"]["performance_score"], 87)
+        self.assertEqual(mart["psi_mobile"]["lcp_ms"], 2100.0)
+        self.assertEqual(mart["psi_desktop"]["lcp_ms"], 1200.0)
+        self.assertEqual(mart["psi_mobile"]["inp_ms"], 180)
+        self.assertEqual([o["id"] for o in mart["psi_mobile"]["opportunities"]], ["unused-javascript", "render-blocking-resources"])
+        # Raws stored before slimming give the same mart.
+        self.assertEqual(psi_transform.to_mart({"mobile": _psi_response(2100.0)})["psi_mobile"], mart["psi_mobile"])
+
+
+if __name__ == "__main__":
+    unittest.main()
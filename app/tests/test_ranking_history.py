@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.transforms import rankings as rankings_transform
+
+
+def _raw(positions):
+    tasks = []
+    for keyword, position in positions.items():
+        items = [{"rank_absolute": i, "domain": "example.com" if i == position else f"other{i}.de"} for i in range(1, 31)]
+        tasks.append({
+            "data": {"keyword": keyword, "location_name": "Germany", "device": "desktop"},
+            "result": [{"keyword": keyword, "items": items}],
+        })
+    return {"segments": [{"location_name": "Germany", "device": "desktop"}], "tasks": tasks}
+
+
+class RankingHistoryTests(unittest.TestCase):
+    def test_deltas_movers_new_and_lost_from_previous_period(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            first = rankings_transform.to_mart(
+                _raw({"a": 5, "b": 10, "c": 20, "d": 3}), "example.com", "client_abc", "2025-12"
+            )
+            # No history yet: movers keep their order and carry no delta.
+            self.assertEqual([m["delta"] for m in first["movers"]], [None] * 4)
+            self.assertNotIn("kw_new", first)
+
+            mart = rankings_transform.to_mart(
+                _raw({"a": 6, "b": 2, "c": 20, "e": 9}), "example.com", "client_abc", "2026-01"
+            )
+
+        self.assertEqual([(m["keyword"], m["delta"]) for m in mart["movers"]], [("b", -8), ("a", 1)])
+        self.assertEqual(mart["movers"][0]["previous_position"], 10)
+        self.assertEqual((mart["kw_new"], mart["kw_lost"]), (1, 1))
+        self.assertEqual([m["keyword"] for m in mart["new_rankings"]], ["e"])
+        self.assertEqual(mart["lost_rankings"][0], {
+            "keyword": "d", "position": None, "previous_position": 3, "delta": None,
+            "location": "Germany", "device": "desktop",
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
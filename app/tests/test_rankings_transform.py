@@ -0,0 +1,54 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.transforms import rankings as rankings_transform
+from app.utils.domains import host_matches, registrable_domain
+
+
+def _task(keyword, hosts):
+    items = [{"type": "organic", "rank_absolute": i + 1, "domain": host} for i, host in enumerate(hosts)]
+    return {"data": {"keyword": keyword, "location_name": "Germany", "device": "desktop"}, "result": [{"keyword": keyword, "items": items}]}
+
+
+class RankingsTransformTests(unittest.TestCase):
+    def test_domain_matching_is_exact_or_subdomain(self):
+        self.assertTrue(host_matches("www.shop.de", "shop.de"))
+        self.assertTrue(host_matches("blog.shop.de", "https://shop.de/"))
+        self.assertFalse(host_matches("myshop.de", "shop.de"))
+        self.assertEqual(registrable_domain("a.b.example.co.uk"), "example.co.uk")
+
+        raw = {"tasks": [_task("schuhe", ["myshop.de", "other.de", "www.shop.de"]), _task("stiefel", ["shopping.de"])]}
+        mart = rankings_transform.to_mart(raw, "shop.de")
+        self.assertEqual([(m["keyword"], m["position"]) for m in mart["movers"]], [("schuhe", 3)])
+
+        # A subdomain project only matches itself and its own subdomains.
+        raw = {"tasks": [_task("schuhe", ["shop.de", "de.shop.de"])]}
+        self.assertEqual(rankings_transform.to_mart(raw, "de.shop.de")["movers"][0]["position"], 2)
+
+    def test_large_batch_parsed_in_process_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "tasks.jsonl"
+            with path.open("w", encoding="utf-8") as f:
+                for i in range(25):
+                    f.write(json.dumps(_task(f"kw {i}", ["a.de"] * (i % 5) + ["shop.de"])) + "\n")
+            raw = {"mode": "batch", "task_count": 25, "tasks_path": str(path)}
+            with patch.object(rankings_transform, "PARALLEL_MIN_TASKS", 10), patch.object(
+                rankings_transform, "PARSE_CHUNK", 4
+            ), patch("app.transforms.rankings.os.cpu_count", return_value=4):
+                parallel = rankings_transform.to_mart(raw, "shop.de")
+                with patch("app.transforms.rankings.ProcessPoolExecutor") as pool:
+                    rankings_transform.use_parse_pool(False)
+                    try:
+                        serial = rankings_transform.to_mart(raw, "shop.de")
+                    finally:
+                        rankings_transform.use_parse_pool(True)
+        pool.assert_not_called()
+        self.assertEqual(parallel, serial)
+        self.assertEqual(parallel["kw_top3"], 15)
+
+
+if __name__ == "__main__":
+    unittest.main()
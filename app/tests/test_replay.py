@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.extractors import gsc as gsc_extractor
+from app.extractors import rybbit as rybbit_extractor
+from app.extractors.base import RunContext, write_raw
+
+
+def _ctx(**kwargs) -> RunContext:
+    return RunContext(project_key="client_abc", period="2026-01", run_id="20260301T070000Z", mock=False, **kwargs)
+
+
+class ReplayTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        os.environ["SEO_REPORT_WORKSPACE"] = str(Path(self._tmp.name) / "workspace")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_replay_serves_stored_raw_without_fetching(self):
+        write_raw("gsc", RunContext("client_abc", "2026-01", "20260201T070000Z", False), {"old": True})
+        write_raw("gsc", RunContext("client_abc", "2026-01", "20260202T070000Z", False), {"latest": True})
+        with patch.object(gsc_extractor, "fetch") as fetch:
+            data = gsc_extractor.run({}, _ctx(replay=True))
+        fetch.assert_not_called()
+        self.assertEqual(data, {"latest": True})
+
+    def test_fetches_when_nothing_stored_or_expired(self):
+        write_raw("gsc", RunContext("client_abc", "2026-01", "20200101T000000Z", False), {"stale": True})
+        with patch.object(gsc_extractor, "fetch", return_value={"fresh": True}):
+            self.assertEqual(gsc_extractor.run({}, _ctx(replay=True, replay_ttl_s=3600)), {"fresh": True})
+        with patch.object(rybbit_extractor, "fetch", return_value={"fresh": True}) as fetch:
+            rybbit_extractor.run({}, _ctx(replay=True))
+        fetch.assert_called_once()
+
+    def test_without_replay_always_fetches(self):
+        write_raw("gsc", RunContext("client_abc", "2026-01", "20260201T070000Z", False), {"old": True})
+        with patch.object(gsc_extractor, "fetch", return_value={"fresh": True}):
+            self.assertEqual(gsc_extractor.run({}, _ctx()), {"fresh": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core.duckdb_store import analytics_kpis_by_grain, analytics_kpis_for_window
+from app.core.policy import load_policy, policy_today
+from app.extractors import rybbit as rybbit_extractor
+from app.extractors.base import RunContext
+from app.transforms import analytics as analytics_transform
+
+
+class _Resp:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class RybbitWarehouseTests(unittest.TestCase):
+    def test_daily_buckets_and_paginated_breakdowns(self):
+        last_month_end = policy_today(load_policy()).replace(day=1) - timedelta(days=1)
+        start = last_month_end.replace(day=1)
+        period = f"{start:%Y-%m}"
+        pages = [{"value": f"/p{i}", "sessions": 10 * i, "conversions": i} for i in range(1, 6)]
+        calls = []
+
+        def fake_request(method, url, **kwargs):
+            params = kwargs["params"]
+            calls.append((url, params))
+            if url.endswith("/stats"):
+                first, end = date.fromisoformat(params["from"]), date.fromisoformat(params["to"])
+                days = [first + timedelta(days=n) for n in range((end - first).days + 1)]
+                return _Resp({"buckets": [{"date": d.isoformat(), "sessions": 10, "conversions": 1} for d in days]})
+            offset = (params["page"] - 1) * params["limit"]
+            rows = pages if url.endswith("/pages") else pages[:1]
+            return _Resp({"rows": rows[offset:offset + params["limit"]]})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            env = {"RYBBIT_API_KEY": "k", "RYBBIT_API_BASE": "https://rybbit.test/api"}
+            project = {"sources": {"rybbit": {"enabled": True, "site_id": "7"}}}
+            ctx = RunContext("client_abc", period, "20260205T070000Z", False)
+            with patch.dict(os.environ, env), patch.object(rybbit_extractor, "PAGE_LIMIT", 2), patch(
+                "app.extractors.rybbit.scheduler.request", side_effect=fake_request
+            ):
+                raw = rybbit_extractor.fetch(project, ctx)
+                # 1 day-bucket call + 3 pages of /pages + 1 page of /referrers.
+                self.assertEqual(len(calls), 5)
+                self.assertEqual([p["page"] for u, p in calls if u.endswith("/pages")], [1, 2, 3])
+
+                # The ended month is served from the warehouse on the next run.
+                again = rybbit_extractor.fetch(project, ctx)
+                self.assertEqual(len(calls), 5)
+
+            days = last_month_end.day
+            self.assertEqual((raw["sessions"], raw["conversions"]), (10 * days, days))
+            self.assertAlmostEqual(raw["conversion_rate"], 0.1)
+            self.assertEqual(len(raw["daily"]["rows"]), days)
+            self.assertEqual(raw["pages"]["row_count"], 5)
+            self.assertEqual([r["key"] for r in raw["pages"]["rows"][:2]], ["/p5", "/p4"])
+            self.assertIsNone(again["pages"]["rows_path"])
+            self.assertEqual(again["pages"]["rows"], raw["pages"]["rows"])
+
+            mtd = analytics_kpis_for_window("client_abc", start, start + timedelta(days=9))
+            self.assertEqual((mtd["sessions"], mtd["days"]), (100, 10))
+            months = analytics_kpis_by_grain("client_abc", "month", start, last_month_end)
+            self.assertEqual([(w["bucket"], w["sessions"]) for w in months], [(start.isoformat(), 10 * days)])
+
+            mart = analytics_transform.from_rybbit(raw)
+            self.assertEqual(mart["top_pages"][0], {"key": "/p5", "sessions": 50, "conversions": 5})
+            self.assertEqual(mart["top_sources"], [{"key": "/p1", "sessions": 10, "conversions": 1}])
+
+    def test_empty_breakdown_of_ended_month_not_refetched(self):
+        last_month_end = policy_today(load_policy()).replace(day=1) - timedelta(days=1)
+        period = f"{last_month_end:%Y-%m}"
+        calls = []
+
+        def fake_request(method, url, **kwargs):
+            calls.append(url)
+            if url.endswith("/stats"):
+                return _Resp({"buckets": []})
+            return _Resp({"rows": []})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["SEO_REPORT_WORKSPACE"] = str(Path(tmp) / "workspace")
+            env = {"RYBBIT_API_KEY": "k", "RYBBIT_API_BASE": "https://rybbit.test/api"}
+            project = {"sources": {"rybbit": {"enabled": True, "site_id": "7"}}}
+            ctx = RunContext("client_abc", period, "20260205T070000Z", False)
+            with patch.dict(os.environ, env), patch(
+                "app.extractors.rybbit.scheduler.request", side_effect=fake_request
+            ):
+                raw = rybbit_extractor.fetch(project, ctx)
+                breakdown_calls = [url for url in calls if not url.endswith("/stats")]
+                self.assertEqual(len(breakdown_calls), 2)
+                rybbit_extractor.fetch(project, ctx)
+                self.assertEqual([url for url in calls if not url.endswith("/stats")], breakdown_calls)
+
+        self.assertEqual((raw["pages"]["rows"], raw["pages"]["row_count"]), ([], 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
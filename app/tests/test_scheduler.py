@@ -0,0 +1,138 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app.core import http
+from app.core.scheduler import QuotaServer, Scheduler
+
+
+class _Resp:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+POLICY = {
+    "defaults": {"qps": 10, "burst": 1, "max_concurrency": 2, "min_qps": 0.5, "additive_increase": 1, "decrease_factor": 0.5},
+    "hosts": {"api.example.com": {"qps": 20, "burst": 2}},
+}
+
+
+class SchedulerTests(unittest.TestCase):
+    def test_host_limits_override_defaults(self):
+        sched = Scheduler(POLICY)
+        limits = sched.limits_for("api.example.com")
+        self.assertEqual((limits.qps, limits.burst), (20, 2))
+        self.assertEqual(limits.max_concurrency, 2)
+        self.assertEqual(sched.limits_for("other.example.com").qps, 10)
+
+    def test_buckets_per_host_and_credential(self):
+        sched = Scheduler(POLICY)
+        a = sched.limiter("api.example.com", "key-a")
+        self.assertIs(a, sched.limiter("api.example.com", "key-a"))
+        self.assertIsNot(a, sched.limiter("api.example.com", "key-b"))
+        self.assertIsNot(a, sched.limiter("other.example.com", "key-a"))
+
+    def test_token_bucket_paces_requests(self):
+        sched = Scheduler(POLICY)
+        limiter = sched.limiter("other.example.com")
+        started = time.monotonic()
+        for _ in range(4):
+            limiter.acquire()
+        # burst 1, 10 qps: 3 waits of ~0.1s
+        self.assertGreater(time.monotonic() - started, 0.25)
+
+    def test_throttle_decreases_then_recovers(self):
+        sched = Scheduler(POLICY)
+        responses = [_Resp(429, {"Retry-After": "0"}), _Resp(200)]
+        with patch("app.core.scheduler.http.session") as session:
+            req = session.return_value.request
+            req.side_effect = responses
+            res = sched.request("GET", "https://api.example.com/x", credential="k")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(req.call_count, 2)
+        limiter = sched.limiter("api.example.com", "k")
+        # 20 qps halved on the 429, then +1 on success
+        self.assertEqual(limiter.rate, 11)
+
+    def test_gives_up_after_max_retries(self):
+        policy = {"defaults": {"max_retries": 1, "max_backoff_s": 0}}
+        sched = Scheduler(policy)
+        with patch("app.core.scheduler.http.session") as session:
+            req = session.return_value.request
+            req.return_value = _Resp(503)
+            res = sched.request("GET", "https://api.example.com/x")
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(req.call_count, 2)
+
+    def test_503_retried_only_when_repeat_is_safe(self):
+        policy = {"defaults": {"max_retries": 2, "max_backoff_s": 0, "qps": 100, "burst": 10, "min_qps": 50}}
+        sched = Scheduler(policy)
+        with patch("app.core.scheduler.http.session") as session:
+            req = session.return_value.request
+            req.return_value = _Resp(503)
+            # A 503 on a POST may come after the task was created; repeating it could bill it twice.
+            self.assertEqual(sched.request("POST", "https://api.example.com/task_post").status_code, 503)
+            self.assertEqual(req.call_count, 1)
+            sched.request("POST", "https://api.example.com/query", retry_unsafe=True)
+            self.assertEqual(req.call_count, 4)
+            req.return_value = _Resp(429, {"Retry-After": "0"})
+            sched.request("POST", "https://api.example.com/task_post")
+            self.assertEqual(req.call_count, 7)
+
+    def test_streamed_response_holds_slot_until_closed(self):
+        sched = Scheduler({"defaults": {"max_concurrency": 1, "qps": 100, "burst": 10}})
+        with patch("app.core.scheduler.http.session") as session:
+            session.return_value.request.return_value = _Resp(200)
+            res = sched.request("GET", "https://api.example.com/x", stream=True)
+            limiter = sched.limiter("api.example.com")
+            self.assertFalse(limiter._slots.acquire(blocking=False))
+            res.close()
+            res.close()
+            self.assertTrue(limiter._slots.acquire(blocking=False))
+            limiter.release_slot()
+            sched.request("GET", "https://api.example.com/x")
+            self.assertTrue(limiter._slots.acquire(blocking=False))
+
+    def test_quota_server_shared_across_schedulers(self):
+        # Two worker schedulers drawing on one QuotaServer share its concurrency cap (2) instead of splitting it.
+        server = QuotaServer(POLICY)
+        a = Scheduler(POLICY, quota=server).limiter("api.example.com", "k")
+        b = Scheduler(POLICY, quota=server).limiter("api.example.com", "k")
+        self.assertEqual(a.limits.max_concurrency, 2)
+        entered = threading.Event()
+
+        def third():
+            with b:
+                entered.set()
+
+        with a, b:
+            worker = threading.Thread(target=third)
+            worker.start()
+            self.assertFalse(entered.wait(0.1))
+        self.assertTrue(entered.wait(1))
+        worker.join()
+
+
+class SessionTests(unittest.TestCase):
+    def test_pool_per_host_sized_from_policy(self):
+        policy = {"session": {"pool_maxsize": 4, "connect_retries": 1}, **POLICY}
+        policy["hosts"] = {"api.example.com": {"max_concurrency": 12}}
+        session = http.build_session(policy)
+        adapter = session.get_adapter("https://api.example.com/v1/x")
+        self.assertEqual(adapter._pool_maxsize, 12)
+        self.assertEqual(adapter.max_retries.connect, 1)
+        self.assertEqual(adapter.max_retries.status, 0)
+        self.assertEqual(session.get_adapter("https://other.example.com/")._pool_maxsize, 4)
+
+    def test_session_reused_within_process(self):
+        self.assertIs(http.session(), http.session())
+
+
+if __name__ == "__main__":
+    unittest.main()
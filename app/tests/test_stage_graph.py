@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core.pipeline import run as generate_run
+from app.core.stage_cache import StageCache
+from app.core.stages import Stage, StageGraph
+
+
+def _sleep_then(outputs):
+    def fn(inputs):
+        time.sleep(0.2)
+        return outputs
+    return fn
+
+
+class StageGraphTests(unittest.TestCase):
+    def test_rejects_unknown_inputs(self):
+        with self.assertRaises(ValueError):
+            StageGraph([Stage("b", lambda i: {}, inputs=("a",))])
+
+    def test_independent_stages_run_in_parallel(self):
+        graph = StageGraph([
+            Stage("join", lambda i: {"sum": i["x"] + i["y"]}, inputs=("x", "y"), outputs=("sum",)),
+            Stage("x", _sleep_then({"x": 1}), outputs=("x",)),
+            Stage("y", _sleep_then({"y": 2}), outputs=("y",)),
+        ])
+        self.assertEqual(graph.order[-1], "join")
+        started = time.monotonic()
+        artifacts, records = graph.run(workers=2)
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertEqual(artifacts["sum"], 3)
+        self.assertTrue(all(r.status == "done" for r in records))
+
+    def test_failed_stage_skips_dependents_only(self):
+        def boom(inputs):
+            raise RuntimeError("boom")
+
+        graph = StageGraph([
+            Stage("a", boom, outputs=("a",)),
+            Stage("b", lambda i: {"b": 1}, inputs=("a",), outputs=("b",)),
+            Stage("c", lambda i: {"c": sorted(i)}, optional_inputs=("a",), outputs=("c",)),
+        ])
+        artifacts, records = graph.run()
+        statuses = {r.name: r.status for r in records}
+        self.assertEqual(statuses, {"a": "failed", "b": "skipped", "c": "done"})
+        self.assertEqual(artifacts["c"], [])
+
+    def test_start_at_loads_upstream_and_reruns_downstream(self):
+        calls = []
+        graph = StageGraph([
+            Stage("a", lambda i: calls.append("a") or {"a": 1}, outputs=("a",), load=lambda: {"a": 10}),
+            Stage("b", lambda i: calls.append("b") or {"b": i["a"] + 1}, inputs=("a",), outputs=("b",)),
+            Stage("c", lambda i: calls.append("c") or {"c": i["b"] * 2}, inputs=("b",), outputs=("c",)),
+        ])
+        artifacts, records = graph.run(start_at="b")
+        self.assertEqual(calls, ["b", "c"])
+        self.assertEqual(artifacts["c"], 22)
+        self.assertEqual(records[0].status, "loaded")
+
+    def test_cache_skips_unchanged_stages(self):
+        calls = []
+
+        def graph(x):
+            return StageGraph([
+                Stage("a", lambda i: calls.append("a") or {"a": x}, outputs=("a",), cache_key=lambda: {}),
+                Stage("b", lambda i: calls.append("b") or {"b": i["a"] * 2}, inputs=("a",), outputs=("b",), cache_key=lambda: {}),
+                Stage("c", lambda i: calls.append("c") or {"c": i["b"]}, inputs=("b",), outputs=("c",)),
+            ])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = StageCache(Path(tmp))
+            graph(1).run(cache=cache)
+            artifacts, records = graph(1).run(cache=cache)
+            self.assertEqual(artifacts["c"], 2)
+            self.assertEqual([r.status for r in records], ["cached", "cached", "done"])
+            self.assertEqual(calls, ["a", "b", "c", "c"])
+
+    def test_pipeline_warm_run_hits_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            project_dir = workspace / "projects" / "client_abc"
+            project_dir.mkdir(parents=True, exist_ok=True)
+            project = json.loads(Path("examples/project_pack/sample_project.json").read_text(encoding="utf-8"))
+            project["output_path"] = str(workspace / "reports" / "client_abc")
+            project_path = project_dir / "project.json"
+            project_path.write_text(json.dumps(project, indent=2), encoding="utf-8")
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+
+            output_dir = generate_run(project_path, "2026-01", mock=True)
+            payload_before = (output_dir / "report_payload.json").read_text(encoding="utf-8")
+            generate_run(project_path, "2026-01", mock=True)
+
+            trace = json.loads((output_dir / "run_trace.json").read_text(encoding="utf-8"))
+            statuses = {step["name"]: step["status"] for step in trace["steps"]}
+            for name in ("extract:gsc", "transform:gsc", "store:gsc", "payload", "actions", "render"):
+                self.assertEqual(statuses[name], "cached", name)
+            self.assertEqual(statuses["write_outputs"], "done")
+            self.assertEqual((output_dir / "report_payload.json").read_text(encoding="utf-8"), payload_before)
+
+            generate_run(project_path, "2026-01", mock=True, use_cache=False)
+            trace = json.loads((output_dir / "run_trace.json").read_text(encoding="utf-8"))
+            self.assertEqual({step["status"] for step in trace["steps"]} - {"done", "skipped"}, set())
+
+    def test_template_change_reruns_render_only(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            project_dir = workspace / "projects" / "client_abc"
+            project_dir.mkdir(parents=True, exist_ok=True)
+            project = json.loads(Path("examples/project_pack/sample_project.json").read_text(encoding="utf-8"))
+            project["output_path"] = str(workspace / "reports" / "client_abc")
+            project_path = project_dir / "project.json"
+            project_path.write_text(json.dumps(project, indent=2), encoding="utf-8")
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+
+            output_dir = generate_run(project_path, "2026-01", mock=True)
+            # A rebuilt payload differs only in meta.generated_at, so actions and render stay cached.
+            generate_run(project_path, "2026-01", mock=True, start_at="payload")
+            trace = json.loads((output_dir / "run_trace.json").read_text(encoding="utf-8"))
+            statuses = {step["name"]: step["status"] for step in trace["steps"]}
+            self.assertEqual((statuses["payload"], statuses["actions"], statuses["render"]), ("done", "cached", "cached"))
+
+            with patch("app.core.pipeline.render_digest", return_value="edited"):
+                generate_run(project_path, "2026-01", mock=True)
+            trace = json.loads((output_dir / "run_trace.json").read_text(encoding="utf-8"))
+            statuses = {step["name"]: step["status"] for step in trace["steps"]}
+            self.assertEqual((statuses["payload"], statuses["actions"], statuses["render"]), ("cached", "cached", "done"))
+
+    def test_notion_registry_change_rerenders_notion_fields(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            project_dir = workspace / "projects" / "client_abc"
+            project_dir.mkdir(parents=True, exist_ok=True)
+            project = json.loads(Path("examples/project_pack/sample_project.json").read_text(encoding="utf-8"))
+            project["output_path"] = str(workspace / "reports" / "client_abc")
+            project_path = project_dir / "project.json"
+            project_path.write_text(json.dumps(project, indent=2), encoding="utf-8")
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+            registries = Path(tmp) / "registries"
+            shutil.copytree("registries", registries)
+
+            with patch("app.core.registry.registries_dir", return_value=registries), patch(
+                "app.core.stage_cache.registries_dir", return_value=registries
+            ):
+                output_dir = generate_run(project_path, "2026-01", mock=True)
+                self.assertIn("- GSC Clicks:", (output_dir / "notion_fields.md").read_text(encoding="utf-8"))
+                notion = registries / "notion_properties.yaml"
+                notion.write_text(
+                    notion.read_text(encoding="utf-8").replace('"GSC Clicks"', '"Search Clicks"'), encoding="utf-8"
+                )
+                generate_run(project_path, "2026-01", mock=True)
+
+            trace = json.loads((output_dir / "run_trace.json").read_text(encoding="utf-8"))
+            statuses = {step["name"]: step["status"] for step in trace["steps"]}
+            self.assertEqual(statuses["render"], "done")
+            self.assertIn("- Search Clicks:", (output_dir / "notion_fields.md").read_text(encoding="utf-8"))
+
+    def test_pipeline_rerun_render_only(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "workspace"
+            project_dir = workspace / "projects" / "client_abc"
+            project_dir.mkdir(parents=True, exist_ok=True)
+            project = json.loads(Path("examples/project_pack/sample_project.json").read_text(encoding="utf-8"))
+            project["output_path"] = str(workspace / "reports" / "client_abc")
+            project_path = project_dir / "project.json"
+            project_path.write_text(json.dumps(project, indent=2), encoding="utf-8")
+            os.environ["SEO_REPORT_WORKSPACE"] = str(workspace)
+
+            output_dir = generate_run(project_path, "2026-01", mock=True)
+            payload_before = (output_dir / "report_payload.json").read_text(encoding="utf-8")
+            generate_run(project_path, "2026-01", mock=True, start_at="render")
+
+            trace = json.loads((output_dir / "run_trace.json").read_text(encoding="utf-8"))
+            statuses = {step["name"]: step["status"] for step in trace["steps"]}
+            self.assertEqual(statuses["extract:gsc"], "not_run")
+            self.assertEqual(statuses["actions"], "loaded")
+            self.assertEqual(statuses["render"], "done")
+            self.assertEqual(statuses["write_outputs"], "done")
+            self.assertEqual((output_dir / "report_payload.json").read_text(encoding="utf-8"), payload_before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+SERP_PATH = "/v3/serp/google/organic"
+
+
+class StubState:
+    """Queued SERP tasks; a task becomes ready `ready_after_s` seconds after task_post and disappears once fetched."""
+
+    def __init__(self, domain: str, ready_after_s: float) -> None:
+        self.domain = domain
+        self.ready_after_s = ready_after_s
+        # tasks_ready lists at most this many tasks, like the API's account-wide cap of 1000.
+        self.ready_limit = 1000
+        self.tasks: dict[str, tuple[float, dict[str, Any]]] = {}
+        self.calls: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def count(self, endpoint: str) -> None:
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def post(self, tasks: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        out = []
+        with self.lock:
+            for task in tasks:
+                task_id = str(uuid.uuid4())
+                self.tasks[task_id] = (time.monotonic() + self.ready_after_s, task)
+                out.append({"id": task_id, "status_code": 20100, "status_message": "Task Created.", "data": task})
+        return out
+
+    def ready(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        with self.lock:
+            ids = [task_id for task_id, (ready_at, _) in self.tasks.items() if ready_at <= now]
+        return [{"id": task_id, "endpoint_advanced": f"{SERP_PATH}/task_get/advanced/{task_id}"} for task_id in ids[:self.ready_limit]]
+
+    def get(self, task_id: str) -> dict[str, Any] | None:
+        with self.lock:
+            entry = self.tasks.get(task_id)
+            if entry is None:
+                return None
+            ready_at, task = entry
+            if ready_at > time.monotonic():
+                return {"id": task_id, "status_code": 40602, "status_message": "Task In Queue.", "data": task, "result": None}
+            del self.tasks[task_id]
+        return {"id": task_id, "status_code": 20000, "data": task, "result": [self.serp(task)]}
+
+    def serp(self, task: dict[str, Any]) -> dict[str, Any]:
+        # Deterministic fake ranking: the domain sits at a position derived from the keyword.
+        keyword = task.get("keyword", "")
+        position = int(hashlib.sha256(keyword.encode("utf-8")).hexdigest(), 16) % 30 + 1
+        items = [
+            {"type": "organic", "rank_absolute": rank, "domain": self.domain if rank == position else f"rank{rank}.example"}
+            for rank in range(1, 31)
+        ]
+        return {"keyword": keyword, "location_name": task.get("location_name"), "items": items}
+
+
+def _handler(state: StubState) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body: dict[str, Any], status: int = 200) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length", 0))
+            tasks = json.loads(self.rfile.read(length) or b"[]")
+            if self.path == f"{SERP_PATH}/live/advanced":
+                state.count("live")
+                results = [
+                    {"id": str(uuid.uuid4()), "status_code": 20000, "data": task, "result": [state.serp(task)]}
+                    for task in tasks
+                ]
+                self._send({"status_code": 20000, "tasks": results})
+            elif self.path == f"{SERP_PATH}/task_post":
+                state.count("task_post")
+                if len(tasks) > 100:
+                    self._send({"status_code": 40006, "status_message": "too many tasks"}, 400)
+                    return
+                self._send({"status_code": 20000, "tasks": state.post(tasks)})
+            else:
+                self._send({"status_code": 40400}, 404)
+
+        def do_GET(self) -> None:
+            if self.path == "/v3/appendix/user_data":
+                self._send({"status_code": 20000, "tasks": [{"result": [{"login": "stub"}]}]})
+            elif self.path == f"{SERP_PATH}/tasks_ready":
+                state.count("tasks_ready")
+                self._send({"status_code": 20000, "tasks": [{"status_code": 20000, "result": state.ready()}]})
+            elif self.path.startswith(f"{SERP_PATH}/task_get/advanced/"):
+                state.count("task_get")
+                task = state.get(self.path.rsplit("/", 1)[-1])
+                if task is None:
+                    self._send({"status_code": 40400}, 404)
+                    return
+                self._send({"status_code": 20000, "tasks": [task]})
+            else:
+                self._send({"status_code": 40400}, 404)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def serve(port: int = 0, domain: str = "example.com", ready_after_s: float = 0.0) -> tuple[ThreadingHTTPServer, StubState]:
+    """Start the stand-in in a background thread; point DATAFORSEO_API_BASE at http://127.0.0.1:<port>."""
+    state = StubState(domain, ready_after_s)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local DataForSEO stand-in (live/advanced, task_post/tasks_ready/task_get).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--domain", default="example.com")
+    parser.add_argument("--ready-after", type=float, default=2.0, help="seconds until a posted task is ready")
+    args = parser.parse_args()
+
+    server, _ = serve(args.port, args.domain, args.ready_after)
+    print(f"DATAFORSEO_API_BASE=http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-__all__ = ["gsc", "rankings", "cwv", "analytics"]
+__all__ = ["gsc", "rankings", "cwv", "analytics", "psi"]
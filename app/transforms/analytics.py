@@ -3,15 +3,25 @@ from __future__ import annotations
 from typing import Any
 
 
+TOP_LIMIT = 10
+
+
+def _top(breakdown: dict[str, Any] | None) -> list[dict[str, Any]]:
+    return [
+        {"key": row.get("key"), "sessions": row.get("sessions"), "conversions": row.get("conversions")}
+        for row in (breakdown or {}).get("rows", [])[:TOP_LIMIT]
+    ]
+
+
 def from_rybbit(raw: dict[str, Any]) -> dict[str, Any]:
-    if {"sessions", "conversions", "conversion_rate"}.issubset(raw.keys()):
-        return {
-            "sessions": raw.get("sessions"),
-            "conversions": raw.get("conversions"),
-            "conversion_rate": raw.get("conversion_rate"),
-        }
-    return {
+    mart = {
         "sessions": raw.get("sessions"),
         "conversions": raw.get("conversions"),
         "conversion_rate": raw.get("conversion_rate"),
     }
+    # Raws from before the daily/breakdown extraction only carry the month totals.
+    if "pages" in raw:
+        mart["top_pages"] = _top(raw.get("pages"))
+    if "sources" in raw:
+        mart["top_sources"] = _top(raw.get("sources"))
+    return mart
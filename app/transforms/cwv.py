@@ -3,8 +3,27 @@ from __future__ import annotations
 from typing import Any
 
 
-def _p75(metric: dict[str, Any]) -> float | None:
-    return metric.get("percentiles", {}).get("p75") if metric else None
+def _latest_complete_period(metrics: dict[str, Any]) -> int | None:
+    """History records: the latest collection period in which every reported metric has a p75."""
+    series = [m["percentilesTimeseries"].get("p75s", []) for m in metrics.values() if m and "percentilesTimeseries" in m]
+    if not series:
+        return None
+    for index in range(min(len(s) for s in series) - 1, -1, -1):
+        if all(s[index] is not None for s in series):
+            return index
+    return None
+
+
+def _p75(metric: dict[str, Any], period: int | None) -> float | None:
+    if not metric:
+        return None
+    if "percentilesTimeseries" in metric:
+        # All metrics are read from the same collection period, so they describe the same weeks.
+        value = None if period is None else metric["percentilesTimeseries"].get("p75s", [])[period]
+    else:
+        value = metric.get("percentiles", {}).get("p75")
+    # CLS percentiles come back as strings.
+    return float(value) if value is not None else None
 
 
 def from_crux(raw: dict[str, Any]) -> dict[str, Any]:
@@ -13,9 +32,10 @@ def from_crux(raw: dict[str, Any]) -> dict[str, Any]:
 
     record = raw.get("record", {})
     metrics = record.get("metrics", {})
-    lcp = _p75(metrics.get("largest_contentful_paint"))
-    inp = _p75(metrics.get("interaction_to_next_paint"))
-    cls = _p75(metrics.get("cumulative_layout_shift"))
+    period = _latest_complete_period(metrics)
+    lcp = _p75(metrics.get("largest_contentful_paint"), period)
+    inp = _p75(metrics.get("interaction_to_next_paint"), period)
+    cls = _p75(metrics.get("cumulative_layout_shift"), period)
 
     return {
         "lcp_p75_ms": lcp,
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import Any
+
+from app.utils.lighthouse import FIELD_METRICS, LAB_AUDITS, slim_result
+
+
+STRATEGIES = ("mobile", "desktop")
+METRICS = ("performance_score", *LAB_AUDITS.values(), *FIELD_METRICS.values())
+
+
+def _metrics(entry: dict[str, Any] | None) -> dict[str, Any] | None:
+    if entry is None:
+        return None
+    if "error" in entry:
+        return {"error": entry["error"]}
+    # Raws written before the extractor slimmed PSI responses still hold the full Lighthouse JSON.
+    if "lighthouseResult" in entry:
+        entry = slim_result(entry)
+    return {
+        **{metric: entry.get(metric) for metric in METRICS},
+        "opportunities": entry.get("opportunities", []),
+    }
+
+
+def to_mart(raw: dict[str, Any]) -> dict[str, Any]:
+    if "lighthouse" in raw:
+        lab = raw["lighthouse"]
+        return {
+            "psi_mobile": _metrics({"lcp_ms": lab.get("lcp_ms"), "inp_ms": lab.get("inp_ms"), "cls": lab.get("cls")}),
+            "psi_desktop": None,
+            "pages": [],
+        }
+
+    mart: dict[str, Any] = {f"psi_{strategy}": _metrics(raw.get(strategy)) for strategy in STRATEGIES}
+    mart["pages"] = [
+        {"url": url, "strategy": strategy, **_metrics(results[strategy])}
+        for url, results in raw.get("pages", {}).items()
+        for strategy in STRATEGIES
+        if strategy in results
+    ]
+    return mart
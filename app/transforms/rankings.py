@@ -1,55 +1,179 @@
 from __future__ import annotations
 
-from typing import Any
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Iterator
+
+from app.core.config import ensure_dirs
+from app.core.duckdb_store import load_ranking_positions, ranking_changes
+from app.core.lake import jsonl_path, mart_dir, open_jsonl
+from app.core.time_utils import prev_period
+from app.utils.domains import host_matches, normalize_host, registrable_domain
 
 
 def _parse_mock(raw: dict[str, Any]) -> list[dict[str, Any]]:
     return raw.get("results", [])
 
 
+MOVERS_LIMIT = 20
+# Batch runs with more tasks than this are parsed in a process pool, PARSE_CHUNK JSONL lines per job.
+PARALLEL_MIN_TASKS = 2000
+PARSE_CHUNK = 500
+PARSE_WORKERS = 4
+
+# Off inside `generate --all` worker processes: they already use the cores, and nesting pools oversubscribes them.
+_parse_pool = True
+
+
+def use_parse_pool(enabled: bool) -> None:
+    global _parse_pool
+    _parse_pool = enabled
+
+
+class DomainMatcher:
+    """Exact-or-subdomain matching against one project domain via cached registrable domains of SERP hosts."""
+
+    def __init__(self, domain: str) -> None:
+        self.domain = normalize_host(domain)
+        self.registrable = registrable_domain(self.domain)
+        # A registrable project domain matches every host under it; a subdomain needs the full host check.
+        self.is_registrable = self.domain == self.registrable
+
+    def __call__(self, host: str) -> bool:
+        if registrable_domain(host) != self.registrable:
+            return False
+        return self.is_registrable or host_matches(host, self.domain)
+
+
+def _rank(task: dict[str, Any], matcher: DomainMatcher) -> dict[str, Any] | None:
+    task_data = task.get("result") or []
+    if not task_data or not matcher.domain:
+        return None
+    data = task.get("data", {})
+    for item in task_data[0].get("items") or []:
+        host = item.get("domain") or item.get("root_domain")
+        if host and matcher(host):
+            return {
+                "keyword": task_data[0].get("keyword") or data.get("keyword"),
+                "position": item.get("rank_absolute") or item.get("rank_group"),
+                "delta": None,
+                "location": data.get("location_name"),
+                "device": data.get("device"),
+            }
+    return None
+
+
+def _parse_lines(lines: list[str], domain: str) -> list[dict[str, Any]]:
+    matcher = DomainMatcher(domain)
+    return [record for line in lines if (record := _rank(json.loads(line), matcher))]
+
+
+def _line_chunks(path: str) -> Iterator[list[str]]:
+    with open_jsonl(Path(path)) as f:
+        chunk = []
+        for line in f:
+            chunk.append(line)
+            if len(chunk) == PARSE_CHUNK:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
 def _parse_live(raw: dict[str, Any], domain: str) -> list[dict[str, Any]]:
-    results: list[dict[str, Any]] = []
-    tasks = raw.get("tasks", [])
-    for task in tasks:
-        task_data = task.get("result", [])
-        if not task_data:
-            continue
-        items = task_data[0].get("items", [])
-        keyword = task_data[0].get("keyword") or task.get("data", {}).get("keyword")
-        for item in items:
-            item_domain = item.get("domain") or item.get("root_domain")
-            if item_domain and domain in item_domain:
-                results.append({
-                    "keyword": keyword,
-                    "position": item.get("rank_absolute") or item.get("rank_group"),
-                    "delta": None,
-                })
-                break
+    matcher = DomainMatcher(domain)
+    results = [record for task in raw.get("tasks", []) if (record := _rank(task, matcher))]
+    # Batch runs keep their tasks in a JSONL file next to the raw JSON (tasks_path).
+    path = raw.get("tasks_path")
+    if not path:
+        return results
+    workers = min(PARSE_WORKERS, os.cpu_count() or 1)
+    if not _parse_pool or raw.get("task_count", 0) < PARALLEL_MIN_TASKS or workers < 2:
+        return results + [record for chunk in _line_chunks(path) for record in _parse_lines(chunk, domain)]
+    # spawn, not fork: the parent may hold threads (stage/source workers) and an open DuckDB connection.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        for records in pool.map(_parse_lines, _line_chunks(path), repeat(domain)):
+            results.extend(records)
     return results
 
 
-def to_mart(raw: dict[str, Any], domain: str) -> dict[str, Any]:
-    if "results" in raw:
-        records = _parse_mock(raw)
-    else:
-        records = _parse_live(raw, domain)
-
+def _counts(records: list[dict[str, Any]]) -> dict[str, Any]:
     top3 = sum(1 for r in records if r.get("position") and r.get("position") <= 3)
     top10 = sum(1 for r in records if r.get("position") and r.get("position") <= 10)
     top20 = sum(1 for r in records if r.get("position") and r.get("position") <= 20)
-
-    movers = [
-        {
-            "keyword": r.get("keyword"),
-            "position": r.get("position"),
-            "delta": r.get("delta"),
-        }
-        for r in records[:20]
-    ]
-
     return {
         "kw_top3": top3 if records else None,
         "kw_top10": top10 if records else None,
         "kw_top20": top20 if records else None,
-        "movers": movers,
     }
+
+
+def _mover(record: dict[str, Any]) -> dict[str, Any]:
+    mover = {
+        "keyword": record.get("keyword"),
+        "position": record.get("position"),
+        "delta": record.get("delta"),
+    }
+    for key in ("location", "device"):
+        if record.get(key):
+            mover[key] = record[key]
+    return mover
+
+
+def _with_history(
+    mart: dict[str, Any], records: list[dict[str, Any]], segment: tuple[Any, Any], project_key: str, period: str
+) -> dict[str, Any]:
+    """Persist this period's positions and replace movers with changes against the previous period."""
+    path = jsonl_path(mart_dir(project_key, period) / "rankings_positions.jsonl")
+    ensure_dirs([path.parent])
+    with open_jsonl(path, "w") as f:
+        for r in records:
+            f.write(json.dumps({k: r.get(k) for k in ("keyword", "location", "device", "position")}) + "\n")
+    load_ranking_positions(project_key, period, path)
+
+    changes = ranking_changes(project_key, period, prev_period(period), *segment, MOVERS_LIMIT)
+    if not set(changes["counts"]) - {"new"}:
+        # Nothing stored for the previous period: every keyword would count as new.
+        return mart
+    return {
+        **mart,
+        "movers": changes["moved"],
+        "kw_new": changes["counts"].get("new", 0),
+        "kw_lost": changes["counts"].get("lost", 0),
+        "new_rankings": changes["new"],
+        "lost_rankings": changes["lost"],
+    }
+
+
+def to_mart(
+    raw: dict[str, Any], domain: str, project_key: str | None = None, period: str | None = None
+) -> dict[str, Any]:
+    """Keyword counts and movers; with project_key/period, positions are stored and compared to the previous period."""
+    if "results" in raw:
+        records = _parse_mock(raw)
+    else:
+        records = _parse_live(raw, domain)
+
+    # Records grouped per location x device; the first configured segment is the headline.
+    grouped: dict[tuple[Any, Any], list[dict[str, Any]]] = {
+        (seg.get("location_name"), seg.get("device")): [] for seg in raw.get("segments", [])
+    }
+    for record in records:
+        grouped.setdefault((record.get("location"), record.get("device")), []).append(record)
+    primary_segment, primary = next(iter(grouped.items()), ((None, None), []))
+
+    mart = {
+        **_counts(primary),
+        "movers": [_mover(r) for r in primary[:MOVERS_LIMIT]],
+    }
+    if "segments" in raw:
+        mart["segments"] = [
+            {"location": location, "device": device, **_counts(rows)} for (location, device), rows in grouped.items()
+        ]
+    if project_key and period and "results" not in raw:
+        mart = _with_history(mart, records, primary_segment, project_key, period)
+    return mart
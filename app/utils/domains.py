@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+# Multi-label public suffixes of the markets we report on (a small subset of the Public Suffix List).
+MULTI_LABEL_SUFFIXES = frozenset({
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk",
+    "co.at", "or.at", "ac.at", "gv.at",
+    "com.au", "net.au", "org.au",
+    "co.nz", "co.jp", "co.za", "co.in",
+    "com.br", "com.tr", "com.mx", "com.cn",
+})
+
+
+@lru_cache(maxsize=65536)
+def normalize_host(value: str) -> str:
+    """Bare lowercase hostname: no scheme, path, port, trailing dot or leading `www.`."""
+    host = value.strip().lower()
+    if "://" in host:
+        host = host.split("://", 1)[1]
+    host = host.split("/", 1)[0].split(":", 1)[0].rstrip(".")
+    return host[4:] if host.startswith("www.") else host
+
+
+@lru_cache(maxsize=65536)
+def registrable_domain(value: str) -> str:
+    """eTLD+1 of a hostname, e.g. `shop.example.co.uk` -> `example.co.uk`."""
+    labels = normalize_host(value).split(".")
+    suffix_len = 2 if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 1
+    return ".".join(labels[-(suffix_len + 1):])
+
+
+def host_matches(host: str, domain: str) -> bool:
+    """True if `host` is `domain` or one of its subdomains (`shop.de` does not match `myshop.de`)."""
+    host, domain = normalize_host(host), normalize_host(domain)
+    return host == domain or host.endswith("." + domain)
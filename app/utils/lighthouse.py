@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Any
+
+# Lighthouse audit id -> slim metric name (numericValue, ms except CLS).
+LAB_AUDITS = {
+    "largest-contentful-paint": "lcp_ms",
+    "first-contentful-paint": "fcp_ms",
+    "total-blocking-time": "tbt_ms",
+    "cumulative-layout-shift": "cls",
+    "speed-index": "si_ms",
+    "server-response-time": "ttfb_ms",
+}
+# CrUX field data embedded in the PSI response (loadingExperience).
+FIELD_METRICS = {"INTERACTION_TO_NEXT_PAINT": "inp_ms"}
+TOP_OPPORTUNITIES = 3
+
+
+def slim_result(psi: dict[str, Any]) -> dict[str, Any]:
+    """The metrics and top opportunities we report, out of a full runPagespeed response."""
+    lighthouse = psi.get("lighthouseResult") or {}
+    audits = lighthouse.get("audits") or {}
+    score = (lighthouse.get("categories") or {}).get("performance", {}).get("score")
+    slim: dict[str, Any] = {"performance_score": round(score * 100) if score is not None else None}
+    for audit_id, name in LAB_AUDITS.items():
+        slim[name] = (audits.get(audit_id) or {}).get("numericValue")
+    field = (psi.get("loadingExperience") or {}).get("metrics") or {}
+    for metric, name in FIELD_METRICS.items():
+        slim[name] = (field.get(metric) or {}).get("percentile")
+
+    opportunities = [
+        {"id": audit_id, "savings_ms": audit["details"].get("overallSavingsMs")}
+        for audit_id, audit in audits.items()
+        if (audit.get("details") or {}).get("type") == "opportunity" and audit["details"].get("overallSavingsMs")
+    ]
+    opportunities.sort(key=lambda o: (-o["savings_ms"], o["id"]))
+    slim["opportunities"] = opportunities[:TOP_OPPORTUNITIES]
+    return slim